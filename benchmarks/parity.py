@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import time
+
+# Checks that the pandas and Polars backends of the derivation pipeline give
+# identical frames on synthetic data (see capiv_core.backend): same rows,
+# columns, dtypes, labels and missing values. Floats may differ in the last
+# bits only, as Polars sums the cumulatives in a more accurate order.
+#
+#   python benchmarks/parity.py --wells 3000 --months 120
+#
+# Exits with status 1 if any frame differs, printing the first difference.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from capiv_core import backend, loaders, wells  # noqa: E402
+from synthetic import make_production  # noqa: E402
+
+RTOL = 1e-9
+
+
+# Synthetic production with the issues the quality flags catch: negative and
+# missing volumes, missing tef and repeated rows
+def make_dirty_production(n_wells, months, seed):
+    rng = np.random.default_rng(seed + 2)
+    df = make_production(n_wells=n_wells, months=months, seed=seed)
+    n = len(df)
+    df.loc[rng.random(n) < 0.002, 'prod_pet'] *= -1
+    df.loc[rng.random(n) < 0.002, 'prod_gas'] = np.nan
+    df.loc[rng.random(n) < 0.002, 'tef'] = np.nan
+    repeated = df.sample(frac=0.001, random_state=seed)
+    return pd.concat([df, repeated]).sort_values(['sigla', 'anio', 'mes'], kind='stable', ignore_index=True)
+
+
+def pipeline(production, repair=True):
+    df = production.drop(columns=['fecha_data']).copy()
+    loaders.add_date(df)
+    loaders.add_production_columns(df, repair)
+    loaders.add_company_alias(df)
+    data_filtered = loaders.filter_producing(df)
+    cum_df = wells.classify_mccain(data_filtered)
+    data_filtered = wells.add_fluid_type(data_filtered, cum_df)
+    summary_df = wells.create_summary_dataframe(data_filtered)
+    return {'production': df, 'mccain': cum_df, 'fluid_type': data_filtered, 'summary': summary_df}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the pandas and Polars derivation backends")
+    parser.add_argument('--wells', type=int, default=2000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    production = make_dirty_production(args.wells, args.months, args.seed)
+    failures = 0
+    for repair in (True, False):
+        results = {}
+        for name in backend.BACKENDS:
+            with backend.use(name):
+                start = time.perf_counter()
+                results[name] = pipeline(production, repair)
+                print(f"{name:<8} repair={repair!s:<5} {time.perf_counter() - start:8.3f} s")
+
+        for frame, expected in results['pandas'].items():
+            try:
+                pd.testing.assert_frame_equal(results['polars'][frame], expected, check_exact=False, rtol=RTOL)
+            except AssertionError as e:
+                failures += 1
+                print(f"DIFFERENT {frame} (repair={repair}): " + " ".join(str(e).split())[:300])
+            else:
+                print(f"identical {frame} (repair={repair}): {len(expected)} rows")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+# Offline benchmark of the dashboards' heavy routines on synthetic data.
+#
+#   python benchmarks/run_benchmarks.py --wells 3000 --months 120 --output bench_results.json
+#   python benchmarks/run_benchmarks.py --compare bench_results.json
+#
+# Every routine runs `--repeat` times under profiling.stage(); the report is a
+# JSON file with min/median/mean seconds, rows in/out and RSS delta per routine.
+# With --compare the run is checked against a previous report and the script
+# exits with status 1 if any routine got slower than --threshold times.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+from capiv_core import aggregates, aligned, backend, decline, export, figures, fluids, hexmap, interference, lifecycle, lift, loaders, months, operators, options, ownership, profiling, quality, rankings, spatial, sql, typecurves, wells  # noqa: E402
+from synthetic import make_frac, make_production  # noqa: E402
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(name, kind, func, repeat):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        profiling.start_run("benchmarks")
+        with profiling.stage(name, kind) as s:
+            result = func()
+            s.rows_out = result if hasattr(result, 'shape') else None
+        runs.append(profiling.records()[-1])
+    seconds = [r['seconds'] for r in runs]
+    return result, {
+        'name': name,
+        'kind': kind,
+        'repeat': repeat,
+        'min_s': min(seconds),
+        'median_s': statistics.median(seconds),
+        'mean_s': round(statistics.mean(seconds), 4),
+        'rows_out': runs[-1]['rows_out'],
+        'mem_delta_mb': max(r['mem_delta_mb'] for r in runs),
+    }
+
+
+def benchmark(args):
+    results = []
+
+    def bench(name, kind, func):
+        result, stats = run(name, kind, func, args.repeat)
+        results.append(stats)
+        print(f"{name:<32} {stats['median_s']:>9.4f} s  rows={stats['rows_out']}")
+        return result
+
+    production = make_production(args.wells, args.months, args.operators, args.areas, args.seed)
+    frac = make_frac(production, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        production_csv = os.path.join(tmp, 'produccion.csv')
+        frac_csv = os.path.join(tmp, 'fractura.csv')
+        production.to_csv(production_csv, index=False)
+        frac.to_csv(frac_csv, index=False)
+
+        data_sorted = bench('load_production', 'load', lambda: loaders.load_and_sort_data(production_csv))
+        df_frac = bench('load_frac', 'load', lambda: loaders.load_and_sort_data_frac(frac_csv))
+
+    bench('quality_flags', 'derive', lambda: quality.flags(data_sorted))
+    bench('cumsums', 'derive', lambda: loaders.add_cumulatives(data_sorted))
+    bench('operator_aliases', 'derive', lambda: operators.resolve(data_sorted['empresa']))
+    data_filtered = bench('alias_and_tef_filter', 'derive', lambda: loaders.filter_producing(data_sorted))
+    bench('operator_intervals', 'derive', lambda: ownership.intervals(data_sorted))
+    well_options = bench('option_lists', 'aggregate', lambda: options.OptionLists(
+        data_sorted, ['tipopozo', 'empresa', 'sigla']))
+    well_index = bench('well_search_index', 'derive', lambda: options.WellIndex(well_options.values('sigla')))
+    bench('well_search', 'aggregate', lambda: [well_index.search(q) for q in ('00', '12', '9(h)', 'SYN.Nq.01')])
+    production_table = pa.Table.from_pandas(data_sorted, preserve_index=False)
+    for fmt in export.FORMATS:
+        bench(f'bulk_export_{fmt}', 'derive', lambda: export.write(io.BytesIO(), production_table, fmt=fmt))
+
+    # Real-time report (runs before the well tables add columns to data_filtered)
+    _, latest_date = aggregates.latest_dates(data_filtered)
+    bench('headline_metrics', 'aggregate', lambda: aggregates.headline_metrics(data_filtered, latest_date))
+    month_index = bench('month_index_build', 'derive', lambda: months.MonthIndex(data_sorted))
+    bench('headline_metrics_indexed', 'aggregate', lambda: aggregates.indexed_headline_metrics(
+        data_sorted, month_index, aggregates.indexed_latest_dates(data_sorted, month_index)[1]
+    ))
+    company = bench('company_rates', 'aggregate', lambda: aggregates.company_rates(data_filtered))
+    bench('start_year_rates', 'aggregate', lambda: aggregates.start_year_rates(data_filtered))
+    if sql.available():
+        engine = sql.Engine({'produccion': pa.Table.from_pandas(data_filtered, preserve_index=False)})
+        bench('sql_company_breakdown', 'aggregate', lambda: engine.breakdown(
+            'produccion', ['empresaNEW', 'date'], 'oil_rate'
+        ))
+
+    fig = bench('figure_company_area', 'plot', lambda: figures.area_chart(
+        company, 'total_oil_rate', 'empresaNEW', "Caudal de Petróleo por Empresa", "Caudal de Petróleo (m³/d)", "Empresa"
+    ))
+    bench('figure_to_json', 'plot', lambda: fig.to_json())
+
+    df_frac = bench('frac_cutoffs', 'derive', lambda: loaders.apply_frac_cutoffs(df_frac))
+
+    cum_df = bench('mccain_classification', 'aggregate', lambda: wells.classify_mccain(data_filtered))
+    data_filtered = bench('merge_fluid_type', 'merge', lambda: wells.add_fluid_type(data_filtered, cum_df))
+    summary_df = bench('summary_peaks_eur', 'aggregate', lambda: wells.create_summary_dataframe(data_filtered))
+    df_merged = bench('merge_frac_fluids', 'merge', lambda: wells.merge_frac_fluids(df_frac, cum_df))
+    df_merged_final = bench('merge_summary', 'merge', lambda: wells.merge_summary(df_merged, summary_df))
+    df_merged_VMUT = wells.filter_vmut(df_merged_final)
+
+    bench('ranking_branch_length', 'aggregate', lambda: rankings.top_per_year(
+        df_merged_VMUT, ['empresaNEW', 'sigla'], 'longitud_rama_horizontal_m', 'max', 'max_lenght'
+    ))
+    bench('ranking_peak_oil', 'aggregate', lambda: rankings.peak_rate_ranking(df_merged_VMUT, 'Petrolífero', 'Qo_peak'))
+    bench('arps_fit_oil', 'aggregate', lambda: decline.fit_declines(data_filtered, 'oil_rate', model='modified'))
+    store = bench('aligned_store_build', 'derive', lambda: aligned.build(data_sorted))
+    bench('volumes_by_fluid', 'aggregate', lambda: fluids.volumes_by_fluid(store))
+    bench('lift_changes_uplift', 'aggregate', lambda: lift.lift_changes(data_sorted, store))
+    bench('well_lifecycle', 'aggregate', lambda: lifecycle.well_lifecycle(store))
+    bench('arps_fit_oil_aligned', 'aggregate', lambda: decline.fit_store(store, 'oil_rate', model='modified'))
+    bench('type_curves_by_year', 'aggregate', lambda: typecurves.type_curves(
+        store, df_merged_VMUT, 'oil_rate', 'start_year', 'longitud_rama_horizontal_m'
+    ))
+    index = bench('spatial_index_build', 'derive', lambda: spatial.from_frame(data_sorted))
+    offset_sigla = index.siglas[0]
+    bench('spatial_offset_wells', 'aggregate', lambda: index.nearest_to(offset_sigla, k=5, radius_m=5000))
+    bench('hexbin_layers', 'aggregate', lambda: hexmap.build_layers(index, df_merged_VMUT))
+    bench('parent_child_pairs', 'merge', lambda: interference.parent_child_pairs(
+        index, store, children=df_merged_VMUT['sigla'].unique()
+    ))
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+        },
+        'params': {
+            'wells': args.wells,
+            'months': args.months,
+            'operators': args.operators,
+            'areas': args.areas,
+            'seed': args.seed,
+            'backend': args.backend,
+            'repeat': args.repeat,
+            'production_rows': len(production),
+            'frac_rows': len(frac),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    previous = {r['name']: r for r in baseline['results']}
+    regressions = []
+    print(f"\nvs {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    for r in report['results']:
+        old = previous.get(r['name'])
+        if not old or not old['median_s']:
+            continue
+        ratio = r['median_s'] / old['median_s']
+        flag = ' <-- regression' if ratio > threshold else ''
+        print(f"{r['name']:<32} {old['median_s']:>9.4f} -> {r['median_s']:>9.4f} s  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(r['name'])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Capítulo IV routines on synthetic data")
+    parser.add_argument('--wells', type=int, default=2000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--operators', type=int, default=10)
+    parser.add_argument('--areas', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="previous report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25)
+    parser.add_argument('--backend', choices=backend.BACKENDS, default=backend.current(),
+                        help="derivation backend (see capiv_core.backend)")
+    args = parser.parse_args(argv)
+    backend.set_backend(args.backend)
+
+    report = benchmark(args)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic Capítulo IV datasets with the same schema as the datos.energia.gob.ar
+# production and frac CSVs, so the dashboards' routines can be timed offline.
+
+OPERATORS = [
+    'YPF S.A.', 'VISTA ENERGY ARGENTINA SAU', 'VISTA OIL & GAS ARGENTINA SAU',
+    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC', 'PAN AMERICAN ENERGY SL',
+    'TECPETROL S.A.', 'PLUSPETROL S.A.', 'SHELL ARGENTINA S.A.',
+    'WINTERSHALL DE ARGENTINA S.A.', 'WINTERSHALL ENERGÍA S.A.',
+    'TOTAL AUSTRAL S.A.', 'CHEVRON ARGENTINA S.R.L.', 'PAMPA ENERGIA S.A.',
+    'EXXONMOBIL EXPLORATION ARGENTINA S.R.L.', 'CAPEX S.A.',
+]
+WELL_TYPES = ['Petrolífero', 'Gasífero', 'Otro tipo', 'Inyección de Agua']
+LIFT_TYPES = ['Surgencia Natural', 'Bombeo Mecánico', 'Gas Lift', 'Plunger Lift']
+
+
+def make_production(n_wells=2000, months=60, n_operators=10, n_areas=40, seed=0):
+    rng = np.random.default_rng(seed)
+    n_operators = min(n_operators, len(OPERATORS))
+    last_month = 2024 * 12 + 11  # December 2024, as months since year 0
+
+    # One row per well: start month, operator, area, fluid type, location, decline
+    well_months = rng.integers(max(1, months // 4), months + 1, n_wells)
+    start_offset = rng.integers(0, months, n_wells)
+    well_months = np.minimum(well_months, months - start_offset)
+    well_months = np.maximum(well_months, 1)
+    operator = rng.integers(0, n_operators, n_wells)
+    area = rng.integers(0, n_areas, n_wells)
+    gassy = rng.random(n_wells) < 0.35
+    wells = pd.DataFrame({
+        'sigla': [f'SYN.Nq.{i:05d}(h)' for i in range(n_wells)],
+        'empresa': np.asarray(OPERATORS)[operator],
+        'areayacimiento': [f'AREA {a:03d}' for a in area],
+        'tipopozo': np.where(gassy, 'Gasífero', np.where(rng.random(n_wells) < 0.1, 'Otro tipo', 'Petrolífero')),
+        'tipoextraccion': np.asarray(LIFT_TYPES)[rng.integers(0, 2, n_wells)],
+        'formacion': 'vaca muerta',
+        'formprod': np.where(rng.random(n_wells) < 0.9, 'VMUT', 'LAJA'),
+        'sub_tipo_recurso': np.where(rng.random(n_wells) < 0.95, 'SHALE', 'TIGHT'),
+        'coordenadax': -69.2 + rng.random(n_wells) * 1.2,
+        'coordenaday': -38.8 + rng.random(n_wells) * 1.1,
+        'qi_oil': np.where(gassy, rng.gamma(2.0, 15.0, n_wells), rng.gamma(4.0, 40.0, n_wells)),
+        'qi_gas': np.where(gassy, rng.gamma(4.0, 60.0, n_wells), rng.gamma(2.0, 20.0, n_wells)),
+        'di': rng.uniform(0.05, 0.25, n_wells),
+        'b': rng.uniform(0.5, 1.4, n_wells),
+        'start': start_offset,
+        'n': well_months,
+    })
+
+    # Expand to one row per well-month
+    idx = np.repeat(np.arange(n_wells), wells['n'].to_numpy())
+    t = np.arange(len(idx)) - np.repeat(np.cumsum(wells['n'].to_numpy()) - wells['n'].to_numpy(), wells['n'].to_numpy())
+    w = wells.iloc[idx].reset_index(drop=True)
+    month = (last_month - months + 1) + w['start'].to_numpy() + t
+    decline = (1 + w['b'].to_numpy() * w['di'].to_numpy() * t) ** (-1 / w['b'].to_numpy())
+    noise = rng.lognormal(0, 0.15, len(idx))
+
+    # Effective days: mostly full months, some shut-ins (tef = 0)
+    tef = np.where(rng.random(len(idx)) < 0.04, 0.0, rng.uniform(20, 31, len(idx)).round(1))
+    oil_rate = w['qi_oil'].to_numpy() * decline * noise
+    gas_rate = w['qi_gas'].to_numpy() * decline * noise
+    df = pd.DataFrame({
+        'sigla': w['sigla'],
+        'anio': month // 12,
+        'mes': month % 12 + 1,
+        'prod_pet': (oil_rate * tef).round(2),
+        'prod_gas': (gas_rate * tef).round(2),
+        'prod_agua': (oil_rate * tef * rng.uniform(0.1, 0.8, len(idx))).round(2),
+        'iny_gas': 0.0,
+        'tef': tef,
+        'tipoextraccion': w['tipoextraccion'],
+        'tipopozo': w['tipopozo'],
+        'empresa': w['empresa'],
+        'formacion': w['formacion'],
+        'areayacimiento': w['areayacimiento'],
+        'coordenadax': w['coordenadax'],
+        'coordenaday': w['coordenaday'],
+        'formprod': w['formprod'],
+        'sub_tipo_recurso': w['sub_tipo_recurso'],
+    })
+    # Some naturally flowing wells convert to pumping or gas lift (injecting gas) later in life
+    converts = (wells['tipoextraccion'].to_numpy() == 'Surgencia Natural') & (rng.random(n_wells) < 0.4)
+    switch = rng.integers(6, 24, n_wells)
+    new_lift = np.asarray(LIFT_TYPES[1:3])[rng.integers(0, 2, n_wells)]
+    converted = converts[idx] & (t >= switch[idx])
+    df['tipoextraccion'] = np.where(converted, new_lift[idx], df['tipoextraccion'])
+    gas_lift = converted & (new_lift[idx] == 'Gas Lift')
+    df['iny_gas'] = np.where(gas_lift, (rng.uniform(10, 40, len(idx)) * tef).round(2), 0.0)
+
+
+    # Some wells change operator (acquisitions, farm-outs) later in life
+    transferred = rng.random(n_wells) < 0.1
+    transfer = rng.integers(12, 36, n_wells)
+    buyer = np.asarray(OPERATORS)[rng.integers(0, n_operators, n_wells)]
+    df['empresa'] = np.where(transferred[idx] & (t >= transfer[idx]), buyer[idx], df['empresa'])
+
+    df['fecha_data'] = pd.to_datetime(dict(year=df['anio'], month=df['mes'], day=1)).dt.strftime('%Y-%m-%d')
+    return df
+
+
+def make_frac(production, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    first = production.groupby('sigla', sort=False).agg(
+        anio=('anio', 'min'), empresa=('empresa', 'first'), formprod=('formprod', 'first')
+    ).reset_index()
+    n = len(first)
+    stages = rng.integers(10, 75, n)
+    return pd.DataFrame({
+        'id_base_fractura_adjiv': np.arange(1, n + 1),
+        'idpozo': np.arange(100000, 100000 + n),
+        'sigla': first['sigla'],
+        'cuenca': 'NEUQUINA',
+        'formacion_productiva': first['formprod'].str.lower(),
+        'tipo_reservorio': 'NO CONVENCIONAL',
+        'subtipo_reservorio': 'SHALE',
+        'longitud_rama_horizontal_m': (stages * rng.uniform(45, 80, n)).round(0),
+        'cantidad_fracturas': stages,
+        'tipo_terminacion': 'Plug and Perf',
+        'arena_bombeada_nacional_tn': (stages * rng.uniform(80, 200, n)).round(1),
+        'arena_bombeada_importada_tn': (stages * rng.uniform(0, 40, n)).round(1),
+        'agua_inyectada_m3': (stages * rng.uniform(800, 1600, n)).round(0),
+        'co2_inyectado_m3': 0.0,
+        'presion_maxima_psi': rng.uniform(8000, 12000, n).round(0),
+        'potencia_equipos_fractura_hp': rng.uniform(20000, 60000, n).round(0),
+        'fecha_inicio_fractura': pd.to_datetime(dict(year=first['anio'], month=1, day=1)).dt.strftime('%Y-%m-%d'),
+        'anio_if': first['anio'],
+        'empresa_informante': first['empresa'],
+    })
@@ -0,0 +1,3 @@
+# Shared, Streamlit-independent building blocks for the Capítulo IV dashboards.
+# Page scripts import from here; nothing in this package should call `st.*`
+# at import time so it can also be used headless (benchmarks, batch jobs).
@@ -0,0 +1,84 @@
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from capiv_core import loaders, quality
+
+# Basin-wide aggregates behind the real-time production report
+
+
+# Latest allocation month in progress and the last consolidated one (a month before)
+def latest_dates(data_filtered):
+    latest_date_non_official = data_filtered['date'].max()
+    return latest_date_non_official, latest_date_non_official - relativedelta(months=1)
+
+
+# Same as latest_dates from the month index of the unfiltered frame (see
+# capiv_core.months): reads the last months only, not the whole history
+def indexed_latest_dates(data_sorted, index):
+    for n in range(len(index)):
+        month_data = index.rows(data_sorted, index.latest(n))
+        if quality.valid(month_data, quality.ZERO_TEF).any():
+            return index.latest(n), index.latest(n) - relativedelta(months=1)
+    return latest_dates(loaders.filter_producing(data_sorted))
+
+
+# Total gas (MMm³/d) and oil (km³/d, kbpd) rates for one month
+def headline_metrics(data_filtered, latest_date):
+    # Filter the dataset to include only rows from the latest date
+    latest_data = data_filtered[data_filtered['date'] == latest_date]
+
+    # Calculate total gas and oil rates for the latest date
+    total_gas_rate = latest_data['gas_rate'].sum() / 1000
+    total_oil_rate = latest_data['oil_rate'].sum() / 1000
+
+    # Convert oil rate to barrels per day (bpd)
+    oil_rate_bpd = total_oil_rate * 6.28981
+
+    # Round the total rates to one decimal place
+    return {
+        'total_gas_rate': round(total_gas_rate, 1),
+        'total_oil_rate': round(total_oil_rate, 1),
+        'oil_rate_bpd': round(oil_rate_bpd, 1),
+    }
+
+
+# Same as headline_metrics reading only the rows of `latest_date`
+def indexed_headline_metrics(data_sorted, index, latest_date):
+    return headline_metrics(loaders.filter_producing(index.rows(data_sorted, latest_date)), latest_date)
+
+
+# Gas and oil rate per company and month, top `top_n` by oil and the rest as "Otros"
+def company_rates(data_filtered, top_n=10):
+    company_summary = data_filtered.groupby(['empresaNEW', 'date']).agg(
+        total_gas_rate=('gas_rate', 'sum'),
+        total_oil_rate=('oil_rate', 'sum')
+    ).reset_index()
+
+    # Determine top companies by total oil production
+    top_companies = company_summary.groupby('empresaNEW')['total_oil_rate'].sum().nlargest(top_n).index
+
+    # Aggregate data for top companies and "Others"
+    company_summary['empresaNEW'] = company_summary['empresaNEW'].apply(lambda x: x if x in top_companies else 'Otros')
+    return company_summary.groupby(['empresaNEW', 'date']).agg(
+        total_gas_rate=('total_gas_rate', 'sum'),
+        total_oil_rate=('total_oil_rate', 'sum')
+    ).reset_index()
+
+
+# Gas and oil rate per campaign (first production year of the well) and month
+def start_year_rates(data_filtered):
+    # Determine the starting year for each well
+    well_start_year = data_filtered.groupby('sigla')['anio'].min().reset_index()
+    well_start_year.columns = ['sigla', 'start_year']
+
+    # Merge the start year back to the original data
+    data_with_start_year = pd.merge(data_filtered, well_start_year, on='sigla')
+
+    # Group data by start year and date for stacked area plots
+    yearly_summary = data_with_start_year.groupby(['start_year', 'date']).agg(
+        total_gas_rate=('gas_rate', 'sum'),
+        total_oil_rate=('oil_rate', 'sum')
+    ).reset_index()
+
+    # Filter out rows where cumulative gas and oil production are zero or less
+    return yearly_summary[(yearly_summary['total_gas_rate'] > 0) & (yearly_summary['total_oil_rate'] > 0)]
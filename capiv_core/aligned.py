@@ -0,0 +1,129 @@
+import json
+import os
+
+import numpy as np
+
+from capiv_core import fluids, quality
+
+# Wells x months-on-production arrays of the production history.
+#
+# Row i is well `siglas[i]`; column 0 is the well's first month with oil or
+# gas production and every later calendar month has its own column, so gaps
+# in the reports stay as NaN and the column number is the months on
+# production. Rates are NaN where the well did not report or had no effective
+# time (tef = 0); cumulatives are carried over gaps and NaN after the last
+# reported month; `tef` is the effective days, NaN where the well did not
+# report; GOR, WGR and the rolling McCain label come from capiv_core.fluids.
+# A well has one row per month: repeated (sigla, anio, mes) rows are skipped
+# as in loaders.filter_producing (quality.DUPLICATE).
+# Saved as one .npy per array so it can be memory-mapped.
+
+RATES = ('oil_rate', 'gas_rate', 'water_rate')
+VOLUMES = {'oil_rate': 'prod_pet', 'gas_rate': 'prod_gas', 'water_rate': 'prod_agua'}
+CUMULATIVES = {'oil_rate': 'Np', 'gas_rate': 'Gp', 'water_rate': 'Wp'}
+
+
+class AlignedStore:
+
+    def __init__(self, siglas, first_month, last_month, arrays):
+        self.siglas = siglas
+        self.first_month = first_month  # months since year 0 of column 0
+        self.last_month = last_month  # last reported column per well
+        self.arrays = arrays
+        self.index = {sigla: i for i, sigla in enumerate(siglas.tolist())}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __len__(self):
+        return len(self.siglas)
+
+    @property
+    def n_months(self):
+        return self.arrays[RATES[0]].shape[1]
+
+    # Row positions of the given wells, skipping the ones not in the store
+    def rows(self, siglas):
+        return np.array([self.index[s] for s in siglas if s in self.index], dtype=np.int64)
+
+    # History of one well up to its last reported month
+    def well(self, sigla, names=RATES + tuple(CUMULATIVES.values())):
+        row = self.index[sigla]
+        n = self.last_month[row] + 1
+        history = {name: self.arrays[name][row, :n] for name in names}
+        history['counter'] = np.arange(1, n + 1)
+        return history
+
+
+def build(df):
+    month = (df['anio'].to_numpy() * 12 + df['mes'].to_numpy()).astype(np.int64)
+    codes, siglas = _factorize(df['sigla'].to_numpy())
+    unique = ~quality.duplicated(df)
+    hydrocarbons = unique & ((np.nan_to_num(df['prod_pet'].to_numpy(dtype=float)) > 0) |
+                             (np.nan_to_num(df['prod_gas'].to_numpy(dtype=float)) > 0))
+
+    first = np.full(len(siglas), np.iinfo(np.int64).max)
+    np.minimum.at(first, codes[hydrocarbons], month[hydrocarbons])
+    producing_wells = first < np.iinfo(np.int64).max
+
+    keep = unique & producing_wells[codes] & (month >= np.where(producing_wells, first, 0)[codes])
+    well_rows = np.cumsum(producing_wells) - 1
+    rows = well_rows[codes[keep]]
+    offset = month[keep] - first[codes[keep]]
+    n_wells = int(producing_wells.sum())
+    n_months = int(offset.max()) + 1 if keep.any() else 1
+
+    last = np.full(n_wells, -1)
+    np.maximum.at(last, rows, offset)
+    reported = np.zeros((n_wells, n_months), dtype=bool)
+    reported[rows, offset] = True
+    after_last = np.arange(n_months)[None, :] > last[:, None]
+
+    tef = df['tef'].to_numpy(dtype=float)[keep]
+    monthly_tef = np.zeros((n_wells, n_months))
+    monthly_tef[rows, offset] = np.nan_to_num(tef)
+    arrays = {'tef': np.where(reported, monthly_tef, np.nan)}
+    for rate_col in RATES:
+        volume = np.nan_to_num(df[VOLUMES[rate_col]].to_numpy(dtype=float)[keep])
+        monthly_volume = np.zeros((n_wells, n_months))
+        monthly_volume[rows, offset] = volume
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = monthly_volume / monthly_tef
+        arrays[rate_col] = np.where(reported & (monthly_tef > 0), rate, np.nan)
+
+        cumulative = np.cumsum(monthly_volume, axis=1)
+        cumulative[after_last] = np.nan
+        arrays[CUMULATIVES[rate_col]] = cumulative
+
+    fluids.add_arrays(arrays)
+    return AlignedStore(siglas[producing_wells], first[producing_wells], last, arrays)
+
+
+def _factorize(values):
+    siglas, codes = np.unique(values.astype(str), return_inverse=True)
+    return codes, siglas
+
+
+def save(store, path):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'siglas.npy'), store.siglas.astype(str))
+    np.save(os.path.join(path, 'first_month.npy'), store.first_month)
+    np.save(os.path.join(path, 'last_month.npy'), store.last_month)
+    for name, array in store.arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+    with open(os.path.join(path, 'arrays.json'), 'w') as f:
+        json.dump(sorted(store.arrays), f)
+    return path
+
+
+def load(path, mmap_mode='r'):
+    with open(os.path.join(path, 'arrays.json')) as f:
+        names = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in names}
+    return AlignedStore(
+        np.load(os.path.join(path, 'siglas.npy')),
+        np.load(os.path.join(path, 'first_month.npy')),
+        np.load(os.path.join(path, 'last_month.npy')),
+        arrays,
+    )
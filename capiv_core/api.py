@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from dateutil.relativedelta import relativedelta
+
+from capiv_core import aggregates, export, loaders, rankings, shared, views, wells
+
+try:
+    import uvicorn
+except ImportError:  # optional dependency: pip install uvicorn
+    uvicorn = None
+
+# Read-only JSON API over the shared snapshots, for tools that need the
+# numbers of the dashboards without running a page.
+#
+#   python -m capiv_core.api --port 8502        (or: uvicorn capiv_core.api:app)
+#
+#   GET /version                         dataset version and allocation months
+#   GET /metrics                         headline metrics of the last consolidated month
+#   GET /series/empresas?top=10          gas and oil rate per company and month
+#   GET /series/campanas                 gas and oil rate per campaign and month
+#   GET /series/areas?empresa=YPF        gas and oil rate per area and month of a company
+#   GET /pozos?empresa=YPF&limit=100     well summaries (peaks, cumulatives, EUR)
+#   GET /rankings?fluido=Gasífero&n=3    top wells per campaign by peak rate (VMUT)
+#   GET /export?anio=2024&formato=csv    bulk export (capiv_core.export), streamed
+#
+# The dataset version is the modification time of the snapshot files. Every
+# response carries an ETag derived from the version and the request, so a
+# poll with If-None-Match gets a 304 before anything is computed, and
+# Cache-Control lets clients and proxies reuse it until the snapshot is due
+# for a rebuild. Results are memoized per version.
+
+MAX_CACHED = 256  # memoized responses
+JSON = b'application/json; charset=utf-8'
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _param(query, name, default=None, kind=str, minimum=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = kind(values[-1])
+    except ValueError:
+        raise BadRequest(f"Invalid value for {name!r}: {values[-1]!r}")
+    if minimum is not None and value < minimum:
+        raise BadRequest(f"Invalid value for {name!r}: {value!r} (minimum {minimum})")
+    return value
+
+
+def _ints(query, name):
+    try:
+        return [int(value) for value in query[name]]
+    except ValueError:
+        raise BadRequest(f"Invalid value for {name!r}: {query[name]!r}")
+
+
+def _records(df):
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+class Dataset:
+
+    def __init__(self, sources=None, max_age=shared.MAX_AGE):
+        self.sources = {name: source for name, (source, _) in shared.SNAPSHOTS.items()}
+        self.sources.update(sources or {})
+        self.max_age = max_age
+        self._version = None
+        self._frames = {}
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Version of the snapshots, rebuilding the stale ones first
+    def version(self):
+        stamps = []
+        for name, source in self.sources.items():
+            path = shared.ensure(name, source, shared.SNAPSHOTS[name][1], self.max_age)
+            stamps.append(f"{name}:{os.stat(path).st_mtime_ns}")
+        version = hashlib.sha1(';'.join(stamps).encode('utf-8')).hexdigest()[:12]
+        with self._lock:
+            if version != self._version:
+                self._version, self._frames = version, {}
+                self._responses.clear()
+        return version
+
+    # Seconds until the oldest snapshot is due for a rebuild
+    def expires_in(self):
+        ages = [time.time() - os.path.getmtime(shared.snapshot_path(name, source))
+                for name, source in self.sources.items()]
+        return max(0, int(self.max_age - max(ages)))
+
+    # Frames are built outside the lock: one built while the version changed
+    # is returned to its caller but not kept for the new version
+    def _frame(self, name, build):
+        with self._lock:
+            version = self._version
+            if name in self._frames:
+                return self._frames[name]
+        frame = build()
+        with self._lock:
+            if self._version == version:
+                self._frames[name] = frame
+        return frame
+
+    def snapshot(self):
+        return self._frame('snapshot', lambda: shared.production_frame(self.sources['production'], self.max_age))
+
+    def months(self):
+        return self._frame('months', lambda: shared.production_month_index(self.snapshot()))
+
+    def production(self):
+        return self._frame('production', lambda: loaders.filter_producing(self.snapshot()))
+
+    def fluids(self):
+        return self._frame('fluids', lambda: wells.classify_mccain(self.production()))
+
+    def summaries(self):
+        return self._frame('summaries', lambda: wells.create_summary_dataframe(
+            wells.add_fluid_type(self.production(), self.fluids())
+        ))
+
+    def vmut(self):
+        def build():
+            df_frac = loaders.apply_frac_cutoffs(shared.frac_frame(self.sources['frac'], self.max_age))
+            df_merged = wells.merge_frac_fluids(df_frac, self.fluids())
+            return wells.filter_vmut(wells.merge_summary(df_merged, self.summaries()))
+        return self._frame('vmut', build)
+
+    # Memoized JSON body of a request (the key includes the version)
+    def response(self, key, compute):
+        with self._lock:
+            version = self._version
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                return self._responses[key]
+        body = json.dumps(compute(), ensure_ascii=False, default=str).encode('utf-8')
+        with self._lock:
+            if self._version != version:
+                return body
+            self._responses[key] = body
+            while len(self._responses) > MAX_CACHED:
+                self._responses.popitem(last=False)
+        return body
+
+
+# ---------------------------------------------------------------- endpoints
+
+def get_version(dataset, query):
+    latest_date_non_official, latest_date = aggregates.indexed_latest_dates(dataset.snapshot(), dataset.months())
+    return {
+        'version': dataset.version(),
+        'fecha_alocacion_en_progreso': latest_date_non_official.date().isoformat(),
+        'fecha_ultima_alocacion': latest_date.date().isoformat(),
+    }
+
+
+# Only the rows of the last consolidated month and of the same month a year
+# before are read (capiv_core.months)
+def get_metrics(dataset, query):
+    data_sorted, index = dataset.snapshot(), dataset.months()
+    latest_date_non_official, latest_date = aggregates.indexed_latest_dates(data_sorted, index)
+    metrics = aggregates.indexed_headline_metrics(data_sorted, index, latest_date)
+    year_before = latest_date - relativedelta(years=1)
+    metrics_year_before = aggregates.indexed_headline_metrics(data_sorted, index, year_before)
+    return {
+        'fecha_ultima_alocacion': latest_date.date().isoformat(),
+        'metrics': {k: float(v) for k, v in metrics.items()},
+        'fecha_interanual': year_before.date().isoformat(),
+        'metrics_interanual': {k: float(v) for k, v in metrics_year_before.items()},
+    }
+
+
+def get_company_series(dataset, query):
+    top_n = _param(query, 'top', 10, int, minimum=1)
+    return _records(aggregates.company_rates(dataset.production(), top_n=top_n))
+
+
+def get_campaign_series(dataset, query):
+    return _records(aggregates.start_year_rates(dataset.production()))
+
+
+def get_area_series(dataset, query):
+    empresa = _param(query, 'empresa')
+    if empresa is None:
+        raise BadRequest("Missing parameter 'empresa'")
+    company_data = views.rows(dataset.production(), empresaNEW=empresa)
+    return _records(company_data.groupby(['areayacimiento', 'date']).agg(
+        total_gas_rate=('gas_rate', 'sum'),
+        total_oil_rate=('oil_rate', 'sum')
+    ).reset_index())
+
+
+def get_wells(dataset, query):
+    offset = _param(query, 'offset', 0, int, minimum=0)
+    limit = _param(query, 'limit', 1000, int, minimum=0)
+    summary_df = dataset.summaries()
+    filters = {'empresaNEW': query.get('empresa'), 'sigla': query.get('sigla')}
+    if 'anio' in query:
+        filters['start_year'] = _ints(query, 'anio')
+    filters = {column: value for column, value in filters.items() if value is not None}
+    if filters:
+        summary_df = views.rows(summary_df, **filters)
+    return {'total': len(summary_df), 'pozos': _records(summary_df.iloc[offset:offset + limit])}
+
+
+def get_rankings(dataset, query):
+    fluids = {'Petrolífero': 'Qo_peak', 'Gasífero': 'Qg_peak'}
+    fluid = _param(query, 'fluido', 'Petrolífero')
+    if fluid not in fluids:
+        raise BadRequest(f"Unknown fluido {fluid!r}, expected one of {list(fluids)}")
+    n = _param(query, 'n', 3, int, minimum=1)
+    return _records(rankings.peak_rate_top(dataset.vmut(), fluid, fluids[fluid], n=n))
+
+
+ROUTES = {
+    '/version': get_version,
+    '/metrics': get_metrics,
+    '/series/empresas': get_company_series,
+    '/series/campanas': get_campaign_series,
+    '/series/areas': get_area_series,
+    '/pozos': get_wells,
+    '/rankings': get_rankings,
+}
+
+# Export filters: query parameter -> column of the production snapshot
+EXPORT_FILTERS = {'empresa': 'empresaNEW', 'area': 'areayacimiento', 'anio': 'anio', 'sigla': 'sigla'}
+
+
+def _export_filters(query):
+    filters = {}
+    for name, column in EXPORT_FILTERS.items():
+        if name in query:
+            filters[column] = _ints(query, name) if name == 'anio' else query[name]
+    return filters
+
+
+# -------------------------------------------------------------------- ASGI
+
+class App:
+
+    def __init__(self, dataset=None):
+        self.dataset = dataset or Dataset()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        loop = asyncio.get_running_loop()
+        method, path = scope['method'], scope['path'].rstrip('/') or '/'
+        query = parse_qs(scope['query_string'].decode('utf-8'))
+        if method not in ('GET', 'HEAD'):
+            return await _send(send, 405, _error("Read-only API: GET and HEAD only"), extra=[(b'allow', b'GET, HEAD')])
+        if path not in ROUTES and path != '/export':
+            return await _send(send, 404, _error(f"Unknown path {path!r}, expected one of {sorted(ROUTES) + ['/export']}"))
+
+        try:
+            version = await loop.run_in_executor(None, self.dataset.version)
+        except Exception as e:
+            return await _send(send, 503, _error(f"Data not available: {e}"))
+        key = json.dumps([version, path, sorted(query.items())], ensure_ascii=False)
+        etag = b'W/"' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20].encode() + b'"'
+        headers = [
+            (b'etag', etag),
+            (b'cache-control', f"public, max-age={self.dataset.expires_in()}".encode()),
+            (b'x-capiv-version', version.encode()),
+        ]
+        if etag in _header(scope, b'if-none-match'):
+            return await _send(send, 304, b'', headers)
+
+        try:
+            if path == '/export':
+                return await self._export(send, query, headers, method == 'HEAD', loop)
+            body = await loop.run_in_executor(
+                None, self.dataset.response, key, lambda: ROUTES[path](self.dataset, query)
+            )
+        except BadRequest as e:
+            return await _send(send, 400, _error(str(e)))
+        await _send(send, 200, body, headers, head_only=method == 'HEAD')
+
+    async def _export(self, send, query, headers, head_only, loop):
+        fmt = _param(query, 'formato', 'csv')
+        if fmt not in export.FORMATS:
+            raise BadRequest(f"Unknown formato {fmt!r}, expected one of {list(export.FORMATS)}")
+        filters = _export_filters(query)
+        headers = headers + [(b'content-disposition', f'attachment; filename="capiv_exportacion_{fmt}.zip"'.encode())]
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/zip')] + headers})
+        if not head_only:
+            table = await loop.run_in_executor(None, shared.arrow_table, 'production', self.dataset.sources['production'])
+            parts = export.stream(table, filters, fmt)
+            # Every chunk is compressed in a worker thread and sent as it is ready
+            while True:
+                part = await loop.run_in_executor(None, next, parts, None)
+                if part is None:
+                    break
+                await send({'type': 'http.response.body', 'body': part, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def _header(scope, name):
+    values = [value for key, value in scope['headers'] if key == name]
+    return [tag.strip() for value in values for tag in value.split(b',')]
+
+
+def _error(message):
+    return json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+
+
+async def _send(send, status, body, headers=(), extra=(), head_only=False):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', JSON), (b'content-length', str(len(body)).encode())] + list(headers) + list(extra),
+    })
+    await send({'type': 'http.response.body', 'body': b'' if head_only else body})
+
+
+app = App()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the Capítulo IV snapshots")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args(argv)
+    if uvicorn is None:
+        raise ImportError("Serving the API needs the `uvicorn` package (pip install uvicorn)")
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
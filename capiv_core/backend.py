@@ -0,0 +1,54 @@
+import functools
+import importlib
+import os
+from contextlib import contextmanager
+
+# Execution backend of the derivation pipeline.
+#
+# The loaders and wells functions marked @backend.pluggable run as written
+# with the default 'pandas' backend. With 'polars' (CAPIV_BACKEND=polars in
+# the environment, or backend.use('polars') in scripts) the call goes to the
+# function of the same name in capiv_core.polars_backend, which returns the
+# same pandas frame computed by one lazy, multi-threaded Polars query.
+# benchmarks/parity.py checks that both backends give identical frames.
+
+BACKENDS = ('pandas', 'polars')
+
+
+def _checked(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {BACKENDS}")
+    return name
+
+
+_current = _checked(os.environ.get('CAPIV_BACKEND', 'pandas'))
+
+
+def current():
+    return _current
+
+
+def set_backend(name):
+    global _current
+    _current = _checked(name)
+
+
+# Temporarily switch backends (process-wide, meant for scripts and benchmarks)
+@contextmanager
+def use(name):
+    previous = _current
+    set_backend(name)
+    try:
+        yield
+    finally:
+        set_backend(previous)
+
+
+def pluggable(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current == 'pandas':
+            return func(*args, **kwargs)
+        module = importlib.import_module(f'capiv_core.{_current}_backend')
+        return getattr(module, func.__name__)(*args, **kwargs)
+    return wrapper
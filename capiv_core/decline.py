@@ -0,0 +1,239 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from capiv_core import aligned
+
+# Arps decline-curve fits for every well at once.
+#
+# Monthly rates are laid out as a wells x months-on-production array and each
+# well is fitted from its peak month onwards, in log space, with a
+# Levenberg-Marquardt loop that works on all wells together (one 3x3 solve per
+# well per iteration, batched with numpy). Models:
+#
+#   exponential  q = qi * exp(-Di * t)                       (closed form)
+#   hyperbolic   q = qi / (1 + b * Di * t) ** (1 / b)
+#   modified     hyperbolic fit, switching to an exponential tail once the
+#                instantaneous decline drops to `d_lim` (used for the forecast)
+#
+# t is in months from the peak, Di is nominal per month and qi is in the units
+# of the rate column (m3/d for oil and water, km3/d for gas).
+
+MODELS = ('exponential', 'hyperbolic', 'modified')
+DAYS_PER_MONTH = 30.4375
+B_BOUNDS = (0.01, 2.0)
+D_LIM = -np.log(1 - 0.10) / 12  # 10 %/year effective terminal decline, nominal per month
+MIN_POINTS = 3
+
+
+# Row positions of the monthly rows in a wells x months-on-production layout,
+# month 0 being each well's first month with a positive rate
+def month_layout(df, rate_col):
+    codes, siglas = pd.factorize(df['sigla'])
+    month = (df['anio'].to_numpy() * 12 + df['mes'].to_numpy()).astype(np.int64)
+    rate = df[rate_col].to_numpy(dtype=float)
+    producing = np.isfinite(rate) & (rate > 0)
+
+    first = np.full(len(siglas), np.iinfo(np.int64).max)
+    np.minimum.at(first, codes[producing], month[producing])
+    has_production = first < np.iinfo(np.int64).max
+
+    keep = producing & has_production[codes]
+    offset = month[keep] - first[codes[keep]]
+    n_months = int(offset.max()) + 1 if keep.any() else 1
+    return np.asarray(siglas), codes, keep, offset, n_months
+
+
+# Dense wells x months-on-production arrays from the monthly rows
+def rate_matrix(df, rate_col, volume_col=None):
+    siglas, codes, keep, offset, n_months = month_layout(df, rate_col)
+    q = np.full((len(siglas), n_months), np.nan)
+    q[codes[keep], offset] = df[rate_col].to_numpy(dtype=float)[keep]
+
+    produced = np.zeros(len(siglas))
+    if volume_col is not None:
+        volume = np.nan_to_num(df[volume_col].to_numpy(dtype=float))
+        np.add.at(produced, codes, volume)
+    else:
+        produced = np.nansum(q, axis=1) * DAYS_PER_MONTH
+    return siglas, q, produced
+
+
+def _log_model(p, t):
+    log_qi, log_di, b = p[:, 0:1], p[:, 1:2], p[:, 2:3]
+    x = b * np.exp(log_di) * t
+    return log_qi - np.log1p(x) / b
+
+
+def _jacobian(p, t):
+    di, b = np.exp(p[:, 1:2]), p[:, 2:3]
+    x = b * di * t
+    return np.stack([
+        np.ones_like(t),
+        -di * t / (1 + x),
+        np.log1p(x) / b ** 2 - di * t / (b * (1 + x)),
+    ], axis=-1)
+
+
+def _sse(p, t, log_q, w):
+    r = np.where(w, log_q - _log_model(p, t), 0.0)
+    return (r ** 2).sum(axis=1)
+
+
+# Weighted least squares of log q on t per well: the exponential fit and the
+# starting point of the hyperbolic one
+def _fit_exponential(t, log_q, w):
+    n = w.sum(axis=1)
+    tw = np.where(w, t, 0.0)
+    yw = np.where(w, log_q, 0.0)
+    t_mean = tw.sum(axis=1) / n
+    y_mean = yw.sum(axis=1) / n
+    stt = (np.where(w, t - t_mean[:, None], 0.0) ** 2).sum(axis=1)
+    sty = (np.where(w, (t - t_mean[:, None]) * (log_q - y_mean[:, None]), 0.0)).sum(axis=1)
+    slope = sty / np.where(stt > 0, stt, np.nan)
+    di = np.clip(-slope, 1e-4, None)
+    return y_mean + di * t_mean, di
+
+
+def _fit_hyperbolic(t, log_q, w, log_qi, di, max_iter=100, tol=1e-8):
+    p = np.column_stack([log_qi, np.log(di), np.full(len(di), 0.5)])
+    sse = _sse(p, t, log_q, w)
+    lam = np.full(len(p), 1e-2)
+    eye = np.eye(3)
+
+    # Wells drop out of the batch as soon as they converge
+    active = np.arange(len(p))
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        pa, ta, ya, wa = p[active], t[active], log_q[active], w[active]
+        r = np.where(wa, ya - _log_model(pa, ta), 0.0)
+        J = _jacobian(pa, ta) * wa[..., None]
+        JtJ = np.einsum('wti,wtj->wij', J, J)
+        Jtr = np.einsum('wti,wt->wi', J, r)
+        A = JtJ + lam[active, None, None] * (JtJ * eye + 1e-9 * eye)
+        step = np.linalg.solve(A, Jtr[..., None])[..., 0]
+
+        candidate = pa + step
+        candidate[:, 2] = np.clip(candidate[:, 2], *B_BOUNDS)
+        candidate[:, 1] = np.clip(candidate[:, 1], np.log(1e-5), np.log(5.0))
+        candidate_sse = _sse(candidate, ta, ya, wa)
+
+        better = candidate_sse < sse[active]
+        improvement = (sse[active] - candidate_sse) / (1 + sse[active])
+        p[active[better]] = candidate[better]
+        sse[active[better]] = candidate_sse[better]
+        lam[active] = np.where(better, lam[active] / 3, lam[active] * 3)
+
+        done = (better & (improvement < tol)) | (lam[active] > 1e8)
+        active = active[~done]
+    return p, sse
+
+
+# Rate on a wells x months grid of t (months from peak)
+def rate(qi, di, b, t, model='hyperbolic', d_lim=D_LIM):
+    qi, di, b = qi[:, None], di[:, None], b[:, None]
+    if model == 'exponential':
+        return qi * np.exp(-di * t)
+    q = qi / (1 + b * di * t) ** (1 / b)
+    if model == 'modified':
+        t_switch = np.maximum((di / d_lim - 1) / (b * di), 0)
+        q_switch = qi / (1 + b * di * t_switch) ** (1 / b)
+        q = np.where(t > t_switch, q_switch * np.exp(-d_lim * (t - t_switch)), q)
+    return q
+
+
+def _fit_block(q, model, horizon, q_limit, d_lim):
+    n_wells, n_months = q.shape
+    months = np.arange(n_months)[None, :]
+    filled = np.where(np.isfinite(q), q, -np.inf)
+    peak = np.where(np.isfinite(q).any(axis=1), filled.argmax(axis=1), 0)
+    last = np.where(np.isfinite(q), months, -1).max(axis=1)
+
+    t = (months - peak[:, None]).astype(float)
+    w = np.isfinite(q) & (q > 0) & (t >= 0)
+    t = np.where(w, t, 0.0)  # months before the peak or without production are masked out
+    log_q = np.log(np.where(w, q, 1.0))
+    n_points = w.sum(axis=1)
+    ok = n_points >= MIN_POINTS
+
+    log_qi = np.full(n_wells, np.nan)
+    di = np.full(n_wells, np.nan)
+    b = np.zeros(n_wells)
+    sse = np.full(n_wells, np.nan)
+    if ok.any():
+        log_qi[ok], di[ok] = _fit_exponential(t[ok], log_q[ok], w[ok])
+        if model == 'exponential':
+            p = np.column_stack([log_qi[ok], np.log(di[ok]), np.full(ok.sum(), 1e-12)])
+            sse[ok] = ((np.where(w[ok], log_q[ok] - (p[:, 0:1] - di[ok][:, None] * t[ok]), 0.0)) ** 2).sum(axis=1)
+        else:
+            p, sse[ok] = _fit_hyperbolic(t[ok], log_q[ok], w[ok], log_qi[ok], di[ok])
+            log_qi[ok], di[ok], b[ok] = p[:, 0], np.exp(p[:, 1]), p[:, 2]
+    qi = np.exp(log_qi)
+
+    # R² of the fit in log space
+    log_mean = np.where(w, log_q, 0.0).sum(axis=1) / np.maximum(n_points, 1)
+    sst = (np.where(w, log_q - log_mean[:, None], 0.0) ** 2).sum(axis=1)
+    r2 = np.where(ok & (sst > 0), 1 - sse / np.where(sst > 0, sst, 1), np.nan)
+
+    # Remaining volume from the month after the last one reported up to
+    # `horizon` months on production, while the rate stays above `q_limit`
+    future = last[:, None] + 1 + np.arange(max(horizon, 1))[None, :]
+    t_future = (future - peak[:, None]).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        q_future = rate(np.nan_to_num(qi), np.nan_to_num(di), np.where(b > 0, b, 1e-12), t_future, model, d_lim)
+    q_future = np.where((future < horizon) & (q_future >= q_limit), q_future, 0.0)
+    remaining = np.where(ok, q_future.sum(axis=1) * DAYS_PER_MONTH, np.nan)
+
+    return {
+        'qi': qi, 'Di': di, 'b': np.where(ok, b, np.nan), 'r2': r2,
+        'n_meses': n_points, 'mes_pico': peak, 'meses_producidos': last + 1,
+        'remanente': remaining,
+    }
+
+
+# Fits for a wells x months rate array; `produced` is the volume to date per well
+def fit_matrix(siglas, q, produced, model='hyperbolic', horizon=360, q_limit=0.0,
+               d_lim=D_LIM, workers=None, chunk_size=2000):
+    if model not in MODELS:
+        raise ValueError(f"unknown model {model!r}, expected one of {MODELS}")
+
+    blocks = [q[i:i + chunk_size] for i in range(0, len(q), chunk_size)] or [q]
+    args = (model, horizon, q_limit, d_lim)
+
+    if workers and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_fit_block, blocks, *[[a] * len(blocks) for a in args]))
+    else:
+        parts = [_fit_block(block, *args) for block in blocks]
+
+    fits = pd.DataFrame({k: np.concatenate([part[k] for part in parts]) for k in parts[0]})
+    fits.insert(0, 'sigla', siglas)
+    fits.insert(1, 'modelo', model)
+    fits['acumulada'] = produced
+    fits['EUR'] = produced + fits.pop('remanente')
+    return fits
+
+
+# Fits from the monthly production rows
+def fit_declines(df, rate_col='oil_rate', model='hyperbolic', **kwargs):
+    siglas, q, produced = rate_matrix(df, rate_col, aligned.VOLUMES.get(rate_col))
+    return fit_matrix(siglas, q, produced, model, **kwargs)
+
+
+# Fits from an aligned.AlignedStore, slicing its arrays instead of regrouping rows
+def fit_store(store, rate_col='oil_rate', model='hyperbolic', **kwargs):
+    cumulative = store[aligned.CUMULATIVES[rate_col]]
+    produced = np.nan_to_num(cumulative[np.arange(len(store)), store.last_month])
+    return fit_matrix(store.siglas, store[rate_col], produced, model, **kwargs)
+
+
+# Fitted/forecast rates of one well, months on production on the x axis
+def forecast_curve(fit, months=360, d_lim=D_LIM):
+    t_axis = np.arange(months)
+    t = (t_axis - fit['mes_pico']).astype(float)[None, :]
+    model = fit['modelo']
+    b = np.array([fit['b'] if fit['b'] > 0 else 1e-12])
+    q = rate(np.array([fit['qi']]), np.array([fit['Di']]), b, t, model, d_lim)[0]
+    return pd.DataFrame({'counter': t_axis[t[0] >= 0] + 1, 'rate': q[t[0] >= 0]})
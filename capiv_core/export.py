@@ -0,0 +1,212 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from capiv_core import loaders, shared, views, wells
+
+# Bulk export of the production snapshot as a zip with two members: the
+# monthly rows matching a filter (produccion) and one summary row per well
+# with matching rows (pozos), as gzipped CSV or zstd Parquet.
+#
+# The memory-mapped snapshot is read a few hundred wells at a time: every
+# chunk is filtered, compressed and written before the next one is read, so
+# memory holds one chunk and the summaries (one row per well), never the
+# matching rows. `stream` yields the zip as it is written (for HTTP
+# responses), `write` writes it to a file object and `cached` keeps one file
+# per snapshot version and filter.
+#
+#   export.write(open('ypf.zip', 'wb'), shared.arrow_table('production'), {'empresaNEW': 'YPF', 'anio': [2023]})
+#   python -m capiv_core.export --empresa YPF --anio 2023 --formato parquet -o ypf.zip
+#
+# Filters map columns to a value (equality) or a list (membership), as in
+# capiv_core.views.mask. The summaries cover the whole history of each well,
+# not only the exported months.
+
+FORMATS = {'csv': 'csv.gz', 'parquet': 'parquet'}  # format -> member extension
+CHUNK_WELLS = 500
+EXPORT_DIR = os.path.join(shared.SNAPSHOT_DIR, 'exports')
+
+
+# Row positions of the wells of `table`, CHUNK_WELLS wells at a time (the
+# snapshot is not necessarily sorted by well)
+def well_chunks(table, chunk_wells=CHUNK_WELLS):
+    if table.num_rows == 0:
+        return
+    codes = table.column('sigla').combine_chunks().dictionary_encode().indices
+    codes = codes.to_numpy(zero_copy_only=False)
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.diff(codes[order], prepend=-1))
+    for first in range(0, len(starts), chunk_wells):
+        stop = starts[first + chunk_wells] if first + chunk_wells < len(starts) else len(order)
+        yield order[starts[first]:stop]
+
+
+# Summary of every well in `df` (peaks, cumulatives, EUR and McCain fluid)
+def well_summary(df):
+    producing = loaders.filter_producing(df)
+    cum_df = wells.classify_mccain(producing)
+    summary_df = wells.create_summary_dataframe(wells.add_fluid_type(producing, cum_df))
+    return summary_df.merge(cum_df[['sigla', 'Fluido McCain', 'GOR']], on='sigla', how='left')
+
+
+# (matching rows, summary of their wells) for every chunk with matches
+def chunks(table, filters=None, chunk_wells=CHUNK_WELLS):
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    for positions in well_chunks(table, chunk_wells):
+        chunk = table.take(positions)
+        selected = views.mask(chunk.select(list(filters)).to_pandas(), **filters) if filters else None
+        if selected is not None and not selected.any():
+            continue
+        df = chunk.to_pandas()
+        rows = df if selected is None else df.take(np.flatnonzero(selected))
+        # Whole history of the matching wells, for the summaries
+        history = views.rows(df, sigla=rows['sigla'].unique())
+        yield rows, well_summary(history)
+
+
+class _Pipe(io.RawIOBase):
+    # Write-only file that keeps what was written until it is drained
+    def __init__(self):
+        self._parts = []
+        self._written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._written
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _member(name):
+    return zipfile.ZipInfo(name, time.localtime()[:6])
+
+
+def _csv(df, header):
+    return df.to_csv(index=False, header=header).encode('utf-8')
+
+
+# Writes the zip to `sink`, yielding after every chunk; returns (rows, wells)
+def _export(sink, table, filters, fmt, chunk_wells):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {tuple(FORMATS)}")
+    summaries = []
+    n_rows = 0
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        # The members are compressed already: stored as they are
+        with archive.open(_member(f"produccion.{FORMATS[fmt]}"), 'w', force_zip64=True) as member:
+            if fmt == 'csv':
+                writer = gzip.GzipFile(fileobj=member, mode='wb')
+                writer.write(_csv(table.schema.empty_table().to_pandas(), header=True))
+            else:
+                writer = pq.ParquetWriter(member, table.schema, compression='zstd')
+            for rows, summary_df in chunks(table, filters, chunk_wells):
+                if fmt == 'csv':
+                    writer.write(_csv(rows, header=False))
+                else:
+                    writer.write_table(pa.Table.from_pandas(rows, schema=table.schema, preserve_index=False))
+                n_rows += len(rows)
+                summaries.append(summary_df)
+                yield
+            writer.close()
+
+        summary_df = pd.concat(summaries, ignore_index=True) if summaries else pd.DataFrame()
+        with archive.open(_member(f"pozos.{FORMATS[fmt]}"), 'w') as member:
+            if fmt == 'csv':
+                member.write(gzip.compress(_csv(summary_df, header=True)))
+            else:
+                pq.write_table(pa.Table.from_pandas(summary_df, preserve_index=False), member, compression='zstd')
+    return n_rows, len(summary_df)
+
+
+# Write the export to a binary file object; returns (rows, wells)
+def write(fileobj, table, filters=None, fmt='csv', chunk_wells=CHUNK_WELLS):
+    steps = _export(fileobj, table, filters, fmt, chunk_wells)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+# The export as a sequence of bytes, one part per chunk of wells
+def stream(table, filters=None, fmt='csv', chunk_wells=CHUNK_WELLS):
+    pipe = _Pipe()
+    for _ in _export(pipe, table, filters, fmt, chunk_wells):
+        data = pipe.drain()
+        if data:
+            yield data
+    data = pipe.drain()
+    if data:
+        yield data
+
+
+# Path of the export of the production snapshot for `filters`, written once
+# per snapshot version, filter and format and shared by all sessions
+def cached(filters=None, fmt='csv', source=loaders.PRODUCTION_URL, max_age=shared.MAX_AGE):
+    table = shared.arrow_table('production', source, max_age)
+    snapshot = shared.snapshot_path('production', source)
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    key = json.dumps([os.stat(snapshot).st_mtime_ns, fmt, sorted(filters.items())], default=str)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+    path = os.path.join(EXPORT_DIR, f"{os.path.basename(snapshot)[:-len('.arrow')]}-{digest}.zip")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            write(f, table, filters, fmt)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export production rows and well summaries of the snapshot")
+    parser.add_argument('--empresa', nargs='*', help="operadoras (nombre normalizado, empresaNEW)")
+    parser.add_argument('--area', nargs='*', help="áreas de yacimiento")
+    parser.add_argument('--anio', nargs='*', type=int, help="años")
+    parser.add_argument('--sigla', nargs='*', help="siglas de los pozos")
+    parser.add_argument('--formato', choices=list(FORMATS), default='csv')
+    parser.add_argument('-o', '--output', required=True, help="archivo .zip ('-' para la salida estándar)")
+    args = parser.parse_args(argv)
+
+    filters = {'empresaNEW': args.empresa, 'areayacimiento': args.area, 'anio': args.anio, 'sigla': args.sigla}
+    table = shared.arrow_table('production')
+    if args.output == '-':
+        for part in stream(table, filters, args.formato):
+            sys.stdout.buffer.write(part)
+        return 0
+    with open(args.output, 'wb') as f:
+        n_rows, n_wells = write(f, table, filters, args.formato)
+    print(f"{args.output}: {n_rows} rows, {n_wells} wells", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
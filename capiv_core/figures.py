@@ -0,0 +1,54 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Figure builders shared by the pages and the headless report
+
+LEGEND_BELOW = dict(
+    orientation="h",  # Horizontal legend
+    yanchor="top",  # Position the legend at the top
+    y=-0.3,  # Position the legend further above the plot area
+    xanchor="center",  # Center the legend horizontally
+    x=0.5,  # Center the legend horizontally
+    font=dict(size=10)  # Adjust font size to fit space
+)
+
+
+# Stacked area chart of a monthly rate split by `color`
+def area_chart(df, y, color, title, yaxis_title, legend_title):
+    fig = px.area(df, x='date', y=y, color=color, title=title)
+    fig.update_layout(
+        xaxis_title="Fecha",
+        yaxis_title=yaxis_title,
+        legend_title=legend_title,
+        legend=LEGEND_BELOW,
+    )
+    return fig
+
+
+def log_y(fig):
+    fig.update_layout(yaxis=dict(type='log', dtick=1))
+    return fig
+
+
+# Hexagon map of a cell metric (see capiv_core.hexmap)
+def hex_map(cells, geojson, value, title, colorbar_title, center, zoom):
+    fig = go.Figure(go.Choroplethmapbox(
+        geojson=geojson,
+        locations=cells['celda'],
+        z=cells[value],
+        colorscale='Viridis',
+        marker_opacity=0.6,
+        marker_line_width=0,
+        colorbar_title=colorbar_title,
+        customdata=cells[['n_pozos']],
+        hovertemplate='%{z:,.1f}<br>%{customdata[0]} pozos<extra></extra>',
+    ))
+    fig.update_layout(
+        title=title,
+        mapbox_style='carto-positron',
+        mapbox_center=dict(lon=center[0], lat=center[1]),
+        mapbox_zoom=zoom,
+        margin=dict(l=0, r=0, t=40, b=0),
+        height=600,
+    )
+    return fig
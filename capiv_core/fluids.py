@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Month-by-month fluid classification of every well.
+#
+# Works on the wells x months arrays of capiv_core.aligned: monthly volumes
+# are the differences of the cumulatives, GOR and WGR are computed for every
+# well and month at once, and the McCain label of each month uses the
+# volumes of a trailing window, so a black-oil well that goes gassy changes
+# label when it does instead of carrying one lifetime label. The labels are
+# stored in the aligned store as int8 codes (FLUIDS, -1 = no production in
+# the window).
+
+FLUIDS = ('Petrolífero', 'Gasífero')
+GOR_LIMIT = 3000.0  # m3/m3, McCain
+WINDOW = 6  # months
+
+
+# Monthly volumes from a cumulative array (0 in months without a report)
+def monthly_volumes(cumulative):
+    volume = np.diff(np.nan_to_num(cumulative), axis=1, prepend=0.0)
+    return np.where(np.isnan(cumulative), np.nan, volume)
+
+
+# Volumes over the trailing `window` months, current month included
+def _rolling(cumulative, window):
+    filled = np.where(np.isnan(cumulative), 0.0, cumulative)
+    shifted = np.zeros_like(filled)
+    shifted[:, window:] = filled[:, :-window]
+    return np.where(np.isnan(cumulative), np.nan, filled - shifted)
+
+
+# Monthly GOR (m3/m3) and WGR (m3/Mm3) arrays, NaN where undefined
+def monthly_ratios(arrays):
+    oil, gas, water = (monthly_volumes(arrays[name]) for name in ('Np', 'Gp', 'Wp'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gor = np.where(oil > 0, gas / oil * 1000, np.nan)
+        wgr = np.where(gas > 0, water / gas * 1000, np.nan)
+    return gor, wgr
+
+
+# McCain label code per well and month from the trailing window volumes
+def rolling_mccain(arrays, window=WINDOW):
+    oil = _rolling(arrays['Np'], window)
+    gas = _rolling(arrays['Gp'], window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gassy = (oil <= 0) | (gas / oil * 1000 > GOR_LIMIT)
+    producing = (np.nan_to_num(oil) > 0) | (np.nan_to_num(gas) > 0)
+    return np.where(producing, np.where(gassy, 1, 0), -1).astype(np.int8)
+
+
+# Arrays added to the aligned store at build time
+def add_arrays(arrays, window=WINDOW):
+    arrays['GOR'], arrays['WGR'] = monthly_ratios(arrays)
+    arrays['fluido'] = rolling_mccain(arrays, window)
+    return arrays
+
+
+# Monthly oil and gas volumes split by each well's label in that month;
+# `rows` limits the wells (store row positions)
+def volumes_by_fluid(store, rows=None):
+    rows = np.arange(len(store)) if rows is None else np.asarray(rows, dtype=np.int64)
+    labels = np.asarray(store['fluido'])[rows]
+    month = store.first_month[rows, None] + np.arange(store.n_months)[None, :]
+
+    first = int(month.min()) if len(rows) else 0
+    n_months = int(month.max()) - first + 1 if len(rows) else 0
+    labelled = labels >= 0
+    key = (month[labelled] - first) * len(FLUIDS) + labels[labelled]
+
+    frame = {}
+    for column, cumulative in (('prod_pet', 'Np'), ('prod_gas', 'Gp')):
+        volume = np.nan_to_num(monthly_volumes(np.asarray(store[cumulative])[rows]))[labelled]
+        frame[column] = np.bincount(key, weights=volume, minlength=n_months * len(FLUIDS))
+
+    months = np.repeat(np.arange(n_months) + first, len(FLUIDS))
+    volumes = pd.DataFrame({
+        'date': pd.to_datetime(dict(year=(months - 1) // 12, month=(months - 1) % 12 + 1, day=1)),
+        'fluido': np.tile(FLUIDS, n_months),
+        **frame,
+    })
+    return volumes[(volumes['prod_pet'] > 0) | (volumes['prod_gas'] > 0)].reset_index(drop=True)
+
+
+# First and latest label of each well and the first month (months on
+# production) it was labelled gas after starting as oil
+def label_changes(store, rows=None):
+    rows = np.arange(len(store)) if rows is None else np.asarray(rows, dtype=np.int64)
+    labels = np.asarray(store['fluido'])[rows]
+    labelled = labels >= 0
+    any_label = labelled.any(axis=1)
+    first = labels[np.arange(len(rows)), labelled.argmax(axis=1)]
+    last_col = labels.shape[1] - 1 - labelled[:, ::-1].argmax(axis=1)
+    latest = labels[np.arange(len(rows)), last_col]
+
+    went_gassy = any_label & (first == 0) & (labels == 1).any(axis=1)
+    switch = np.where(went_gassy, (labels == 1).argmax(axis=1), -1)
+    names = np.array(FLUIDS + ('',), dtype=object)
+    return pd.DataFrame({
+        'sigla': store.siglas[rows],
+        'fluido_inicial': names[np.where(any_label, first, -1)],
+        'fluido_actual': names[np.where(any_label, latest, -1)],
+        'mes_cambio_a_gas': np.where(went_gassy, switch + 1, np.nan),
+    })
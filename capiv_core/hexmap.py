@@ -0,0 +1,104 @@
+import numpy as np
+
+# Hexagonal bins of well metrics for the map view.
+#
+# Wells are binned server-side in pointy-top hexagons over the local metric
+# projection of capiv_core.spatial, once per zoom level, so the map only ships
+# the aggregated cells inside the viewport instead of one marker per well.
+#
+#   layers = hexmap.build_layers(index, wells)
+#   cells = hexmap.visible(layers[8], hexmap.viewport(-68.9, -38.4, 8))
+#   shapes = hexmap.geojson(cells, index, hexmap.LEVELS[8])
+
+# Map zoom level -> hexagon size (centre to vertex, metres)
+LEVELS = {6: 16000.0, 7: 8000.0, 8: 4000.0, 9: 2000.0, 10: 1000.0}
+
+# Cell column -> (well column, aggregation)
+METRICS = {
+    'n_pozos': ('sigla', 'count'),
+    'Qo_peak_p50': ('Qo_peak', 'median'),
+    'Qg_peak_p50': ('Qg_peak', 'median'),
+    'Np_total': ('Np', 'sum'),
+    'Gp_total': ('Gp', 'sum'),
+}
+
+SQRT3 = np.sqrt(3.0)
+TILE_PX = 512  # mapbox GL tile size
+
+
+# Axial (q, r) coordinates of the hexagon containing each point
+def hex_cells(x, y, size):
+    q = (SQRT3 / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+
+    # Cube rounding: the coordinate with the largest rounding error is
+    # recomputed from the other two
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def hex_centers(q, r, size):
+    return size * SQRT3 * (q + r / 2), size * 1.5 * r
+
+
+# One table of cells per zoom level: id, axial coordinates, centre and the
+# METRICS of the wells inside. `wells` has one row per sigla.
+def build_layers(index, wells, levels=LEVELS):
+    wells = wells.drop_duplicates(subset='sigla')
+    located = [sigla in index.index for sigla in wells['sigla']]
+    wells = wells[located]
+    rows = np.array([index.index[sigla] for sigla in wells['sigla']], dtype=np.int64)
+    x, y = index.x[rows], index.y[rows]
+
+    layers = {}
+    for zoom, size in levels.items():
+        q, r = hex_cells(x, y, size)
+        cells = wells.assign(q=q, r=r).groupby(['q', 'r']).agg(**METRICS).reset_index()
+        center_x, center_y = hex_centers(cells['q'].to_numpy(), cells['r'].to_numpy(), size)
+        cells['lon'], cells['lat'] = index.unproject(center_x, center_y)
+        cells.insert(0, 'celda', cells['q'].astype(str) + ',' + cells['r'].astype(str))
+        layers[zoom] = cells
+    return layers
+
+
+# (lon_min, lat_min, lon_max, lat_max) shown by a web-mercator map of the
+# given size in pixels centred on (lon, lat)
+def viewport(lon, lat, zoom, width_px=900, height_px=600):
+    lon_span = 360.0 * width_px / (TILE_PX * 2 ** zoom)
+    lat_span = lon_span * height_px / width_px * np.cos(np.deg2rad(lat))
+    return lon - lon_span / 2, lat - lat_span / 2, lon + lon_span / 2, lat + lat_span / 2
+
+
+# Cells with their centre inside the bounds, plus a margin so partially
+# visible hexagons at the edges are kept
+def visible(cells, bounds, margin=0.1):
+    lon_min, lat_min, lon_max, lat_max = bounds
+    pad_lon, pad_lat = (lon_max - lon_min) * margin, (lat_max - lat_min) * margin
+    inside = cells['lon'].between(lon_min - pad_lon, lon_max + pad_lon) & \
+        cells['lat'].between(lat_min - pad_lat, lat_max + pad_lat)
+    return cells[inside]
+
+
+# GeoJSON hexagons of the given cells, keyed by `celda`
+def geojson(cells, index, size):
+    center_x, center_y = hex_centers(cells['q'].to_numpy(), cells['r'].to_numpy(), size)
+    angles = np.deg2rad(30 + 60 * np.arange(7))  # closed ring
+    lon, lat = index.unproject(
+        center_x[:, None] + size * np.cos(angles)[None, :],
+        center_y[:, None] + size * np.sin(angles)[None, :],
+    )
+    features = [
+        {
+            'type': 'Feature',
+            'id': cell,
+            'geometry': {'type': 'Polygon', 'coordinates': [np.column_stack([x, y]).round(5).tolist()]},
+        }
+        for cell, x, y in zip(cells['celda'], lon, lat)
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
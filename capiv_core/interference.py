@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Parent-child relations between wells for completion strategy analysis.
+#
+# A child is a well whose first month with production comes at least
+# `min_lag` months after that of a producing well (its parent) within
+# `radius_m` of its surface location. Parent depletion at the child's start is
+# the parent's cumulative up to the month before the child's first month.
+# Candidate pairs come from the grid join of capiv_core.spatial and start
+# months and cumulatives from capiv_core.aligned, so no all-pairs distance
+# matrix or per-well regrouping is needed.
+#
+#   pairs = interference.parent_child_pairs(index, store, children=frac_siglas)
+#   roles = interference.tag_wells(pairs, frac_siglas)
+
+RADIUS_M = 1000.0
+MIN_LAG_MONTHS = 6
+
+ROLES = ('Hijo', 'Padre', 'Independiente')
+
+
+# One row per (child, parent) pair
+def parent_child_pairs(index, store, children=None, radius_m=RADIUS_M, min_lag=MIN_LAG_MONTHS):
+    # Store row of every well in the spatial index (-1 if it never produced)
+    store_rows = np.array([store.index.get(sigla, -1) for sigla in index.siglas.tolist()], dtype=np.int64)
+    rows = None
+    if children is not None:
+        rows = np.array([index.index[sigla] for sigla in children if sigla in index.index], dtype=np.int64)
+        rows = rows[store_rows[rows] >= 0]
+
+    child, parent, distance = index.pairs_within(radius_m, rows)
+    child_row, parent_row = store_rows[child], store_rows[parent]
+    related = (child_row >= 0) & (parent_row >= 0)
+    lag = store.first_month[child_row] - store.first_month[parent_row]
+    related &= lag >= min_lag
+    child, parent, distance = child[related], parent[related], distance[related]
+    child_row, parent_row, lag = child_row[related], parent_row[related], lag[related]
+
+    # Parent cumulatives at the month before the child's first month
+    column = np.minimum(lag - 1, store.last_month[parent_row])
+    return pd.DataFrame({
+        'sigla_hijo': index.siglas[child],
+        'sigla_padre': index.siglas[parent],
+        'distancia_m': distance.round(1),
+        'desfasaje_meses': lag,
+        'Np_padre': np.asarray(store['Np'][parent_row, column]),
+        'Gp_padre': np.asarray(store['Gp'][parent_row, column]),
+    }).sort_values(['sigla_hijo', 'distancia_m'], ignore_index=True)
+
+
+# Role of each of `siglas`: 'Hijo' if it has a parent, 'Padre' if it is the
+# parent of another well, 'Independiente' otherwise, with the parents' count
+# and depletion at the well's start
+def tag_wells(pairs, siglas):
+    parents = pairs.groupby('sigla_hijo').agg(
+        n_padres=('sigla_padre', 'count'),
+        distancia_padre_m=('distancia_m', 'min'),
+        Np_padres=('Np_padre', 'sum'),
+        Gp_padres=('Gp_padre', 'sum'),
+    )
+    roles = parents.reindex(pd.Index(pd.unique(np.asarray(siglas)), name='sigla')).reset_index()
+    roles['n_padres'] = roles['n_padres'].fillna(0).astype(int)
+    is_parent = roles['sigla'].isin(pairs['sigla_padre'])
+    roles['rol'] = np.where(roles['n_padres'] > 0, 'Hijo', np.where(is_parent, 'Padre', 'Independiente'))
+    return roles
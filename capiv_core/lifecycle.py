@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Well lifecycle and uptime from the effective days on production (tef).
+#
+# Works on the `tef` array of an aligned.AlignedStore (wells x months on
+# production). Shut-in months are run-length encoded over the whole flattened
+# array at once, so shut-in periods, restarts and the longest shut-in of every
+# well come out of one pass without a per-well loop. Months a well did not
+# report count as shut in.
+#
+#   summary_df = summary_df.merge(lifecycle.well_lifecycle(store), on='sigla', how='left')
+
+RECENT_MONTHS = 12
+
+
+# Months since year 0 (anio * 12 + mes) as datetime64 month starts
+def _month_start(month):
+    return (np.asarray(month) - 1 - 1970 * 12).astype('datetime64[M]')
+
+
+# Calendar days of every month of the wells x months layout
+def days_in_month(store):
+    start = _month_start(store.first_month[:, None] + np.arange(store.n_months)[None, :])
+    return ((start + 1).astype('datetime64[D]') - start.astype('datetime64[D]')).astype(float)
+
+
+# Row, first column and length of every run of True in a 2-D boolean array;
+# a False column is appended to each row so runs never span two wells
+def runs(values):
+    n_rows, n_cols = values.shape
+    padded = np.zeros((n_rows, n_cols + 1), dtype=np.int8)
+    padded[:, :n_cols] = values
+    edges = np.diff(np.concatenate([[0], padded.ravel()]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts // (n_cols + 1), starts % (n_cols + 1), ends - starts
+
+
+# Fraction of each month on production (tef / calendar days)
+def monthly_uptime(store):
+    return np.clip(np.asarray(store['tef']) / days_in_month(store), 0, 1)
+
+
+def _peak_month(q):
+    finite = np.isfinite(q)
+    peak = np.where(finite, q, -np.inf).argmax(axis=1).astype(float)
+    return np.where(finite.any(axis=1), peak, np.nan)
+
+
+# One row per well: producing and shut-in months, shut-in periods (each one
+# ended by a restart), longest shut-in, uptime over the well's life and the
+# last RECENT_MONTHS months of the dataset, months to the oil and gas peak and
+# months since the last producing month
+def well_lifecycle(store):
+    tef = np.nan_to_num(np.asarray(store['tef']))
+    n_wells, n_months = tef.shape
+    columns = np.arange(n_months)[None, :]
+
+    on = tef > 0
+    any_on = on.any(axis=1)
+    first_on = np.where(any_on, on.argmax(axis=1), 0)
+    last_on = np.where(any_on, n_months - 1 - on[:, ::-1].argmax(axis=1), -1)
+
+    # Shut-in periods between the first and the last producing month
+    shut_in = ~on & (columns > first_on[:, None]) & (columns < last_on[:, None])
+    rows, _, lengths = runs(shut_in)
+    periods = np.bincount(rows, minlength=n_wells)
+    longest = np.zeros(n_wells, dtype=np.int64)
+    np.maximum.at(longest, rows, lengths)
+
+    # Uptime from the first producing month to the last reported one
+    days = days_in_month(store)
+    effective = np.minimum(tef, days)
+    life = (columns >= first_on[:, None]) & (columns <= store.last_month[:, None])
+    life_tef = np.where(life, effective, 0).sum(axis=1)
+    life_days = np.where(life, days, 0).sum(axis=1)
+
+    # Uptime over the last RECENT_MONTHS months of the dataset; months after a
+    # well's last report count as shut in
+    latest = int((store.first_month + store.last_month).max()) if n_wells else 0
+    window_start = np.maximum(latest - RECENT_MONTHS + 1, store.first_month + first_on)
+    recent = life & ((store.first_month[:, None] + columns) >= window_start[:, None])
+    recent_tef = np.where(recent, effective, 0).sum(axis=1)
+    recent_days = (
+        _month_start(latest + 1).astype('datetime64[D]') - _month_start(window_start).astype('datetime64[D]')
+    ).astype(float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'sigla': store.siglas,
+            'meses_en_produccion': on.sum(axis=1),
+            'meses_parado': shut_in.sum(axis=1),
+            'paradas': periods,
+            'parada_max_meses': longest,
+            'uptime': np.where(any_on, life_tef / life_days, np.nan),
+            'uptime_12m': np.where(any_on & (recent_days > 0), recent_tef / recent_days, np.nan),
+            'meses_al_pico_pet': _peak_month(np.asarray(store['oil_rate'])),
+            'meses_al_pico_gas': _peak_month(np.asarray(store['gas_rate'])),
+            'meses_sin_producir': np.where(any_on, latest - (store.first_month + last_on), np.nan),
+        })
+
+
+# Uptime per well and calendar year
+def uptime_by_year(store):
+    tef = np.nan_to_num(np.asarray(store['tef']))
+    days = days_in_month(store)
+    columns = np.arange(store.n_months)[None, :]
+    reported = columns <= store.last_month[:, None]
+
+    rows, cols = reported.nonzero()
+    year = (store.first_month[rows] + cols - 1) // 12
+    keys, codes = np.unique(np.column_stack([rows, year]), axis=0, return_inverse=True)
+    codes = codes.ravel()
+    tef_days = np.bincount(codes, weights=np.minimum(tef, days)[rows, cols], minlength=len(keys))
+    year_days = np.bincount(codes, weights=days[rows, cols], minlength=len(keys))
+    return pd.DataFrame({
+        'sigla': store.siglas[keys[:, 0]],
+        'anio': keys[:, 1],
+        'uptime': tef_days / year_days,
+    })
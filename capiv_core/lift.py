@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Artificial-lift changes and gas-injection periods per well.
+#
+# Works on the monthly rows sorted by sigla and date: a lift change is a row
+# whose `tipoextraccion` differs from the well's previous row, and an
+# injection period is a run of consecutive months with `iny_gas` > 0. Rates
+# before and after each change are averaged from the aligned store, all
+# changes at once, so the uplift of every conversion comes without a per-well
+# loop.
+#
+#   changes = lift.lift_changes(data_sorted, store)
+#   summary_df = summary_df.merge(lift.well_summary(data_sorted, store), on='sigla', how='left')
+
+WINDOW = 3  # months averaged before and after a change
+
+
+def _month(df):
+    return (df['anio'].to_numpy() * 12 + df['mes'].to_numpy()).astype(np.int64)
+
+
+def _sorted(df, columns):
+    return df[['sigla', 'anio', 'mes'] + columns].sort_values(['sigla', 'anio', 'mes'], kind='stable')
+
+
+# Mean rate of the `window` months before (side=-1) or from (side=1) each
+# month; `rows` are store rows and `columns` months on production
+def _window_rates(q, rows, columns, window, side):
+    offsets = np.arange(1, window + 1) * -1 if side < 0 else np.arange(window)
+    cols = columns[:, None] + offsets[None, :]
+    inside = (cols >= 0) & (cols < q.shape[1])
+    values = np.where(inside, q[rows[:, None], np.clip(cols, 0, q.shape[1] - 1)], np.nan)
+    with np.errstate(invalid='ignore'):
+        counts = np.isfinite(values).sum(axis=1)
+        return np.where(counts > 0, np.nansum(values, axis=1) / np.maximum(counts, 1), np.nan)
+
+
+# One row per change of tipoextraccion, with the mean oil and gas rates of the
+# `window` months before and after it and the relative uplift
+def lift_changes(df, store, window=WINDOW):
+    rows = _sorted(df.dropna(subset=['tipoextraccion']), ['tipoextraccion'])
+    sigla = rows['sigla'].to_numpy()
+    lift = rows['tipoextraccion'].to_numpy()
+    changed = np.zeros(len(rows), dtype=bool)
+    changed[1:] = (sigla[1:] == sigla[:-1]) & (lift[1:] != lift[:-1])
+    previous = np.empty(len(rows), dtype=object)
+    previous[1:] = lift[:-1]
+
+    changes = pd.DataFrame({
+        'sigla': sigla[changed],
+        'anio': rows['anio'].to_numpy()[changed],
+        'mes': rows['mes'].to_numpy()[changed],
+        'extraccion_anterior': previous[changed],
+        'extraccion_nueva': lift[changed],
+    })
+
+    store_rows = np.array([store.index.get(s, -1) for s in changes['sigla']], dtype=np.int64)
+    in_store = store_rows >= 0
+    safe_rows = np.where(in_store, store_rows, 0)
+    columns = _month(changes) - store.first_month[safe_rows]
+    for rate_col, label in (('oil_rate', 'pet'), ('gas_rate', 'gas')):
+        q = np.asarray(store[rate_col])
+        before = np.where(in_store, _window_rates(q, safe_rows, columns, window, -1), np.nan)
+        after = np.where(in_store, _window_rates(q, safe_rows, columns, window, 1), np.nan)
+        changes[f'q_{label}_antes'] = before
+        changes[f'q_{label}_despues'] = after
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes[f'uplift_{label}'] = np.where(before > 0, after / before - 1, np.nan)
+    return changes
+
+
+# One row per run of consecutive months with gas injection
+def injection_periods(df):
+    rows = _sorted(df, ['iny_gas'])
+    sigla = rows['sigla'].to_numpy()
+    month = _month(rows)
+    injecting = np.nan_to_num(rows['iny_gas'].to_numpy(dtype=float)) > 0
+
+    # A period starts where injection starts or follows a gap or another well
+    follows = np.zeros(len(rows), dtype=bool)
+    follows[1:] = injecting[:-1] & (sigla[1:] == sigla[:-1]) & (month[1:] == month[:-1] + 1)
+    period = np.cumsum(injecting & ~follows)
+
+    injected = rows[injecting].assign(periodo=period[injecting], month=month[injecting])
+    periods = injected.groupby('periodo').agg(
+        sigla=('sigla', 'first'),
+        inicio=('month', 'min'),
+        fin=('month', 'max'),
+        meses=('month', 'count'),
+        iny_gas=('iny_gas', 'sum'),
+    ).reset_index(drop=True)
+    for column in ('inicio', 'fin'):
+        periods[column] = pd.to_datetime(dict(
+            year=(periods[column] - 1) // 12, month=(periods[column] - 1) % 12 + 1, day=1
+        ))
+    return periods
+
+
+# Per-well fields for the well summary: current lift, number of changes, the
+# latest change with its uplift, and injection months and volume
+def well_summary(df, store, window=WINDOW, changes=None):
+    changes = lift_changes(df, store, window) if changes is None else changes
+    current = _sorted(df.dropna(subset=['tipoextraccion']), ['tipoextraccion']).groupby('sigla').agg(
+        extraccion_actual=('tipoextraccion', 'last')
+    )
+    # The last row of each well (changes are sorted by well and month), not
+    # groupby 'last', which skips NaN and would mix the uplift of an earlier
+    # change into the latest one
+    latest = changes.drop_duplicates('sigla', keep='last').set_index('sigla')[
+        ['anio', 'mes', 'extraccion_anterior', 'uplift_pet', 'uplift_gas']
+    ].rename(columns={'anio': 'ultimo_cambio_anio', 'mes': 'ultimo_cambio_mes'})
+    latest.insert(0, 'cambios_extraccion', changes.groupby('sigla').size())
+    injection = injection_periods(df).groupby('sigla').agg(
+        periodos_inyeccion=('meses', 'count'),
+        meses_inyeccion=('meses', 'sum'),
+        iny_gas_total=('iny_gas', 'sum'),
+    )
+    summary = current.join(latest, how='left').join(injection, how='left').reset_index()
+    for column in ('cambios_extraccion', 'periodos_inyeccion', 'meses_inyeccion'):
+        summary[column] = summary[column].fillna(0).astype(int)
+    for column in ('ultimo_cambio_anio', 'ultimo_cambio_mes'):
+        summary[column] = summary[column].astype('Int64')
+    summary['iny_gas_total'] = summary['iny_gas_total'].fillna(0.0)
+    return summary
+
+
+# Lift conversions across wells: count and median uplift per (from, to) pair
+def conversion_summary(changes):
+    return changes.groupby(['extraccion_anterior', 'extraccion_nueva']).agg(
+        pozos=('sigla', 'nunique'),
+        uplift_pet=('uplift_pet', 'median'),
+        uplift_gas=('uplift_gas', 'median'),
+    ).reset_index().sort_values('pozos', ascending=False, ignore_index=True)
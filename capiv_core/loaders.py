@@ -0,0 +1,113 @@
+import pandas as pd
+
+from capiv_core import backend, operators, quality
+
+# Capítulo IV sources on datos.energia.gob.ar
+PRODUCTION_URL = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+FRAC_URL = "http://datos.energia.gob.ar/dataset/71fa2e84-0316-4a1b-af68-7f35e41f58d7/resource/2280ad92-6ed3-403e-a095-50139863ab0d/download/datos-de-fractura-de-pozos-de-hidrocarburos-adjunto-iv-actualizacin-diaria.csv"
+
+# Columns used by the dashboard pages (all of them read the production snapshot)
+REPORT_COLUMNS = [
+    'sigla', 'anio', 'mes', 'prod_pet', 'prod_gas', 'prod_agua',
+    'tef', 'empresa', 'areayacimiento', 'coordenadax', 'coordenaday',
+    'formprod', 'sub_tipo_recurso', 'tipopozo', 'tipoextraccion', 'iny_gas',
+    'formacion', 'fecha_data'
+]
+
+
+@backend.pluggable
+def add_date(df):
+    df['date'] = pd.to_datetime(df['anio'].astype(str) + '-' + df['mes'].astype(str) + '-1')
+    return df
+
+
+def add_rates(df):
+    df['gas_rate'] = df['prod_gas'] / df['tef']
+    df['oil_rate'] = df['prod_pet'] / df['tef']
+    df['water_rate'] = df['prod_agua'] / df['tef']
+    return df
+
+
+def add_cumulatives(df):
+    df['Np'] = df.groupby('sigla')['prod_pet'].cumsum()
+    df['Gp'] = df.groupby('sigla')['prod_gas'].cumsum()
+    df['Wp'] = df.groupby('sigla')['prod_agua'].cumsum()
+    return df
+
+
+# Quality flags, rates and cumulatives of the monthly rows; with `repair`
+# months without producing time get NaN rates instead of inf (see
+# capiv_core.quality: volumes and totals are those of the raw data)
+@backend.pluggable
+def add_production_columns(df, repair=True):
+    quality.add_quality(df)
+    add_rates(df)
+    if repair:
+        quality.repair_rates(df)
+    add_cumulatives(df)
+    return df
+
+
+# Load and preprocess the production data, sorted by well and month so the
+# cumulatives run in time order
+def load_and_sort_data(dataset_url, usecols=REPORT_COLUMNS, repair=True):
+    df = pd.read_csv(dataset_url, usecols=usecols)
+    df = df.sort_values(['sigla', 'anio', 'mes'], kind='stable', ignore_index=True)
+    add_date(df)
+    add_production_columns(df, repair)
+    return df
+
+
+# Company names resolved with the operator alias table (capiv_core.operators)
+def add_company_alias(df):
+    df['empresaNEW'] = operators.resolve(df['empresa'])
+    return df
+
+
+# Production table as stored in the shared snapshot: aliases applied and rows
+# sorted by allocation month (stable, so every well keeps its own order) for
+# the month index of capiv_core.months
+def load_report_data(dataset_url):
+    df = add_company_alias(load_and_sort_data(dataset_url))
+    return df.sort_values('date', kind='stable', ignore_index=True)
+
+
+# Producing months (tef > 0), one row per well and month: repeated
+# (sigla, anio, mes) rows are dropped, the first one is kept. Frames without
+# company aliases get them on the filtered copy, never on `data_sorted`
+def filter_producing(data_sorted):
+    data_filtered = data_sorted[quality.valid(data_sorted, quality.ZERO_TEF | quality.DUPLICATE)]
+    if 'empresaNEW' not in data_filtered:
+        data_filtered = add_company_alias(data_filtered.copy())
+    return data_filtered
+
+
+# Load and preprocess the fracture data
+def load_and_sort_data_frac(dataset_url):
+    return pd.read_csv(dataset_url)
+
+
+# Create a new column for the total amount of arena (sum of national and imported arena)
+def add_arena_total(df_frac):
+    df_frac['arena_total_tn'] = df_frac['arena_bombeada_nacional_tn'] + df_frac['arena_bombeada_importada_tn']
+    return df_frac
+
+
+# Frac table as stored in the shared snapshot
+def load_frac_data(dataset_url):
+    return add_arena_total(load_and_sort_data_frac(dataset_url))
+
+
+def apply_frac_cutoffs(df_frac):
+    if 'arena_total_tn' not in df_frac:
+        add_arena_total(df_frac)
+
+    # Apply the cut-off conditions:
+    # longitud_rama_horizontal_m > 100
+    # cantidad_fracturas > 6
+    # arena_total_tn > 100
+    return df_frac[
+        (df_frac['longitud_rama_horizontal_m'] > 100) &
+        (df_frac['cantidad_fracturas'] > 6) &
+        (df_frac['arena_total_tn'] > 100)
+    ]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# Month -> row offsets of a production frame.
+#
+# The production snapshot is stored sorted by allocation month (see
+# loaders.load_report_data), so every month is a contiguous run of rows and
+# the index is just the first row of each month. Latest-month, date-range and
+# year-over-year queries then take the rows of the months they need instead
+# of comparing the date of every row of 15+ years of history. Frames that
+# are not sorted by month get a stable sort order, so the index works on any
+# frame, only without the contiguous runs.
+#
+#   index = months.MonthIndex(data_sorted)
+#   latest = index.rows(data_sorted, index.latest())
+#   last_year = index.rows(data_sorted, '2023-01-01', '2023-12-01')
+
+
+class MonthIndex:
+
+    def __init__(self, df, column='date'):
+        dates = df[column].to_numpy(dtype='datetime64[ns]')
+        if len(dates) and not (dates[1:] >= dates[:-1]).all():
+            self.order = np.argsort(dates, kind='stable')
+            dates = dates[self.order]
+        else:
+            self.order = None  # rows already sorted by month
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]]) if len(dates) else np.zeros(0, dtype=int)
+        self.months = dates[starts]
+        self.offsets = np.append(starts, len(dates))
+        self.n_rows = len(dates)
+
+    def __len__(self):
+        return len(self.months)
+
+    # Latest month (or the `n`-th before it)
+    def latest(self, n=0):
+        return pd.Timestamp(self.months[-1 - n]) if len(self.months) > n else None
+
+    # Row positions of the months between `start` and `end` (inclusive; one
+    # month if `end` is None, the whole frame if both are None)
+    def positions(self, start=None, end=None):
+        if start is not None and end is None:
+            end = start
+        lo = 0 if start is None else np.searchsorted(self.months, np.datetime64(pd.Timestamp(start), 'ns'), 'left')
+        hi = len(self.months) if end is None else \
+            np.searchsorted(self.months, np.datetime64(pd.Timestamp(end), 'ns'), 'right')
+        first, last = self.offsets[lo], self.offsets[max(lo, hi)]
+        if self.order is None:
+            return np.arange(first, last)
+        return np.sort(self.order[first:last])
+
+    # Rows of those months, as a new frame (see capiv_core.views.rows)
+    def rows(self, df, start=None, end=None):
+        if len(df) != self.n_rows:
+            raise ValueError(f"The index has {self.n_rows} rows, the frame {len(df)}")
+        return df.take(self.positions(start, end))
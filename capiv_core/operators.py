@@ -0,0 +1,135 @@
+import csv
+import hashlib
+import os
+import re
+import sys
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Operator names as reported, resolved to one name per company.
+#
+# Names are normalized (accents, case, punctuation and trailing legal
+# suffixes such as S.A., SAU, S.R.L., LLC or SL) and looked up in the alias
+# table operator_aliases.csv, whose `empresa` column is normalized the same
+# way, so one row covers every spelling of a name. Resolution runs on the
+# distinct names only and the row codes are remapped, so the cost grows with
+# the number of operators, not of rows. Names without an alias are kept as
+# reported.
+#
+#   df['empresaNEW'] = operators.resolve(df['empresa'])
+#
+# The table is part of the production snapshot key (see capiv_core.shared),
+# so editing it rebuilds the snapshot on the next load. It is read once per
+# modification time of the file.
+#
+#   python -m capiv_core.operators   # names in the production data and their company
+
+ALIASES_PATH = os.environ.get(
+    'CAPIV_OPERATOR_ALIASES', os.path.join(os.path.dirname(__file__), 'operator_aliases.csv')
+)
+
+LEGAL_SUFFIXES = (
+    'SUCURSAL ARGENTINA', 'S A U', 'SAU', 'S A', 'SA', 'S R L', 'SRL', 'S L', 'SL', 'LLC', 'INC', 'LTD',
+)
+
+
+def normalize(name):
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii').upper()
+    text = ' '.join(re.sub(r'[^A-Z0-9]+', ' ', text).split())
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in LEGAL_SUFFIXES:
+            if text.endswith(' ' + suffix):
+                text = text[:-len(suffix) - 1]
+                stripped = True
+    return text
+
+
+_memo = {}  # (reader, path) -> (st_mtime_ns, value)
+_memo_lock = threading.Lock()
+
+
+# read(path), memoized until the file changes; `missing` if there is no file
+def _read_once(read, path, missing):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return missing
+    key = (read.__name__, path)
+    with _memo_lock:
+        found = _memo.get(key)
+    if found is not None and found[0] == mtime:
+        return found[1]
+    value = read(path)
+    with _memo_lock:
+        _memo[key] = (mtime, value)
+    return value
+
+
+def _read_aliases(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return {normalize(row['empresa']): row['empresaNEW'].strip() for row in csv.DictReader(f)}
+
+
+def _read_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+# Normalized name -> company name (shared: do not modify)
+def load_aliases(path=ALIASES_PATH):
+    return _read_once(_read_aliases, path, {})
+
+
+# Digest of the alias table, '' if there is none
+def table_version(path=ALIASES_PATH):
+    return _read_once(_read_digest, path, '')
+
+
+def resolve_name(name, aliases):
+    return aliases.get(normalize(name), name)
+
+
+# Company name of every row of `names`; with `as_category` the result is a
+# categorical with one category per company
+def resolve(names, aliases=None, as_category=False):
+    aliases = load_aliases() if aliases is None else aliases
+    # One category per reported name: only the categories are resolved
+    if not isinstance(names.dtype, pd.CategoricalDtype):
+        names = names.astype('category')
+    codes, distinct = names.cat.codes.to_numpy(), names.cat.categories
+
+    resolved = np.array([resolve_name(name, aliases) for name in distinct], dtype=object)
+    categories, remap = np.unique(resolved, return_inverse=True)
+    codes = np.append(remap, -1)[codes]  # missing names keep code -1
+    if as_category:
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=names.index)
+    return pd.Series(np.append(categories, np.nan)[codes], index=names.index)
+
+
+# Alias table as a frame: every distinct name of `names` with its normalized
+# form and company, to review and extend operator_aliases.csv
+def alias_table(names, aliases=None):
+    aliases = load_aliases() if aliases is None else aliases
+    distinct = pd.Series(pd.unique(names.dropna()), dtype=object)
+    return pd.DataFrame({
+        'empresa': distinct,
+        'normalizada': distinct.map(normalize),
+        'empresaNEW': distinct.map(lambda name: resolve_name(name, aliases)),
+    }).sort_values(['empresaNEW', 'empresa'], ignore_index=True)
+
+
+def main():
+    from capiv_core import shared
+
+    table = alias_table(shared.production_frame()['empresa'])
+    print(table.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
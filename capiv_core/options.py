@@ -0,0 +1,136 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Widget option lists and well search, computed once per dataset version.
+#
+# `OptionLists` keeps the distinct combinations of the filter columns (one row
+# per well for the atemporal columns, not one per month), so the options of a
+# widget under the current filters come from a table of the size of the well
+# count and are memoized per filter (the MAX_CACHED most recent filters).
+# `version` is a digest of that table:
+# caches keyed on it change when the data does.
+#
+# `WellIndex` answers prefix and substring searches over the siglas without
+# scanning the monthly rows and returns at most `limit` matches, so a well
+# picker ships the same few options to the browser however many wells there
+# are.
+#
+#   well_options = options.OptionLists(data_sorted, ['empresa', 'tipopozo', 'sigla'])
+#   well_options.values('sigla', empresa=selected_empresa, tipopozo=selected_tipos_pozo)
+#   well_options.index('sigla', empresa=selected_empresa).search('lll 12')
+
+LIMIT = 50  # matches returned by a search
+MAX_CACHED = 256  # memoized option lists and search indexes, each
+
+
+def _frozen(value):
+    if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+        return tuple(value)
+    return value
+
+
+def _key(column, filters):
+    return column, tuple(sorted((k, _frozen(v)) for k, v in filters.items()))
+
+
+class OptionLists:
+
+    def __init__(self, df, columns):
+        self.columns = list(columns)
+        self.combinations = df[self.columns].drop_duplicates(ignore_index=True)
+        hashed = pd.util.hash_pandas_object(self.combinations, index=False).to_numpy()
+        self.version = hashlib.sha1(hashed.tobytes()).hexdigest()[:10]
+        self._values = OrderedDict()
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()  # shared by every session
+
+    # Memoized compute() under `key`, least recently used first out
+    def _memo(self, cache, key, compute):
+        with self._lock:
+            found = cache.get(key)
+            if found is not None:
+                cache.move_to_end(key)
+                return found
+        found = compute()
+        with self._lock:
+            cache[key] = found
+            while len(cache) > MAX_CACHED:
+                cache.popitem(last=False)
+        return found
+
+    # Distinct values of `column` (in order of appearance) among the rows
+    # matching the filters; an empty list-like filter matches nothing, as in
+    # capiv_core.views.mask
+    def values(self, column, **filters):
+        return self._memo(self._values, _key(column, filters), lambda: self._select(column, filters))
+
+    def _select(self, column, filters):
+        selected = self.combinations
+        for name, value in filters.items():
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+                selected = selected[selected[name].isin(value)]
+            else:
+                selected = selected[selected[name] == value]
+        return tuple(pd.unique(selected[column]))
+
+    # Search index over the same values (see WellIndex)
+    def index(self, column, **filters):
+        return self._memo(self._indexes, _key(column, filters), lambda: WellIndex(self.values(column, **filters)))
+
+
+# Search key of a sigla: uppercase letters and digits only, so 'lll 12'
+# finds 'YPF.Nq.LLL-12(h)'
+def normalize(text):
+    return re.sub(r'[^0-9A-Z]', '', str(text).upper())
+
+
+class WellIndex:
+
+    def __init__(self, siglas):
+        self.siglas = np.asarray(list(dict.fromkeys(siglas)), dtype=object)
+        keys = [normalize(sigla) for sigla in self.siglas]
+        # Prefix search: binary search over the sorted keys
+        self._order = np.argsort(np.asarray(keys, dtype=object), kind='stable')
+        self._sorted = np.asarray([keys[i] for i in self._order], dtype=object)
+        # Substring search: str.find over all the keys joined by newlines, with
+        # the start of every key to map a match back to its well
+        self._text = '\n'.join(keys)
+        self._starts = np.cumsum([0] + [len(k) + 1 for k in keys[:-1]]) if keys else np.zeros(0, dtype=int)
+
+    def __len__(self):
+        return len(self.siglas)
+
+    def prefix(self, query, limit=LIMIT):
+        key = normalize(query)
+        lo = int(np.searchsorted(self._sorted, key, side='left'))
+        found = []
+        for position in range(lo, len(self._sorted)):
+            if len(found) == limit or not self._sorted[position].startswith(key):
+                break
+            found.append(self._order[position])
+        return found
+
+    def substring(self, query, limit=LIMIT):
+        key = normalize(query)
+        found = []
+        position = self._text.find(key) if key else -1
+        while position != -1 and len(found) < limit:
+            well = int(np.searchsorted(self._starts, position, side='right')) - 1
+            found.append(well)
+            # Continue after the end of this key: one match per well
+            end = self._text.find('\n', position)
+            position = self._text.find(key, end + 1) if end != -1 else -1
+        return found
+
+    # Siglas matching `query`: prefix matches first (sorted), then the other
+    # wells containing it (in index order); the first wells for an empty query
+    def search(self, query, limit=LIMIT):
+        if not normalize(query):
+            return list(self.siglas[:limit])
+        found = list(dict.fromkeys(self.prefix(query, limit) + self.substring(query, limit)))
+        return list(self.siglas[found[:limit]])
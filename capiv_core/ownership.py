@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Operator of every well over time.
+#
+# The operator of a well can change from one month to the next (acquisitions,
+# farm-outs), so one operator per well misattributes part of its history.
+# `intervals` turns the monthly rows into one row per (well, operator, from,
+# to) period in a single pass over the rows sorted by well and month; the
+# initial and current operator of each well and the transfers between
+# operators come from that table without going back to the monthly rows.
+#
+#   periods = ownership.intervals(data_sorted)
+#   summary_df = summary_df.merge(ownership.well_operators(periods), on='sigla', how='left')
+#
+# Monthly rows already carry the operator of that month (historical view);
+# `current_wells` gives the wells to attribute whole to their current
+# operator (current view).
+
+
+def _month_start(month):
+    return (np.asarray(month) - 1 - 1970 * 12).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+# One row per run of consecutive reports of a well with the same operator
+def intervals(df, column='empresaNEW'):
+    rows = df[['sigla', 'anio', 'mes', column]].dropna(subset=[column])
+    rows = rows.sort_values(['sigla', 'anio', 'mes'], kind='stable')
+    sigla = rows['sigla'].to_numpy()
+    operator = rows[column].to_numpy()
+    month = (rows['anio'].to_numpy() * 12 + rows['mes'].to_numpy()).astype(np.int64)
+
+    starts = np.ones(len(rows), dtype=bool)
+    starts[1:] = (sigla[1:] != sigla[:-1]) | (operator[1:] != operator[:-1])
+    ends = np.ones(len(rows), dtype=bool)
+    ends[:-1] = starts[1:]
+    first, last = np.flatnonzero(starts), np.flatnonzero(ends)
+    return pd.DataFrame({
+        'sigla': sigla[first],
+        column: operator[first],
+        'desde': _month_start(month[first]),
+        'hasta': _month_start(month[last]),
+        'meses': last - first + 1,
+    })
+
+
+# Initial and current operator of every well, the number of operator changes
+# and the start of the current operator's period
+def well_operators(periods, column='empresaNEW'):
+    sigla = periods['sigla'].to_numpy()
+    is_first = np.ones(len(periods), dtype=bool)
+    is_first[1:] = sigla[1:] != sigla[:-1]
+    is_last = np.ones(len(periods), dtype=bool)
+    is_last[:-1] = is_first[1:]
+    first, last = np.flatnonzero(is_first), np.flatnonzero(is_last)
+    operator = periods[column].to_numpy()
+    return pd.DataFrame({
+        'sigla': sigla[first],
+        'empresa_inicial': operator[first],
+        'empresa_actual': operator[last],
+        'cambios_operadora': last - first,
+        'operada_desde': periods['desde'].to_numpy()[last],
+    })
+
+
+# One row per change of operator
+def transfers(periods, column='empresaNEW'):
+    sigla = periods['sigla'].to_numpy()
+    changed = np.zeros(len(periods), dtype=bool)
+    changed[1:] = sigla[1:] == sigla[:-1]
+    previous = np.roll(periods[column].to_numpy(), 1)
+    return pd.DataFrame({
+        'sigla': sigla[changed],
+        'empresa_anterior': previous[changed],
+        'empresa_nueva': periods[column].to_numpy()[changed],
+        'fecha': periods['desde'].to_numpy()[changed],
+    })
+
+
+# Wells whose current operator is `operator`
+def current_wells(periods, operator, column='empresaNEW'):
+    operators = well_operators(periods, column)
+    return operators.loc[operators['empresa_actual'] == operator, 'sigla'].to_numpy()
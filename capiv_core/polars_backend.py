@@ -0,0 +1,120 @@
+import numpy as np
+import polars as pl
+
+from capiv_core import quality
+
+# Polars implementation of the pluggable derivations (see capiv_core.backend).
+#
+# Every function takes and returns the same pandas frames as its pandas
+# counterpart in loaders or wells: only the columns a derivation needs are
+# handed to Polars, the derivation runs as one lazy query (multi-threaded,
+# grouped with window expressions instead of a per-well apply) and the result
+# comes back as pandas columns. NaN in the input is treated as missing, as
+# pandas does.
+
+RATES = {'gas_rate': 'prod_gas', 'oil_rate': 'prod_pet', 'water_rate': 'prod_agua'}
+CUMULATIVES = {'Np': 'prod_pet', 'Gp': 'prod_gas', 'Wp': 'prod_agua'}
+EUR_DAYS = {'EUR_30': 30, 'EUR_90': 90, 'EUR_180': 180}
+NO_RATIO = 100000  # fill value of undefined ratios in the McCain table
+
+
+def _lazy(df, columns, **extra):
+    frame = df[columns].reset_index(drop=True)
+    for name, values in extra.items():
+        frame[name] = values
+    return pl.from_pandas(frame).lazy()
+
+
+def add_date(df):
+    dates = _lazy(df, ['anio', 'mes']).select(
+        pl.date(pl.col('anio'), pl.col('mes'), 1).cast(pl.Datetime('ns')).alias('date')
+    ).collect()
+    df['date'] = dates['date'].to_numpy()
+    return df
+
+
+def add_production_columns(df, repair=True):
+    quality.add_quality(df)
+    volumes = list(RATES.values())
+    undefined = (df['calidad'].to_numpy() & quality.UNDEFINED_RATE) != 0
+
+    query = _lazy(df, ['sigla', 'tef'] + volumes, _undefined=undefined)
+    query = query.with_columns([(pl.col(v) / pl.col('tef')).alias(rate) for rate, v in RATES.items()])
+    if repair:
+        query = query.with_columns([
+            pl.when(pl.col('_undefined')).then(None).otherwise(pl.col(rate)).alias(rate) for rate in RATES
+        ])
+    query = query.with_columns([pl.col(v).cum_sum().over('sigla').alias(cum) for cum, v in CUMULATIVES.items()])
+    result = query.collect()
+
+    for column in list(RATES) + list(CUMULATIVES):
+        df[column] = result[column].to_numpy()
+    return df
+
+
+def _ratio(numerator, denominator, scale=1):
+    ratio = pl.col(numerator) / pl.col(denominator)
+    if scale != 1:
+        ratio = ratio * scale
+    return ratio.fill_nan(NO_RATIO).fill_null(NO_RATIO)
+
+
+def classify_mccain(data_filtered):
+    fluid = pl.when((pl.col('Np') == 0) | (pl.col('GOR') > 3000)).then(pl.lit('Gasífero')).otherwise(
+        pl.lit('Petrolífero')
+    )
+    cum_df = _lazy(data_filtered, ['sigla', 'Np', 'Gp', 'Wp', 'tipopozo']).group_by('sigla').agg([
+        pl.col('Np').max(), pl.col('Gp').max(), pl.col('Wp').max(), pl.col('tipopozo').first(),
+    ]).filter(
+        # pivot_table drops the wells without any cumulative
+        pl.col('Np').is_not_null() | pl.col('Gp').is_not_null() | pl.col('Wp').is_not_null()
+    ).with_columns(
+        _ratio('Gp', 'Np', 1000).alias('GOR')
+    ).with_columns(
+        fluid.alias('Fluido McCain')
+    ).with_columns([
+        pl.when(pl.col('tipopozo') == 'Otro tipo').then(pl.col('Fluido McCain')).otherwise(
+            pl.col('tipopozo')
+        ).alias('tipopozoNEW'),
+        _ratio('Wp', 'Np').alias('WOR'),
+        _ratio('Wp', 'Gp', 1000).alias('WGR'),
+    ]).sort('sigla').select(['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW'])
+    return cum_df.collect().to_pandas()
+
+
+def add_fluid_type(data_filtered, cum_df):
+    # Row numbers keep the order of the monthly rows through the join
+    types = _lazy(data_filtered, ['sigla'], _row=np.arange(len(data_filtered))).join(
+        _lazy(cum_df, ['sigla', 'tipopozoNEW']), on='sigla', how='left'
+    ).sort('_row').collect()
+    merged = data_filtered.reset_index(drop=True)
+    merged['tipopozoNEW'] = types['tipopozoNEW'].to_numpy()
+    return merged
+
+
+def create_summary_dataframe(data_filtered):
+    columns = [
+        'sigla', 'date', 'anio', 'empresaNEW', 'formprod', 'sub_tipo_recurso',
+        'oil_rate', 'gas_rate', 'tipopozoNEW', 'Np', 'Gp', 'Wp',
+    ]
+    start = pl.col('date').min().over('sigla')
+    cumulative = pl.when(pl.col('tipopozoNEW').first().over('sigla') == 'Petrolífero').then(
+        pl.col('Np')
+    ).otherwise(pl.col('Gp'))
+
+    summary_df = _lazy(data_filtered, columns).sort(['sigla', 'date'], maintain_order=True).with_columns([
+        pl.when(pl.col('date') <= start + pl.duration(days=days)).then(cumulative).otherwise(None).alias(eur)
+        for eur, days in EUR_DAYS.items()
+    ]).group_by('sigla', maintain_order=True).agg([
+        pl.col('date').drop_nulls().first(),
+        pl.col('anio').min().alias('start_year'),
+        pl.col('empresaNEW').drop_nulls().first(),
+        pl.col('formprod').drop_nulls().first(),
+        pl.col('sub_tipo_recurso').drop_nulls().first(),
+        pl.col('Np').max(),
+        pl.col('Gp').max(),
+        pl.col('Wp').max(),
+        pl.col('oil_rate').max().alias('Qo_peak'),
+        pl.col('gas_rate').max().alias('Qg_peak'),
+    ] + [pl.col(eur).max() for eur in EUR_DAYS])
+    return summary_df.collect().to_pandas()
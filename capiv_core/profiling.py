@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+# Lightweight per-stage instrumentation for the page scripts.
+#
+#   profiling.start_run("Ranking")
+#   with profiling.stage("merge frac + summary", "merge", rows_in=df_frac) as s:
+#       df_merged = pd.merge(...)
+#       s.rows_out = df_merged
+#
+# Every finished stage is kept for the current script run (one list per
+# Streamlit script thread) and emitted as a JSON line on the
+# "capiv.profiling" logger. `debug_panel()` renders the records in the
+# sidebar, but only when the page is opened with ?debug=1 or CAPIV_DEBUG=1.
+
+logger = logging.getLogger("capiv.profiling")
+
+STAGE_KINDS = ("load", "derive", "merge", "aggregate", "plot")
+
+_local = threading.local()
+
+
+def _rss_bytes():
+    # Resident set size of this process; 0 where it cannot be read
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a high-water mark (kB on Linux), better than nothing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+
+def _count_rows(obj):
+    if obj is None or isinstance(obj, int):
+        return obj
+    shape = getattr(obj, "shape", None)
+    if shape:
+        return int(shape[0])
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def start_run(page):
+    # Call once at the top of a page script: clears the previous rerun's records
+    _local.page = page
+    _local.run_id = uuid.uuid4().hex[:8]
+    _local.records = []
+
+
+def records():
+    return list(getattr(_local, "records", []))
+
+
+class Stage:
+    def __init__(self, name, kind, rows_in=None):
+        self.name = name
+        self.kind = kind
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def as_record(self, seconds, mem_delta):
+        return {
+            "page": getattr(_local, "page", None),
+            "run_id": getattr(_local, "run_id", None),
+            "stage": self.name,
+            "kind": self.kind,
+            "seconds": round(seconds, 4),
+            "rows_in": _count_rows(self.rows_in),
+            "rows_out": _count_rows(self.rows_out),
+            "mem_delta_mb": round(mem_delta / 2 ** 20, 2),
+        }
+
+
+@contextmanager
+def stage(name, kind="derive", rows_in=None):
+    if kind not in STAGE_KINDS:
+        raise ValueError(f"Unknown stage kind {kind!r}, expected one of {STAGE_KINDS}")
+    s = Stage(name, kind, rows_in)
+    rss_before = _rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        yield s
+    finally:
+        record = s.as_record(time.perf_counter() - t0, _rss_bytes() - rss_before)
+        if not hasattr(_local, "records"):
+            _local.records = []
+        _local.records.append(record)
+        logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+
+def profiled(kind, name=None):
+    # Decorator version of `stage`: rows_in is taken from the first positional
+    # argument and rows_out from the return value when they look like frames
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            first = args[0] if args else None
+            rows_in = first if hasattr(first, "shape") else None
+            with stage(stage_name, kind, rows_in=rows_in) as s:
+                result = func(*args, **kwargs)
+                if hasattr(result, "shape"):
+                    s.rows_out = result
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def debug_enabled():
+    if os.environ.get("CAPIV_DEBUG") == "1":
+        return True
+    import streamlit as st
+    return st.query_params.get("debug") == "1"
+
+
+def debug_panel():
+    # Hidden sidebar panel with the stage timings of the current run
+    if not debug_enabled():
+        return
+    import pandas as pd
+    import streamlit as st
+
+    run = records()
+    with st.sidebar.expander("🛠️ Debug: tiempos por etapa", expanded=False):
+        if not run:
+            st.caption("Sin etapas registradas en esta ejecución.")
+            return
+        df = pd.DataFrame(run).drop(columns=["page", "run_id"])
+        st.caption(f"Ejecución {run[0]['run_id']} · total {df['seconds'].sum():.2f} s")
+        st.dataframe(df, use_container_width=True, hide_index=True)
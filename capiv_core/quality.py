@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# Data-quality flags of the monthly production rows.
+#
+# Every row gets a `calidad` bitmask at ingestion (see loaders), so the pages
+# filter with one vectorized AND instead of each re-deriving its own rules:
+#
+#   data_filtered = data_sorted[quality.valid(data_sorted)]                  # tef > 0
+#   clean = data_sorted[quality.valid(data_sorted, quality.ALL)]              # no flag at all
+#
+# The repairs fix what can be fixed without guessing. By default only the
+# rates that cannot be computed (volume / 0) become NaN instead of inf: those
+# months have no producing time and are left out of the producing-month
+# totals anyway, so the totals of the pages are those of the raw data.
+# Negative volumes and impossible rates are flagged but kept unless a caller
+# repairs them (repair_volumes, repair_rates(df, IMPOSSIBLE_RATE)), and
+# duplicate rows are dropped by loaders.filter_producing.
+
+ZERO_TEF = 1  # tef is 0 or missing, the month has no rates
+INFINITE_RATE = 2  # volume reported with tef = 0 (the rate would be inf)
+IMPOSSIBLE_RATE = 4  # tef longer than the days of the month or a rate above MAX_RATES
+DUPLICATE = 8  # repeated (sigla, anio, mes) row, every occurrence after the first
+NEGATIVE_VOLUME = 16  # negative oil, gas or water volume
+
+ALL = ZERO_TEF | INFINITE_RATE | IMPOSSIBLE_RATE | DUPLICATE | NEGATIVE_VOLUME
+UNDEFINED_RATE = ZERO_TEF | INFINITE_RATE  # the rate would be volume / 0
+KEY = ['sigla', 'anio', 'mes']  # one row per well and month
+
+LABELS = {
+    ZERO_TEF: 'TEF nulo',
+    INFINITE_RATE: 'Volumen con TEF nulo',
+    IMPOSSIBLE_RATE: 'Caudal imposible',
+    DUPLICATE: 'Fila duplicada',
+    NEGATIVE_VOLUME: 'Volumen negativo',
+}
+
+VOLUMES = {'oil_rate': 'prod_pet', 'gas_rate': 'prod_gas', 'water_rate': 'prod_agua'}
+
+# Upper bound of a plausible monthly average rate (m3/d for oil and water, km3/d for gas)
+MAX_RATES = {'oil_rate': 10000.0, 'gas_rate': 10000.0, 'water_rate': 10000.0}
+
+
+def _values(df, column):
+    return df[column].to_numpy(dtype=float) if column in df else np.zeros(len(df))
+
+
+# Days of the allocation month of every row (NaN if the month is unknown)
+def days_in_month(df):
+    if 'date' in df:
+        dates = df['date']
+    else:
+        dates = pd.to_datetime(pd.DataFrame({'year': df['anio'], 'month': df['mes'], 'day': 1}), errors='coerce')
+    return dates.dt.days_in_month.to_numpy(dtype=float)
+
+
+def flags(df):
+    tef = _values(df, 'tef')
+    producing_time = tef > 0  # False for NaN as well
+    mask = np.where(producing_time, 0, ZERO_TEF).astype(np.uint8)
+    mask |= np.where(tef > days_in_month(df), IMPOSSIBLE_RATE, 0).astype(np.uint8)
+
+    for rate_col, volume_col in VOLUMES.items():
+        volume = _values(df, volume_col)
+        mask |= np.where(~producing_time & (volume > 0), INFINITE_RATE, 0).astype(np.uint8)
+        mask |= np.where(volume < 0, NEGATIVE_VOLUME, 0).astype(np.uint8)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = volume / np.where(producing_time, tef, np.nan)
+        mask |= np.where(rate > MAX_RATES[rate_col], IMPOSSIBLE_RATE, 0).astype(np.uint8)
+
+    mask |= np.where(df.duplicated(subset=KEY).to_numpy(), DUPLICATE, 0).astype(np.uint8)
+    return mask
+
+
+# Repeated (sigla, anio, mes) rows, every occurrence after the first: the
+# rows flagged DUPLICATE, or computed when the frame has no flags
+def duplicated(df):
+    if 'calidad' in df:
+        return (df['calidad'].to_numpy() & DUPLICATE) != 0
+    return df.duplicated(subset=KEY).to_numpy()
+
+
+def add_quality(df):
+    df['calidad'] = flags(df)
+    return df
+
+
+# Negative volumes to zero (run before the rates and cumulatives)
+def repair_volumes(df):
+    for volume_col in VOLUMES.values():
+        if volume_col in df:
+            df[volume_col] = df[volume_col].clip(lower=0)
+    return df
+
+
+# Rates of the months with any of the `exclude` flags to NaN (run after the rates)
+def repair_rates(df, exclude=UNDEFINED_RATE):
+    undefined = (df['calidad'].to_numpy() & exclude) != 0
+    for rate_col in VOLUMES:
+        if rate_col in df:
+            df[rate_col] = df[rate_col].mask(undefined)
+    return df
+
+
+# Rows without any of the `exclude` flags
+def valid(df, exclude=ZERO_TEF):
+    return (df['calidad'].to_numpy() & exclude) == 0
+
+
+# Number of rows with each flag
+def summary(df):
+    mask = df['calidad'].to_numpy()
+    return pd.DataFrame({
+        'control': list(LABELS.values()),
+        'filas': [int(((mask & bit) != 0).sum()) for bit in LABELS],
+    })
@@ -0,0 +1,76 @@
+import pandas as pd
+
+# Yearly (campaña) rankings used by the Ranking page
+
+
+# Aggregate `column` per campaign + `keys` and keep the top `n` per campaign
+def top_per_year(df, keys, column, agg, value, n=3):
+    stats = df.groupby(['start_year'] + keys).agg(
+        **{value: (column, agg)}
+    ).reset_index()
+
+    # Round to 0 decimal places
+    stats[value] = stats[value].round(0)
+
+    # Sort by start_year and value to get the top n per year
+    stats_sorted = stats.sort_values(['start_year', value], ascending=[True, False])
+    return stats_sorted.groupby('start_year').head(n)
+
+
+# Create data for the table with the year appearing only once for each start_year
+def year_table(top, columns):
+    data = []
+    previous_year = None
+    for _, row in top.iterrows():
+        year_value = int(row['start_year']) if row['start_year'] != previous_year else " "  # Use blank for repeated years
+        data.append([year_value] + [row[c] for c in columns])
+        previous_year = row['start_year']
+    return data
+
+
+# Top `n` wells per campaign by peak rate, with completion design figures
+# (one row per well, every row with its campaign)
+def peak_rate_top(df_merged_VMUT, fluid, peak_col, n=3):
+    grouped = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == fluid].groupby(
+        ['start_year', 'sigla', 'empresaNEW']
+    ).agg({
+        peak_col: 'max',
+        'longitud_rama_horizontal_m': 'mean',
+        'cantidad_fracturas': 'mean',
+        'arena_bombeada_nacional_tn': 'sum',
+        'arena_bombeada_importada_tn': 'sum'
+    }).reset_index()
+
+    grouped['fracspacing'] = grouped['longitud_rama_horizontal_m'] / grouped['cantidad_fracturas']
+    grouped['agente_etapa'] = (
+        grouped['arena_bombeada_nacional_tn'] + grouped['arena_bombeada_importada_tn']
+    ) / grouped['cantidad_fracturas']
+
+    grouped = grouped.drop_duplicates(subset=['start_year', 'sigla'], keep='first')
+    grouped_sorted = grouped.sort_values(['start_year', peak_col], ascending=[True, False])
+    top = grouped_sorted.groupby('start_year').head(n)
+    return top[['start_year', 'sigla', 'empresaNEW', peak_col, 'cantidad_fracturas', 'fracspacing', 'agente_etapa']]
+
+
+# The same ranking as a display table: whole numbers and the campaign only on
+# its first row
+def peak_rate_ranking(df_merged_VMUT, fluid, peak_col, n=3):
+    top = peak_rate_top(df_merged_VMUT, fluid, peak_col, n)
+
+    # Handle repeated years in the table
+    data_table = []
+    previous_year = None
+    for _, row in top.iterrows():
+        year_value = int(row['start_year']) if row['start_year'] != previous_year else " "
+        data_table.append({
+            'start_year': year_value,
+            'sigla': row['sigla'],
+            'empresaNEW': row['empresaNEW'],
+            peak_col: int(row[peak_col]),
+            'cantidad_fracturas': int(row['cantidad_fracturas']),
+            'fracspacing': int(row['fracspacing']),
+            'agente_etapa': int(row['agente_etapa'])
+        })
+        previous_year = row['start_year']
+
+    return pd.DataFrame(data_table)
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+
+from capiv_core import aggregates, figures, loaders, shared
+
+# Headless version of the real-time production report: computes the headline
+# metrics and the four area charts once and writes them as static files.
+#
+#   python -m capiv_core.report --output report/ --formats html,json,png --workers 4
+#
+# The data comes from the shared production snapshot (capiv_core.shared), so a
+# run next to the dashboard reuses its download instead of reading the CSV.
+# PNG export needs the optional `kaleido` package.
+
+FORMATS = ('html', 'png', 'json')
+
+
+# Area charts of the report, keyed by the file name used in batch mode
+def report_figures(company_summary_aggregated, yearly_summary):
+    return {
+        'gas_por_empresa': figures.area_chart(
+            company_summary_aggregated, 'total_gas_rate', 'empresaNEW',
+            title="Caudal de Gas por Empresa",
+            yaxis_title="Caudal de Gas (km³/d)",
+            legend_title="Empresa",
+        ),
+        'petroleo_por_empresa': figures.area_chart(
+            company_summary_aggregated, 'total_oil_rate', 'empresaNEW',
+            title="Caudal de Petróleo por Empresa",
+            yaxis_title="Caudal de Petróleo (m³/d)",
+            legend_title="Empresa",
+        ),
+        'gas_por_campana': figures.area_chart(
+            yearly_summary, 'total_gas_rate', 'start_year',
+            title="Caudal de Gas por Campaña",
+            yaxis_title="Caudal de Gas (km³/d)",
+            legend_title="Campaña",
+        ),
+        'petroleo_por_campana': figures.area_chart(
+            yearly_summary, 'total_oil_rate', 'start_year',
+            title="Caudal de Petróleo por Campaña",
+            yaxis_title="Caudal de Petróleo (m³/d)",
+            legend_title="Campaña",
+        ),
+    }
+
+
+# Metrics and figures of the report from the sorted production frame
+def build_report(data_sorted):
+    data_filtered = loaders.filter_producing(data_sorted)
+    latest_date_non_official, latest_date = aggregates.latest_dates(data_filtered)
+    metrics = aggregates.headline_metrics(data_filtered, latest_date)
+    figs = report_figures(
+        aggregates.company_rates(data_filtered),
+        aggregates.start_year_rates(data_filtered),
+    )
+    return {
+        'fecha_alocacion_en_progreso': latest_date_non_official.date().isoformat(),
+        'fecha_ultima_alocacion': latest_date.date().isoformat(),
+        'metrics': {k: float(v) for k, v in metrics.items()},
+    }, figs
+
+
+# Runs in a worker process: the figure travels as plotly JSON
+def _render(fig_json, path, fmt):
+    fig = pio.from_json(fig_json)
+    if fmt == 'html':
+        fig.write_html(path, include_plotlyjs='cdn')
+    elif fmt == 'png':
+        fig.write_image(path)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(fig_json)
+    return path
+
+
+def render_figures(figs, output_dir, formats=FORMATS, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, fig in figs.items():
+            fig_json = fig.to_json()
+            for fmt in formats:
+                path = os.path.join(output_dir, f"{name}.{fmt}")
+                jobs.append(executor.submit(_render, fig_json, path, fmt))
+        return [job.result() for job in jobs]
+
+
+def write_index(summary, figs, output_dir):
+    metrics = summary['metrics']
+    parts = [
+        "<html><head><meta charset='utf-8'><title>Reporte de Producción No Convencional</title></head><body>",
+        "<h2>Reporte de Producción No Convencional</h2>",
+        f"<p>Fecha de Alocación en Progreso: {summary['fecha_alocacion_en_progreso']}<br>",
+        f"Fecha de Última Alocación Finalizada y Consolidada: {summary['fecha_ultima_alocacion']}</p>",
+        "<ul>",
+        f"<li>Total Caudal de Gas (MMm³/d): {metrics['total_gas_rate']}</li>",
+        f"<li>Total Caudal de Petróleo (km³/d): {metrics['total_oil_rate']}</li>",
+        f"<li>Total Caudal de Petróleo (kbpd): {metrics['oil_rate_bpd']}</li>",
+        "</ul>",
+    ]
+    for i, fig in enumerate(figs.values()):
+        parts.append(fig.to_html(full_html=False, include_plotlyjs='cdn' if i == 0 else False))
+    parts.append("</body></html>")
+
+    path = os.path.join(output_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(parts))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reporte de producción no convencional sin Streamlit")
+    parser.add_argument('--source', default=loaders.PRODUCTION_URL, help="production CSV (URL or path)")
+    parser.add_argument('--output', default='report', help="output directory")
+    parser.add_argument('--formats', default='html,json', help="comma-separated subset of html,png,json")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+    if 'png' in formats:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("PNG export needs the `kaleido` package (pip install kaleido)")
+
+    summary, figs = build_report(shared.production_frame(args.source))
+
+    os.makedirs(args.output, exist_ok=True)
+    artifacts = render_figures(figs, args.output, formats, args.workers)
+    artifacts.append(write_index(summary, figs, args.output))
+
+    summary['artifacts'] = [os.path.basename(p) for p in artifacts]
+    with open(os.path.join(args.output, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(json.dumps(summary['metrics']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
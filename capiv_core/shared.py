@@ -0,0 +1,289 @@
+import glob
+import hashlib
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pyarrow as pa
+
+from capiv_core import aligned, loaders, months, operators
+
+# Read-only snapshots of the big tables as uncompressed Arrow IPC files.
+#
+# The first caller builds the frame and writes it atomically; everyone else
+# (other sessions, other server processes on the same host or shared volume)
+# memory-maps the file. Numeric and date columns come back as zero-copy views
+# of the mapping, so the pages get the same physical pages from the OS cache
+# instead of a private copy each. The frames are shared: never write into
+# them, filter first (the filtered result is a private copy).
+#
+# On a cold start `prefetch` builds the stale snapshots at the same time, so
+# the wait is that of the slowest download instead of the sum of all of them.
+#
+#   python -m capiv_core.shared      # rebuild the snapshots, e.g. from cron
+
+SNAPSHOT_DIR = os.environ.get('CAPIV_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'capiv_snapshots'))
+MAX_AGE = float(os.environ.get('CAPIV_SNAPSHOT_MAX_AGE', 24 * 3600))  # seconds
+LOCK_TIMEOUT = 600  # seconds before a builder's lock is considered stale
+VERSION = 10  # bump when the loaders change what goes into the snapshots
+# Failures of a snapshot build that prefetch reports instead of raising:
+# downloads, timeouts and HTTP errors (OSError) and unreadable CSVs (ValueError)
+FETCH_ERRORS = (OSError, ValueError)
+MAX_MONTH_INDEXES = 4  # snapshot versions kept by production_month_index
+
+
+def snapshot_path(name, source):
+    key = f"{VERSION}:{operators.table_version()}:{source}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{digest}.arrow")
+
+
+def is_fresh(path, max_age=MAX_AGE):
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age
+
+
+def write_snapshot(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Write next to the target and rename, so readers never see a partial file
+    tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def read_table(path):
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+# Identity of a snapshot file: its path and modification time
+def snapshot_version(path):
+    return path, os.stat(path).st_mtime_ns
+
+
+def read_snapshot(path):
+    # The file can be replaced while it is read: stamp the frame with the
+    # version it was read from
+    while True:
+        version = snapshot_version(path)
+        table = read_table(path)
+        if snapshot_version(path) == version:
+            break
+    # split_blocks keeps one block per column, so columns without nulls are
+    # views of the mapping instead of being consolidated into new 2-D blocks
+    df = table.to_pandas(split_blocks=True)
+    df.attrs['snapshot'] = version
+    return df
+
+
+# Seconds since the lock was last refreshed (inf if there is no lock)
+def _lock_age(lock):
+    try:
+        return time.time() - os.path.getmtime(lock)
+    except FileNotFoundError:
+        return float('inf')
+
+
+# Only one process builds a given snapshot at a time; the others wait for it
+def _acquire(lock):
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > LOCK_TIMEOUT:
+                    os.remove(lock)
+                    continue
+            except FileNotFoundError:
+                continue
+            return False
+
+
+# The builder touches its lock while it works, so a download longer than
+# LOCK_TIMEOUT is not taken for a dead builder; a crashed one stops touching it
+def _keep_alive(lock, done):
+    while not done.wait(LOCK_TIMEOUT / 4):
+        try:
+            os.utime(lock)
+        except FileNotFoundError:
+            return
+
+
+# Path of a fresh snapshot, building it first if needed
+def ensure(name, source, build, max_age=MAX_AGE):
+    path = snapshot_path(name, source)
+    if is_fresh(path, max_age):
+        return path
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    lock = path + '.lock'
+    # Wait while another process holds the lock; build only once this one has
+    # it and the snapshot is still stale
+    while not _acquire(lock):
+        while _lock_age(lock) <= LOCK_TIMEOUT:
+            time.sleep(0.5)
+        if is_fresh(path, max_age):
+            return path
+
+    done = threading.Event()
+    threading.Thread(target=_keep_alive, args=(lock, done), name='capiv-lock', daemon=True).start()
+    try:
+        if not is_fresh(path, max_age):
+            write_snapshot(build(source), path)
+    finally:
+        done.set()
+        if os.path.exists(lock):
+            os.remove(lock)
+    return path
+
+
+def frame(name, source, build, max_age=MAX_AGE):
+    return read_snapshot(ensure(name, source, build, max_age))
+
+
+# Snapshot name -> (default source, build function)
+SNAPSHOTS = {
+    'production': (loaders.PRODUCTION_URL, loaders.load_report_data),
+    'frac': (loaders.FRAC_URL, loaders.load_frac_data),
+}
+
+
+def production_frame(source=loaders.PRODUCTION_URL, max_age=MAX_AGE):
+    return frame('production', source, loaders.load_report_data, max_age)
+
+
+def frac_frame(source=loaders.FRAC_URL, max_age=MAX_AGE):
+    return frame('frac', source, loaders.load_frac_data, max_age)
+
+
+def _ensure_named(name, source, max_age):
+    return ensure(name, source, SNAPSHOTS[name][1], max_age)
+
+
+# Month index (capiv_core.months) of a production frame read from a snapshot,
+# built once per snapshot version and shared by everyone holding that frame
+# (the version is stamped on the frame by read_snapshot, so a frame read
+# before a rebuild keeps getting its own index); other frames get a new one
+_month_indexes = OrderedDict()
+_month_indexes_lock = threading.Lock()
+
+
+def production_month_index(df):
+    version = df.attrs.get('snapshot')
+    if version is not None:
+        # attrs are carried over to filtered frames: key on the row count too
+        version = version + (len(df),)
+    else:
+        return months.MonthIndex(df)
+    with _month_indexes_lock:
+        index = _month_indexes.get(version)
+    if index is None:
+        index = months.MonthIndex(df)
+        with _month_indexes_lock:
+            _month_indexes[version] = index
+            while len(_month_indexes) > MAX_MONTH_INDEXES:
+                _month_indexes.popitem(last=False)
+    return index
+
+
+# Snapshot as a memory-mapped Arrow table, for engines that scan Arrow directly
+def arrow_table(name, source=None, max_age=MAX_AGE):
+    source = SNAPSHOTS[name][0] if source is None else source
+    return read_table(_ensure_named(name, source, max_age))
+
+
+# Build the stale snapshots of `sources` (name -> source, default: all of
+# SNAPSHOTS) concurrently and return the names built. Threads overlap the
+# downloads and the C parser, which runs without the GIL; with `processes`
+# every snapshot is built in its own process and only the files come back.
+# `progress(done, total, name)` is called before the first build (name None)
+# and after each one. With `on_error`, a build failing with FETCH_ERRORS is
+# reported as on_error(name, error) and the others go on (the loaders retry
+# it later); without it the error is raised.
+def prefetch(sources=None, max_age=MAX_AGE, processes=False, progress=None, on_error=None):
+    if sources is None:
+        sources = {name: source for name, (source, _) in SNAPSHOTS.items()}
+    stale = {
+        name: source for name, source in sources.items()
+        if not is_fresh(snapshot_path(name, source), max_age)
+    }
+    if not stale:
+        return []
+
+    if progress is not None:
+        progress(0, len(stale), None)
+    if processes:
+        pool = ProcessPoolExecutor(len(stale), mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = ThreadPoolExecutor(len(stale), thread_name_prefix='capiv-prefetch')
+    with pool:
+        futures = {
+            pool.submit(_ensure_named, name, source, max_age): name for name, source in stale.items()
+        }
+        built = []
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                future.result()
+            except FETCH_ERRORS as e:
+                if on_error is None:
+                    raise
+                on_error(futures[future], e)
+            else:
+                built.append(futures[future])
+            if progress is not None:
+                progress(done, len(stale), futures[future])
+    return built
+
+
+# Aligned wells x months arrays of the production snapshot, rebuilt whenever
+# the snapshot file changes and memory-mapped like the frames
+def aligned_store(source=loaders.PRODUCTION_URL, max_age=MAX_AGE):
+    production = production_frame(source, max_age)
+    snapshot = snapshot_path('production', source)
+    prefix = snapshot[:-len('.arrow')] + '-aligned-'
+    path = f"{prefix}{os.stat(snapshot).st_mtime_ns}"
+
+    if not os.path.isdir(path):
+        tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        aligned.save(aligned.build(production), tmp)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Another process published the same version first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        # Older versions; processes that still map them keep their open files
+        for old in glob.glob(prefix + '*'):
+            if old != path and not old.endswith('.tmp'):
+                shutil.rmtree(old, ignore_errors=True)
+    return aligned.load(path)
+
+
+def main():
+    # Rebuild both snapshots at the same time, then read the fresh files
+    prefetch(max_age=0, processes=True)
+    for build in (production_frame, frac_frame):
+        df = build()
+        print(f"{build.__name__}: {len(df)} rows")
+    store = aligned_store()
+    print(f"aligned_store: {len(store)} wells x {store.n_months} months")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+
+# Uniform-grid index over well surface locations (coordenadax = longitude,
+# coordenaday = latitude, decimal degrees).
+#
+# Locations are projected to local metres (equirectangular around the mean
+# latitude, well under 0.5 % error across the basin) and bucketed in square
+# cells; the wells are stored sorted by cell, so a query only looks at the
+# cells its bounding box touches and then checks exact distances.
+#
+#   index = spatial.from_frame(production)
+#   index.nearest_to('YPF.Nq.LCav-123(h)', k=5)
+#   index.within(-68.9, -38.3, 2000)
+
+EARTH_RADIUS_M = 6371008.8
+
+
+class SpatialIndex:
+
+    def __init__(self, siglas, lon, lat, areas=None, cell_m=1000.0):
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        valid = np.isfinite(lon) & np.isfinite(lat) & (lon != 0) & (lat != 0)
+
+        self.siglas = np.asarray(siglas)[valid]
+        self.lon = lon[valid]
+        self.lat = lat[valid]
+        self.index = {sigla: i for i, sigla in enumerate(self.siglas.tolist())}
+        self.cell_m = float(cell_m)
+
+        self.cos_lat0 = np.cos(np.deg2rad(self.lat.mean())) if len(self.lat) else 1.0
+        self.x, self.y = self.project(self.lon, self.lat)
+        self.x0 = self.x.min() if len(self.x) else 0.0
+        self.y0 = self.y.min() if len(self.y) else 0.0
+
+        cx, cy = self._cell(self.x, self.y)
+        self.nx = int(cx.max()) + 1 if len(cx) else 1
+        self.ny = int(cy.max()) + 1 if len(cy) else 1
+        cell = cy * self.nx + cx
+        self.order = np.argsort(cell, kind='stable')
+        self.cells = cell[self.order]
+
+        self.areas = {}
+        if areas is not None:
+            areas = pd.Series(np.asarray(areas)[valid])
+            self.areas = {area: rows.to_numpy() for area, rows in areas.groupby(areas).groups.items()}
+
+    def __len__(self):
+        return len(self.siglas)
+
+    def project(self, lon, lat):
+        x = EARTH_RADIUS_M * np.deg2rad(lon) * self.cos_lat0
+        y = EARTH_RADIUS_M * np.deg2rad(lat)
+        return x, y
+
+    def unproject(self, x, y):
+        lon = np.rad2deg(np.asarray(x) / (EARTH_RADIUS_M * self.cos_lat0))
+        lat = np.rad2deg(np.asarray(y) / EARTH_RADIUS_M)
+        return lon, lat
+
+    def _cell(self, x, y):
+        cx = np.floor((np.asarray(x) - self.x0) / self.cell_m).astype(np.int64)
+        cy = np.floor((np.asarray(y) - self.y0) / self.cell_m).astype(np.int64)
+        return cx, cy
+
+    # (lon, lat) of a well
+    def location(self, sigla):
+        row = self.index[sigla]
+        return self.lon[row], self.lat[row]
+
+    # Rows of the wells in the cells touched by a bounding box (in metres)
+    def _candidates(self, xmin, ymin, xmax, ymax):
+        (cx0, cx1), (cy0, cy1) = self._cell([xmin, xmax], [ymin, ymax])
+        cx0, cx1 = max(cx0, 0), min(cx1, self.nx - 1)
+        cy0, cy1 = max(cy0, 0), min(cy1, self.ny - 1)
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+
+        # Each grid row of the box is one contiguous run of cell ids
+        row_starts = np.arange(cy0, cy1 + 1) * self.nx
+        lo = np.searchsorted(self.cells, row_starts + cx0, side='left')
+        hi = np.searchsorted(self.cells, row_starts + cx1, side='right')
+        return np.concatenate([self.order[a:b] for a, b in zip(lo, hi)])
+
+    def _result(self, rows, distances):
+        by_distance = np.argsort(distances, kind='stable')
+        rows, distances = rows[by_distance], distances[by_distance]
+        return pd.DataFrame({
+            'sigla': self.siglas[rows],
+            'distancia_m': distances.round(1),
+            'coordenadax': self.lon[rows],
+            'coordenaday': self.lat[rows],
+        })
+
+    def _within_xy(self, x, y, radius_m):
+        rows = self._candidates(x - radius_m, y - radius_m, x + radius_m, y + radius_m)
+        distances = np.hypot(self.x[rows] - x, self.y[rows] - y)
+        inside = distances <= radius_m
+        return rows[inside], distances[inside]
+
+    # Wells within `radius_m` metres of a point, nearest first
+    def within(self, lon, lat, radius_m):
+        x, y = self.project(lon, lat)
+        return self._result(*self._within_xy(x, y, radius_m))
+
+    # The `k` nearest wells to a point
+    def nearest(self, lon, lat, k=5, exclude=()):
+        x, y = self.project(lon, lat)
+        k = min(k, len(self) - len(exclude))
+        if k <= 0:
+            return self._result(np.empty(0, dtype=np.int64), np.empty(0))
+
+        excluded = [self.index[s] for s in exclude if s in self.index]
+        radius = self.cell_m
+        max_radius = self.cell_m * np.hypot(self.nx, self.ny) + np.hypot(x - self.x0, y - self.y0)
+        while True:
+            rows, distances = self._within_xy(x, y, radius)
+            keep = ~np.isin(rows, excluded)
+            rows, distances = rows[keep], distances[keep]
+            # Every well closer than `radius` is in the result, so once there are
+            # k of them they are the k nearest
+            if len(rows) >= k or radius > max_radius:
+                break
+            radius *= 2
+        closest = np.argsort(distances, kind='stable')[:k]
+        return self._result(rows[closest], distances[closest])
+
+    # Offset wells of a given well: within `radius_m` and/or the `k` nearest
+    def nearest_to(self, sigla, k=None, radius_m=None):
+        lon, lat = self.location(sigla)
+        if radius_m is None:
+            return self.nearest(lon, lat, k or 5, exclude=(sigla,))
+        found = self.within(lon, lat, radius_m)
+        found = found[found['sigla'] != sigla]
+        return found.head(k) if k else found
+
+    # Every pair of wells closer than `radius_m` as (row, neighbour row,
+    # distance) arrays, for the wells at `rows` (all by default). With cells of
+    # `radius_m` a well's neighbours can only be in the 3x3 cells around it, so
+    # the join costs O(n log n + pairs) instead of an n x n distance matrix.
+    def pairs_within(self, radius_m, rows=None):
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        cx = np.floor((self.x - self.x0) / radius_m).astype(np.int64) + 1
+        cy = np.floor((self.y - self.y0) / radius_m).astype(np.int64) + 1
+        nx = int(cx.max()) + 2 if len(cx) else 1
+        cell = cy * nx + cx
+        order = np.argsort(cell, kind='stable')
+        cells = cell[order]
+
+        found_i, found_j = [], []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                target = cell[rows] + dy * nx + dx
+                lo = np.searchsorted(cells, target, side='left')
+                counts = np.searchsorted(cells, target, side='right') - lo
+                total = counts.sum()
+                first = np.repeat(np.cumsum(counts) - counts, counts)
+                found_i.append(np.repeat(rows, counts))
+                found_j.append(order[np.repeat(lo, counts) + np.arange(total) - first])
+
+        i, j = np.concatenate(found_i), np.concatenate(found_j)
+        distances = np.hypot(self.x[i] - self.x[j], self.y[i] - self.y[j])
+        keep = (i != j) & (distances <= radius_m)
+        return i[keep], j[keep], distances[keep]
+
+    # Wells inside a polygon given as [(lon, lat), ...]
+    def in_polygon(self, polygon):
+        px, py = self.project(*np.asarray(polygon, dtype=float).T)
+        rows = self._candidates(px.min(), py.min(), px.max(), py.max())
+        x, y = self.x[rows][:, None], self.y[rows][:, None]
+
+        # Ray casting, all candidates against all edges at once
+        x1, y1 = px[None, :], py[None, :]
+        x2, y2 = np.roll(px, -1)[None, :], np.roll(py, -1)[None, :]
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside = (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
+        rows = rows[inside]
+        return self.siglas[np.sort(rows)]
+
+    # Wells of a field area (areayacimiento)
+    def in_area(self, area):
+        return self.siglas[self.areas.get(area, np.empty(0, dtype=np.int64))]
+
+
+# One location per well from the production frame
+def from_frame(df, cell_m=1000.0):
+    located = df[np.isfinite(df['coordenadax']) & np.isfinite(df['coordenaday'])]
+    wells = located.drop_duplicates(subset='sigla')
+    areas = wells['areayacimiento'] if 'areayacimiento' in wells else None
+    return SpatialIndex(wells['sigla'], wells['coordenadax'], wells['coordenaday'], areas, cell_m)
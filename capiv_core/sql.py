@@ -0,0 +1,125 @@
+import pyarrow as pa
+
+from capiv_core import shared
+
+try:
+    import duckdb
+except ImportError:  # optional dependency: pip install duckdb
+    duckdb = None
+
+# Optional in-process SQL engine (DuckDB) over the shared snapshots.
+#
+# The Arrow snapshots are registered as views without a copy, so filters and
+# aggregations run in DuckDB's vectorized, multi-threaded engine over the
+# mapped columns instead of a pandas groupby over the whole frame. Queries
+# are read-only: each one runs as a subquery (no DDL, one statement) with a
+# row limit, and file and network access is disabled for the whole engine.
+#
+#   engine = sql.Engine.from_snapshots()
+#   engine.query("SELECT empresaNEW, sum(prod_pet) FROM produccion WHERE anio = ? GROUP BY 1", [2024])
+#   engine.breakdown('produccion', ['empresaNEW', 'anio'], 'prod_pet', 'sum', {'formprod': 'VMUT'})
+
+TABLES = {'produccion': 'production', 'fractura': 'frac'}  # view -> snapshot
+AGGREGATES = ('sum', 'avg', 'median', 'min', 'max', 'count')
+MAX_ROWS = 10000
+
+Error = duckdb.Error if duckdb is not None else Exception
+
+
+def available():
+    return duckdb is not None
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _param(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+class Engine:
+
+    def __init__(self, tables, threads=None):
+        if duckdb is None:
+            raise ImportError("The SQL engine needs the `duckdb` package (pip install duckdb)")
+        self.con = duckdb.connect(':memory:')
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        self.tables = tables  # keeps the Arrow tables (and their mappings) alive
+        self.columns = {name: list(table.schema.names) for name, table in tables.items()}
+        self.numeric = {
+            name: [f.name for f in table.schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)]
+            for name, table in tables.items()
+        }
+        self.con.execute("SET enable_external_access = false")
+        self.con.execute("SET lock_configuration = true")
+
+    # Engine over the memory-mapped snapshots; `sources` maps snapshot names
+    # to sources (default: the ones in capiv_core.shared.SNAPSHOTS)
+    @classmethod
+    def from_snapshots(cls, sources=None, max_age=shared.MAX_AGE, threads=None):
+        sources = sources or {}
+        return cls({
+            view: shared.arrow_table(snapshot, sources.get(snapshot), max_age)
+            for view, snapshot in TABLES.items()
+        }, threads)
+
+    # Result of one SELECT (or WITH) statement with positional `?` parameters
+    def query(self, sql, params=None, limit=MAX_ROWS):
+        statement = sql.strip().rstrip(';').strip()
+        if not statement:
+            raise ValueError("Empty query")
+        if ';' in statement:
+            raise ValueError("Only one statement per query")
+        wrapped = f"SELECT * FROM ({statement}) AS consulta"
+        if limit is not None:
+            wrapped += f" LIMIT {int(limit)}"
+
+        # Cursors are independent connections to the same database, so
+        # sessions can query at the same time; registering the Arrow tables
+        # on each one is free (no copy)
+        cursor = self.con.cursor()
+        try:
+            for name, table in self.tables.items():
+                cursor.register(name, table)
+            return cursor.execute(wrapped, [_param(p) for p in params or []]).df()
+        finally:
+            cursor.close()
+
+    # SQL and parameters of an aggregation of `value` by the `by` columns;
+    # `filters` maps columns to a value (equality) or a list (membership)
+    def breakdown_sql(self, table, by, value, agg='sum', filters=None):
+        if table not in self.columns:
+            raise ValueError(f"Unknown table {table!r}, expected one of {sorted(self.columns)}")
+        if agg not in AGGREGATES:
+            raise ValueError(f"Unknown aggregation {agg!r}, expected one of {AGGREGATES}")
+        filters = filters or {}
+        unknown = [c for c in [*by, value, *filters] if c not in self.columns[table]]
+        if unknown:
+            raise ValueError(f"Unknown columns in {table}: {', '.join(map(str, unknown))}")
+
+        where, params = [], []
+        for column, selected in filters.items():
+            if isinstance(selected, (list, tuple, set)):
+                selected = list(selected)
+                if not selected:
+                    where.append('FALSE')
+                    continue
+                where.append(f"{_quote(column)} IN ({', '.join('?' * len(selected))})")
+                params.extend(selected)
+            else:
+                where.append(f"{_quote(column)} = ?")
+                params.append(selected)
+
+        keys = ', '.join(_quote(c) for c in by)
+        sql = f"SELECT {keys + ', ' if keys else ''}{agg}({_quote(value)}) AS {_quote(f'{value}_{agg}')} " \
+              f"FROM {_quote(table)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if keys:
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        return sql, params
+
+    def breakdown(self, table, by, value, agg='sum', filters=None, limit=MAX_ROWS):
+        return self.query(*self.breakdown_sql(table, by, value, agg, filters), limit=limit)
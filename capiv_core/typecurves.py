@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from capiv_core import aligned
+
+# Type curves: every well aligned on months on production (month 1 = first
+# month with oil or gas, see capiv_core.aligned), optionally normalized by
+# lateral length or stage count, summarized as P10/P50/P90 rate and cumulative
+# curves per cohort. As in the Productividad tab, P10 is the high case (90th
+# percentile).
+
+COHORTS = {
+    'start_year': 'Campaña',
+    'empresaNEW': 'Empresa',
+    'areayacimiento': 'Área',
+    'tipopozoNEW': 'Tipo de fluido',
+}
+
+# Normalization column -> (divisor, label suffix)
+NORMALIZERS = {
+    'longitud_rama_horizontal_m': (1000.0, '/1000 m'),
+    'cantidad_fracturas': (1.0, '/etapa'),
+}
+
+PERCENTILES = (('P10', 90), ('P50', 50), ('P90', 10))
+
+
+# P10/P50/P90 of every cohort and month in one pass: each month column is
+# sorted by (cohort, value) with NaN last, so the values of a cohort are a run
+# starting at the cohort's first row and every percentile is read at its
+# position in the run, interpolated linearly as in np.nanpercentile.
+# Returns (percentiles x cohorts x months, values per cohort x month)
+def _cohort_percentiles(values, groups, n_groups):
+    n_months = values.shape[1]
+    sizes = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(sizes) - sizes
+    counts = np.zeros((n_groups, n_months), dtype=np.int64)
+    if n_groups:
+        by_cohort = np.argsort(groups, kind='stable')
+        counts = np.add.reduceat(~np.isnan(values[by_cohort]), starts, axis=0, dtype=np.int64)
+
+    # Sorted by value, then (stable) by cohort
+    order = np.argsort(values, axis=0)
+    order = np.take_along_axis(order, np.argsort(groups[order], axis=0, kind='stable'), axis=0)
+    ordered = np.take_along_axis(values, order, axis=0)
+    months = np.arange(n_months)[None, :]
+    result = np.full((len(PERCENTILES), n_groups, n_months), np.nan)
+    for i, (_, p) in enumerate(PERCENTILES):
+        position = np.maximum(counts - 1, 0) * (p / 100)
+        lo = np.floor(position).astype(np.int64)
+        hi = np.ceil(position).astype(np.int64)
+        low, high = ordered[starts[:, None] + lo, months], ordered[starts[:, None] + hi, months]
+        result[i] = np.where(counts > 0, low + (high - low) * (position - lo), np.nan)
+    return result, counts
+
+
+# P10/P50/P90 curves per cohort; `wells` has one row per sigla with the cohort
+# and normalization columns, `store` is the aligned.AlignedStore of production
+def type_curves(store, wells, rate_col, cohort, normalize=None, min_wells=3, max_months=None):
+    wells = wells.drop_duplicates(subset='sigla').set_index('sigla')
+    rows = store.rows(wells.index)
+    siglas = store.siglas[rows]
+    columns = slice(0, max_months)
+    q = store[rate_col][rows, columns]
+    cum = store[aligned.CUMULATIVES[rate_col]][rows, columns]
+
+    attrs = wells.reindex(siglas)
+    if normalize:
+        divisor = attrs[normalize].to_numpy(dtype=float) / NORMALIZERS[normalize][0]
+        divisor = np.where(divisor > 0, divisor, np.nan)[:, None]
+        q, cum = q / divisor, cum / divisor
+
+    # Wells without a cohort value are left out
+    groups, labels = pd.factorize(attrs[cohort], sort=True)
+    in_cohort = groups >= 0
+    groups, q, cum = groups[in_cohort], q[in_cohort], cum[in_cohort]
+    rate_p, n_wells = _cohort_percentiles(q, groups, len(labels))
+    cum_p, _ = _cohort_percentiles(cum, groups, len(labels))
+
+    n_months = q.shape[1]
+    curves = pd.DataFrame({
+        cohort: np.repeat(labels.to_numpy(), n_months),
+        'mes': np.tile(np.arange(1, n_months + 1), len(labels)),
+        'n_pozos': n_wells.ravel(),
+    })
+    for i, (name, _) in enumerate(PERCENTILES):
+        curves[f'q_{name}'] = rate_p[i].ravel()
+        curves[f'acum_{name}'] = cum_p[i].ravel()
+    return curves[curves['n_pozos'] >= min_wells].reset_index(drop=True)
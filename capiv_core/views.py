@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# Filtering over the cached frames without writing into them.
+#
+# The loaders' frames are shared by every session (st.cache_resource, shared
+# snapshots) and must be treated as read-only. `rows` returns only the
+# matching rows as a new frame that is not flagged as a slice of the source,
+# and `derive` adds computed columns on a shallow copy, evaluated only on the
+# rows it gets. Neither touches its input, so there are no SettingWithCopy
+# chains and no defensive copies of the whole table.
+#
+#   well = views.rows(data_sorted, empresa=selected_empresa, sigla=selected_sigla)
+#   well = views.derive(well, counter=views.counter)
+
+
+# Boolean mask for equality (scalar) or membership (list-like) filters
+def mask(df, **filters):
+    selected = np.ones(len(df), dtype=bool)
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+            selected &= df[column].isin(value).to_numpy()
+        else:
+            selected &= (df[column] == value).to_numpy()
+    return selected
+
+
+def rows(df, columns=None, **filters):
+    # take() allocates the selected rows only and, unlike df[mask], does not
+    # keep a reference to the source for SettingWithCopy checks
+    selected = df.take(np.flatnonzero(mask(df, **filters)))
+    if columns is not None:
+        selected = selected.take([selected.columns.get_loc(c) for c in columns], axis=1)
+    return selected
+
+
+def derive(df, **columns):
+    # Shallow copy: existing columns are shared, new ones live only in the copy
+    out = df.copy(deep=False)
+    for name, value in columns.items():
+        out[name] = value(out) if callable(value) else value
+    return out
+
+
+# Computed columns used by the pages
+def counter(df):
+    return range(1, len(df) + 1)
@@ -0,0 +1,145 @@
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from capiv_core import backend, views
+
+# Well-level tables shared by the Ranking and FracData report pages
+# (pluggable functions also run on the Polars backend, see capiv_core.backend)
+
+
+# Fluid type per well from cumulative GOR (McCain)
+@backend.pluggable
+def classify_mccain(data_filtered):
+    # Step 1: Create a Pivot Table with Cumulated Values
+    pivot_table = data_filtered.pivot_table(
+        values=['Np', 'Gp', 'Wp'],
+        index=['sigla'],
+        aggfunc={'Np': 'max', 'Gp': 'max', 'Wp': 'max'}
+    )
+
+    # Step 2: Create a New DataFrame with GOR
+    cum_df = pivot_table.reset_index()
+    cum_df['GOR'] = (cum_df['Gp'] / cum_df['Np']) * 1000
+    cum_df['GOR'] = cum_df['GOR'].fillna(100000)  # Handle NaN values
+
+    # Step 3: Add a new column "Fluido McCain" based on conditions
+    cum_df['Fluido McCain'] = cum_df.apply(
+        lambda row: 'Gasífero' if row['Np'] == 0 or row['GOR'] > 3000 else 'Petrolífero',
+        axis=1
+    )
+
+    # Step 4: Ensure `tipopozo` is unique for each `sigla` and merge it
+    tipopozo_unique = data_filtered[['sigla', 'tipopozo']].drop_duplicates(subset=['sigla'])
+    cum_df = cum_df.merge(tipopozo_unique, on='sigla', how='left')
+
+    # Step 5: Create the 'tipopozoNEW' column based on the 'tipopozo' and 'Fluido McCain'
+    cum_df['tipopozoNEW'] = cum_df.apply(
+        lambda row: row['Fluido McCain'] if row['tipopozo'] == 'Otro tipo' else row['tipopozo'],
+        axis=1
+    )
+
+    # Step 6: Calculate WOR and WGR
+    cum_df['WOR'] = cum_df['Wp'] / cum_df['Np']
+    cum_df['WOR'] = cum_df['WOR'].fillna(100000)  # Handle NaN values
+    cum_df['WGR'] = (cum_df['Wp'] / cum_df['Gp']) * 1000
+    cum_df['WGR'] = cum_df['WGR'].fillna(100000)  # Handle NaN values
+
+    # Step 7: Create the final table with the desired columns
+    return cum_df[['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW']]
+
+
+# Merge `tipopozoNEW` back into the monthly production rows
+@backend.pluggable
+def add_fluid_type(data_filtered, cum_df):
+    return data_filtered.merge(
+        cum_df[['sigla', 'tipopozoNEW']],
+        on='sigla',
+        how='left'
+    )
+
+
+# Calculate additional metrics and create the new DataFrame
+@backend.pluggable
+def create_summary_dataframe(data_filtered):
+    # Calculate Qo peak and Qg peak (maximum oil and gas rates) and the starting
+    # year for each well, on a view so the caller's frame is left untouched
+    data_filtered = views.derive(
+        data_filtered,
+        Qo_peak=lambda df: df.groupby('sigla')['oil_rate'].transform('max'),
+        Qg_peak=lambda df: df.groupby('sigla')['gas_rate'].transform('max'),
+        start_year=lambda df: df.groupby('sigla')['anio'].transform('min'),
+    )
+
+    # Calculate EUR at 30, 90, and 180 days based on dates
+    def calculate_eur(group):
+        group = group.sort_values('date')  # Ensure the data is sorted by date
+
+        # Get the start date for the group
+        start_date = group['date'].iloc[0]
+
+        # Define target dates
+        target_dates = {
+            'EUR_30': start_date + relativedelta(days=30),
+            'EUR_90': start_date + relativedelta(days=90),
+            'EUR_180': start_date + relativedelta(days=180)
+        }
+
+        # Initialize EUR columns
+        for key, target_date in target_dates.items():
+            group[key] = group.loc[
+                group['date'] <= target_date,
+                'Np' if group['tipopozoNEW'].iloc[0] == 'Petrolífero' else 'Gp'
+            ].max()
+
+        return group
+
+    data_filtered = data_filtered.groupby('sigla', group_keys=False).apply(calculate_eur)
+
+    # Create the new DataFrame with selected columns
+    summary_df = data_filtered.groupby('sigla').agg({
+        'date': 'first',
+        'start_year': 'first',
+        'empresaNEW': 'first',
+        'formprod': 'first',
+        'sub_tipo_recurso': 'first',
+        'Np': 'max',
+        'Gp': 'max',
+        'Wp': 'max',
+        'Qo_peak': 'max',
+        'Qg_peak': 'max',
+        'EUR_30': 'max',
+        'EUR_90': 'max',
+        'EUR_180': 'max'
+    }).reset_index()
+
+    return summary_df
+
+
+# Merge the frac records with the McCain table on 'sigla'
+def merge_frac_fluids(df_frac, cum_df):
+    return pd.merge(
+        df_frac,
+        cum_df,
+        on='sigla',
+        how='outer'
+    ).drop_duplicates()
+
+
+# Merge the well summary and keep only wells with a frac record
+def merge_summary(df_merged, summary_df):
+    df_merged_final = pd.merge(
+        df_merged,
+        summary_df,
+        on='sigla',
+        how='outer'
+    ).drop_duplicates()
+
+    # Filter out rows where 'id_base_fractura_adjiv' is null
+    return df_merged_final[df_merged_final['id_base_fractura_adjiv'].notna()]
+
+
+# Only keep VMUT as the target formation and filter for SHALE resource type
+def filter_vmut(df_merged_final):
+    return df_merged_final[
+        (df_merged_final['formprod'] == 'VMUT') & (df_merged_final['sub_tipo_recurso'] == 'SHALE')
+    ]
@@ -1,42 +1,52 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
 import plotly.express as px
 
-# Define the columns for the dataset
-COLUMNS = [
-    'sigla',  # well identifier
-    'anio',  # year
-    'mes',  # month
-    'prod_pet',  # oil production
-    'prod_gas',  # gas production
-    'prod_agua',  # water production
-    'iny_gas',  # gas injection
-    'tef',  # effective time
-    'tipoextraccion',  # extraction type
-    'tipopozo',  # well type
-    'empresa',  # company
-    'formacion',  # formation
-    'areayacimiento',  # field area
-    'fecha_data'  # data date
-]
-
-# Load and sort the data
-@st.cache_data
-def load_and_sort_data(dataset_url):
-    df = pd.read_csv(dataset_url, usecols=COLUMNS)
-    df['date'] = pd.to_datetime(df['anio'].astype(str) + '-' + df['mes'].astype(str) + '-1')
-    df['gas_rate'] = df['prod_gas'] / df['tef']
-    df['oil_rate'] = df['prod_pet'] / df['tef']
-    data_sorted = df.sort_values(by=['sigla', 'fecha_data'], ascending=True)
-    return data_sorted
+from capiv_core import loaders, options, ownership, profiling, shared
+
+profiling.start_run("Production Analysis")
 
-# URL of the dataset
-dataset_url = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+# Load the production data (read-only snapshot shared by all sessions): rates
+# are NaN in months with TEF = 0, so the area sums stay finite
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_and_sort_data(dataset_url):
+    return shared.production_frame(dataset_url)
 
 # Load and sort the data using the cached function
-data_sorted = load_and_sort_data(dataset_url)
+data_sorted = load_and_sort_data(loaders.PRODUCTION_URL)
+
+# Operator periods of every well (who operated it and when)
+@profiling.profiled("aggregate")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def operator_periods(dataset_url):
+    return ownership.intervals(load_and_sort_data(dataset_url), column='empresa')
+
+periods = operator_periods(loaders.PRODUCTION_URL)
+
+# Row positions of each company's production, per attribution: the months it
+# reported (historical) or every month of the wells it operates today
+# (current, from ownership.well_operators). Computed once per dataset, so a
+# selection takes its rows instead of scanning all of them
+@profiling.profiled("aggregate")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def company_rows(dataset_url):
+    data_sorted = load_and_sort_data(dataset_url)
+    operators = ownership.well_operators(operator_periods(dataset_url), column='empresa')
+    current = data_sorted['sigla'].map(operators.set_index('sigla')['empresa_actual'])
+    return {
+        'historica': data_sorted.groupby('empresa', sort=False).indices,
+        'actual': data_sorted.groupby(current.to_numpy(), sort=False).indices,
+    }
+
+# Option lists of the company and area selectors, computed once per dataset and shared by all sessions
+@profiling.profiled("aggregate")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_options(dataset_url):
+    return options.OptionLists(load_and_sort_data(dataset_url), ['empresa', 'areayacimiento'])
+
+company_options = load_options(loaders.PRODUCTION_URL)
 
 # Sidebar filters
 st.header(f":blue[Análisis de Producción No Convencional]")
@@ -47,17 +57,27 @@ st.sidebar.title("Por favor filtrar aquí:")
 # Selectbox for companies
 selected_company = st.sidebar.selectbox(
     "Seleccione la empresa",
-    options=data_sorted['empresa'].unique()
+    options=company_options.values('empresa')
 )
 
-# Filter data based on selected company
-company_data = data_sorted[data_sorted['empresa'] == selected_company]
-
-# Summarize production data by field area
-summary_df = company_data.groupby(['areayacimiento', 'date']).agg(
-    total_gas_rate=('gas_rate', 'sum'),
-    total_oil_rate=('oil_rate', 'sum')
-).reset_index()
+# Historical view: the months the company operated each well; current view:
+# the whole history of the wells it operates today
+attributions = {
+    'Meses en que operó cada pozo': 'historica',
+    'Historia completa de sus pozos actuales': 'actual',
+}
+attribution = attributions[st.sidebar.radio("Producción atribuida a la empresa", list(attributions))]
+
+with profiling.stage("resumen por área", "aggregate", rows_in=data_sorted) as s:
+    # Filter data based on selected company
+    company_data = data_sorted.take(company_rows(loaders.PRODUCTION_URL)[attribution].get(selected_company, []))
+
+    # Summarize production data by field area
+    summary_df = company_data.groupby(['areayacimiento', 'date']).agg(
+        total_gas_rate=('gas_rate', 'sum'),
+        total_oil_rate=('oil_rate', 'sum')
+    ).reset_index()
+    s.rows_out = summary_df
 
 # Plot total oil production by field area over time using stacked area plot
 oil_rate_fig = go.Figure()
@@ -117,10 +137,15 @@ gas_rate_fig.update_layout(
 # Display the gas production plot
 st.plotly_chart(gas_rate_fig, use_container_width=True)
 
-# Selectbox for areas based on selected company
+# Selectbox for areas based on selected company (the areas of its current
+# wells include months operated by others, so they come from company_data)
+if attribution == 'actual':
+    company_areas = company_data['areayacimiento'].unique()
+else:
+    company_areas = company_options.values('areayacimiento', empresa=selected_company)
 selected_area = st.selectbox(
     "Seleccione el área de yacimiento",
-    options=company_data['areayacimiento'].unique()
+    options=company_areas
 )
 
 # Number input for year selection
@@ -198,3 +223,27 @@ top_gas_fig.update_layout(
 
 # Display the top 10 wells gas production plot
 st.plotly_chart(top_gas_fig, use_container_width=True)
+
+# Wells the selected company acquired or handed over
+with profiling.stage("cambios de operadora", "derive", rows_in=periods) as s:
+    company_transfers = ownership.transfers(periods, column='empresa')
+    company_transfers = company_transfers[
+        (company_transfers['empresa_anterior'] == selected_company) |
+        (company_transfers['empresa_nueva'] == selected_company)
+    ]
+    s.rows_out = company_transfers
+
+if not company_transfers.empty:
+    st.subheader("Cambios de Operadora")
+    st.dataframe(
+        company_transfers.sort_values('fecha', ascending=False).rename(columns={
+            'sigla': 'Sigla',
+            'empresa_anterior': 'Operadora Anterior',
+            'empresa_nueva': 'Operadora Nueva',
+            'fecha': 'Fecha',
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+profiling.debug_panel()
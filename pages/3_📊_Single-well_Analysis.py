@@ -1,7 +1,11 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
+import os
+
+from capiv_core import export, loaders, options, profiling, shared, views
+
+profiling.start_run("Single-well Analysis")
 
 COLUMNS = [
     'sigla',  # atemporal
@@ -20,30 +24,27 @@ COLUMNS = [
     'fecha_data'  # temporal
 ]
 
-# Reorder and rename the columns in the DataFrame
-@st.cache(allow_output_mutation=True)
+# Columns of the well table: the dataset columns, then the ones derived at ingestion
+WELL_COLUMNS = COLUMNS + ['gas_rate', 'oil_rate', 'water_rate', 'Np', 'Gp', 'Wp', 'calidad', 'date']
+
+# Load the production data (read-only snapshot shared by all sessions, with
+# the quality bitmask, rates and cumulatives of capiv_core.loaders)
+# The cached frame is shared by all sessions: filter it with capiv_core.views, never write into it
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
 def load_and_sort_data(dataset_url):
-    df = pd.read_csv(dataset_url, usecols=COLUMNS)
-    data_sorted = df.sort_values(by=['sigla', 'fecha_data'], ascending=True)
-    data_sorted = data_sorted[COLUMNS]
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
-    data_sorted['water_rate'] = data_sorted['prod_agua'] / data_sorted['tef']
-    data_sorted['Np'] = data_sorted.groupby('sigla')['prod_pet'].cumsum()
-    data_sorted['Gp'] = data_sorted.groupby('sigla')['prod_gas'].cumsum()
-    data_sorted['Wp'] = data_sorted.groupby('sigla')['prod_agua'].cumsum()
-    return data_sorted
-
-# URL of the dataset
-dataset_url = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+    return shared.production_frame(dataset_url)
 
 # Load and sort the data using the cached function
-data_sorted = load_and_sort_data(dataset_url)
+data_sorted = load_and_sort_data(loaders.PRODUCTION_URL)
+
+# Option lists of the sidebar filters, computed once per dataset and shared by all sessions
+@profiling.profiled("aggregate")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_options(dataset_url):
+    return options.OptionLists(load_and_sort_data(dataset_url), ['tipopozo', 'empresa', 'sigla'])
 
-# Add a new column "Fecha" by combining year and month
-data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-# Convert the "Fecha" column to datetime format
-data_sorted['date'] = pd.to_datetime(data_sorted['date'])
+well_options = load_options(loaders.PRODUCTION_URL)
 
 st.title(f":blue[Capítulo IV Dataset - Producción No Convencional]")
 
@@ -53,58 +54,45 @@ st.sidebar.title("Por favor filtrar aquí: ")
 
 # Create a multiselect widget for 'tipo pozo'
 # soon... type fluid classification by GOR (McCain)
-tipos_pozo = data_sorted['tipopozo'].unique()
+tipos_pozo = well_options.values('tipopozo')
 selected_tipos_pozo = st.sidebar.multiselect("Seleccionar tipo de pozo:", tipos_pozo)
 
 # Create a dropdown list for 'empresa'
-empresas = data_sorted['empresa'].unique()
+empresas = well_options.values('empresa')
 selected_empresa = st.sidebar.selectbox("Seleccionar operadora:", empresas)
 
-# Filter data based on selected 'tipo pozo' and 'empresa'
-matching_data = data_sorted[
-    (data_sorted['tipopozo'].isin(selected_tipos_pozo)) &
-    (data_sorted['empresa'] == selected_empresa)
-]
-
-# Get unique 'sigla' values based on selected 'empresa' and 'tipo pozo'
-siglas_for_selected_empresa = matching_data['sigla'].unique()
+# Search index over the siglas of the selected 'empresa' and 'tipo pozo'
+well_index = well_options.index('sigla', tipopozo=selected_tipos_pozo, empresa=selected_empresa)
 
-# Create a dropdown list for 'sigla'
+# Create a dropdown list for 'sigla' with the wells matching the search only
+sigla_query = st.sidebar.text_input("Buscar sigla del pozo", placeholder="Parte de la sigla, p. ej. LLL-12")
+siglas_for_selected_empresa = well_index.search(sigla_query)
+st.sidebar.caption(f"Mostrando {len(siglas_for_selected_empresa)} de {len(well_index)} pozos")
 selected_sigla = st.sidebar.selectbox("Seleccionar sigla del pozo", siglas_for_selected_empresa)
 
-# Filter data for matching 'empresa' and 'sigla'
-matching_data = data_sorted[
-    (data_sorted['empresa'] == selected_empresa) &
-    (data_sorted['sigla'] == selected_sigla)
-]
-
-# Calculate gas rate for the filtered data
-matching_data['gas_rate'] = matching_data['prod_gas'] / matching_data['tef']
-
-# Calculate oil rate and water rate for the filtered data
-matching_data['oil_rate'] = matching_data['prod_pet'] / matching_data['tef']
-matching_data['water_rate'] = matching_data['prod_agua'] / matching_data['tef']
-
-# Calculate cumulative Gp, Np, and Wp for the selected well
-matching_data['cumulative_gas'] = matching_data['Gp']
-matching_data['cumulative_oil'] = matching_data['Np']
-matching_data['cumulative_water'] = matching_data.groupby('sigla')['prod_agua'].cumsum()
-
-# Create a counter column for x-axis
-matching_data['counter'] = range(1, len(matching_data) + 1)
-
-# Filter data for matching 'tipo pozo'
-matching_tipo_pozo_data = data_sorted[data_sorted['tipopozo'].isin(selected_tipos_pozo)]
+with profiling.stage("pozo seleccionado", "derive", rows_in=data_sorted) as s:
+    # Filter data for matching 'empresa' and 'sigla' (rates come with the cached frame)
+    matching_data = views.rows(data_sorted, empresa=selected_empresa, sigla=selected_sigla)[WELL_COLUMNS]
+
+    # Cumulative Gp, Np, and Wp for the selected well and a counter column for x-axis
+    matching_data = views.derive(
+        matching_data,
+        cumulative_gas=lambda df: df['Gp'],
+        cumulative_oil=lambda df: df['Np'],
+        cumulative_water=lambda df: df['Wp'],
+        counter=views.counter,
+    )
 
-# Calculate maximum values below 1,000,000 for gas, oil, and water rates
-max_gas_rate = matching_data[matching_data['gas_rate'] <= 1000000]['gas_rate'].max()
-max_oil_rate = matching_data[matching_data['oil_rate'] <= 1000000]['oil_rate'].max()
-max_water_rate = matching_data[matching_data['water_rate'] <= 1000000]['water_rate'].max()
+    # Maximum gas, oil and water rates (months with TEF = 0 or impossible rates are NaN)
+    max_gas_rate = matching_data['gas_rate'].max()
+    max_oil_rate = matching_data['oil_rate'].max()
+    max_water_rate = matching_data['water_rate'].max()
 
-# Round the maximum rates to one decimal place
-max_gas_rate_rounded = round(max_gas_rate, 1)
-max_oil_rate_rounded = round(max_oil_rate, 1)
-max_water_rate_rounded = round(max_water_rate, 1)
+    # Round the maximum rates to one decimal place
+    max_gas_rate_rounded = round(max_gas_rate, 1)
+    max_oil_rate_rounded = round(max_oil_rate, 1)
+    max_water_rate_rounded = round(max_water_rate, 1)
+    s.rows_out = matching_data
 
 st.header(selected_sigla)
 col1, col2, col3 = st.columns(3)
@@ -192,6 +180,7 @@ def prepare_dataframe_for_download(data):
         'empresa': 'Empresa',
         'formacion': 'Formación',
         'areayacimiento': 'Área yacimiento',
+        'calidad': 'Control de calidad',
     }
     # Rename the columns
     data_renamed = data.rename(columns=renamed_columns)
@@ -204,21 +193,63 @@ matching_data_renamed = prepare_dataframe_for_download(matching_data)
 st.write(matching_data_renamed)
 
 # Define the function to convert DataFrame to CSV
-@st.cache
+@st.cache_data
 def convert_dataframe_to_csv(data):
     # Convert DataFrame to CSV and encode it as utf-8
     csv = data.to_csv(index=False).encode('utf-8')
     return csv
 
-# Call the function to convert DataFrame to CSV
-csv_data = convert_dataframe_to_csv(matching_data_renamed)
-
-# Add a button to download the CSV file
-if st.button(f"Descargar tabla como archivo CSV"):
-    st.download_button(
-        label="Descargar CSV",
-        data=csv_data,
-        file_name=f'{selected_sigla}.csv',
-        mime='text/csv',
-    )
+# Download the table of the selected well as a CSV file
+st.download_button(
+    label="Descargar tabla como archivo CSV",
+    data=convert_dataframe_to_csv(matching_data_renamed),
+    file_name=f'{selected_sigla}.csv',
+    mime='text/csv',
+)
 
+# Option lists of the bulk export filters, computed once per dataset
+@profiling.profiled("aggregate")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_export_options(dataset_url):
+    return options.OptionLists(load_and_sort_data(dataset_url), ['empresa', 'areayacimiento', 'anio'])
+
+# Bulk export: rows and well summaries of any filter, written chunk by chunk
+# from the production snapshot to a compressed file shared by all sessions
+with st.expander("Exportación masiva (varios pozos)"):
+    export_options = load_export_options(loaders.PRODUCTION_URL)
+    with st.form("bulk_export"):
+        export_empresas = st.multiselect("Operadoras", export_options.values('empresa'))
+        export_areas = st.multiselect("Áreas de yacimiento", export_options.values('areayacimiento'))
+        export_years = st.multiselect("Años", sorted(export_options.values('anio')))
+        export_siglas = st.text_area("Siglas (una por línea)")
+        export_format = st.radio("Formato", list(export.FORMATS), horizontal=True)
+        st.caption("Los filtros vacíos incluyen todos los pozos.")
+        prepare_export = st.form_submit_button("Preparar exportación")
+
+    if prepare_export:
+        export_filters = {
+            'empresa': list(export_empresas) or None,
+            'areayacimiento': list(export_areas) or None,
+            'anio': [int(year) for year in export_years] or None,
+            'sigla': [sigla.strip() for sigla in export_siglas.splitlines() if sigla.strip()] or None,
+        }
+        with st.spinner("Preparando exportación..."), profiling.stage("exportación masiva", "derive"):
+            st.session_state['bulk_export_file'] = (export.cached(export_filters, export_format), export_format)
+
+    # The last prepared export of this session, until the snapshot is rebuilt.
+    # The file is read only in the run triggered by "Descargar", so the other
+    # reruns of the page never load it into memory
+    if 'bulk_export_file' in st.session_state:
+        ready_path, ready_format = st.session_state['bulk_export_file']
+        if os.path.exists(ready_path) and st.button(
+            f"Descargar exportación ({ready_format.upper()}, {os.path.getsize(ready_path) / 1e6:.1f} MB)"
+        ):
+            with open(ready_path, 'rb') as export_file:
+                st.download_button(
+                    label="Guardar archivo",
+                    data=export_file,
+                    file_name=f'capiv_exportacion_{ready_format}.zip',
+                    mime='application/zip',
+                )
+
+profiling.debug_panel()
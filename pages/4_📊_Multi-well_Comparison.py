@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
 
+from capiv_core import decline, lift, loaders, options, profiling, shared, spatial, views
+
+profiling.start_run("Multi-well Comparison")
+
 COLUMNS = [
     'sigla',  # atemporal
     'anio',  # temporal
@@ -42,47 +45,40 @@ gas_gp_palette = ['#FF0000', '#FFA07A', '#FA8072', '#E9967A', '#F08080', '#CD5C5
 oil_np_palette = ['#008000', '#006400', '#90EE90', '#98FB98', '#8FBC8F', '#3CB371', '#2E8B57', '#808000', '#556B2F', '#6B8E23']
 water_wp_palette = ['#0000FF', '#0000CD', '#00008B', '#000080', '#191970', '#7B68EE', '#6A5ACD', '#483D8B', '#B0E0E6', '#ADD8E6', '#87CEFA', '#87CEEB', '#00BFFF', '#B0C4DE', '#1E90FF', '#6495ED']
 
-# Reorder and rename the columns in the DataFrame
-@st.cache(allow_output_mutation=True)
+# Load the production data (read-only snapshot shared by all sessions, the
+# same one the aligned store and the spatial index are built from)
+# The cached frame is shared by all sessions: filter it with capiv_core.views, never write into it
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
 def load_and_sort_data(dataset_url):
-    df = pd.read_csv(dataset_url, usecols=COLUMNS)
-    data_sorted = df.sort_values(by=['sigla', 'fecha_data'], ascending=True)
-    data_sorted = data_sorted[COLUMNS]
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
-    data_sorted['water_rate'] = data_sorted['prod_agua'] / data_sorted['tef']
-    data_sorted['Np'] = data_sorted.groupby('sigla')['prod_pet'].cumsum()
-    data_sorted['Gp'] = data_sorted.groupby('sigla')['prod_gas'].cumsum()
-    data_sorted['Wp'] = data_sorted.groupby('sigla')['prod_agua'].cumsum()
-    return data_sorted
-
-# URL of the dataset
-dataset_url = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
-
-# Load and sort the data using the cached function
-data_sorted = load_and_sort_data(dataset_url)
-
-# Add a new column "date" by combining year and month
-data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-data_sorted['date'] = pd.to_datetime(data_sorted['date'])
-
-# Create a Pivot Table to Calculate Maximum Oil and Gas Rates for Each Well
-pivot_table = data_sorted.pivot_table(
-    values=['gas_rate', 'oil_rate', 'water_rate'],
-    index=['sigla'],
-    aggfunc={'gas_rate': 'max', 'oil_rate': 'max', 'water_rate': 'max'}
-)
+    return shared.production_frame(dataset_url)
+
+# Option lists of the sidebar (McCain fluid from the maximum rates of every
+# well), computed once per dataset and shared by all sessions
+@profiling.profiled("aggregate")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_options(dataset_url):
+    data_sorted = load_and_sort_data(dataset_url)
+    # Create a Pivot Table to Calculate Maximum Oil and Gas Rates for Each Well
+    pivot_table = data_sorted.pivot_table(
+        values=['gas_rate', 'oil_rate', 'water_rate'],
+        index=['sigla'],
+        aggfunc={'gas_rate': 'max', 'oil_rate': 'max', 'water_rate': 'max'}
+    )
 
-# Step 2: Create a New DataFrame with Maximum Oil and Gas Rates
-max_rates_df = pivot_table.reset_index()
-max_rates_df['GOR'] = max_rates_df['gas_rate'] / max_rates_df['oil_rate']
-max_rates_df['GOR'] = max_rates_df['GOR'].fillna(100000)
+    # Step 2: Create a New DataFrame with Maximum Oil and Gas Rates
+    max_rates_df = pivot_table.reset_index()
+    max_rates_df['GOR'] = max_rates_df['gas_rate'] / max_rates_df['oil_rate']
+    max_rates_df['GOR'] = max_rates_df['GOR'].fillna(100000)
 
-# Add a new column "Fluido McCain" based on conditions
-max_rates_df['Fluido McCain'] = max_rates_df.apply(
-    lambda row: 'Gas' if row['oil_rate'] == 0 or row['GOR'] > 3000 else 'Petróleo',
-    axis=1
-)
+    # Add a new column "Fluido McCain" based on conditions
+    max_rates_df['Fluido McCain'] = max_rates_df.apply(
+        lambda row: 'Gas' if row['oil_rate'] == 0 or row['GOR'] > 3000 else 'Petróleo',
+        axis=1
+    )
+    return options.OptionLists(max_rates_df, ['Fluido McCain', 'sigla'])
+
+well_options = load_options(loaders.PRODUCTION_URL)
 
 st.header(f":blue[Capítulo IV Dataset - Producción No Convencional]")
 image = Image.open('Vaca Muerta rig.png')
@@ -90,29 +86,73 @@ st.sidebar.image(image)
 st.sidebar.title("Por favor filtrar aquí: ")
 
 # Create a dropdown list for "Fluido McCain"
-selected_fluido = st.sidebar.selectbox("Seleccionar tipo de fluido según McCain:", max_rates_df['Fluido McCain'].unique())
+selected_fluido = st.sidebar.selectbox("Seleccionar tipo de fluido según McCain:", well_options.values('Fluido McCain'))
+
+# Create a multiselect list for 'sigla': the options are the wells already
+# selected plus the ones matching the search, never the whole well list. The
+# options change with every search, which resets the widget, so the selection
+# is kept in the session state and given back as its default
+def keep_selected_siglas():
+    st.session_state['siglas_a_comparar'] = st.session_state['sigla_picker']
+
+well_index = well_options.index('sigla')
+sigla_query = st.sidebar.text_input("Buscar siglas de los pozos", placeholder="Parte de la sigla, p. ej. LLL-12")
+matching_siglas = well_index.search(sigla_query)
+kept_siglas = st.session_state.get('siglas_a_comparar', [])
+selected_sigla = st.sidebar.multiselect(
+    "Seleccionar siglas de los pozos a comparar",
+    list(dict.fromkeys(kept_siglas + matching_siglas)),
+    default=kept_siglas,
+    key='sigla_picker',
+    on_change=keep_selected_siglas
+)
+st.sidebar.caption(f"Mostrando {len(matching_siglas)} de {len(well_index)} pozos")
 
-# Create a multiselect list for 'sigla'
-selected_sigla = st.sidebar.multiselect("Seleccionar siglas de los pozos a comparar", max_rates_df['sigla'])
+# Aligned wells x months arrays of the same dataset (memory-mapped, shared by all sessions)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_aligned_store(dataset_url):
+    return shared.aligned_store(dataset_url)
 
-# Filter data for matching 'sigla'
-filtered_data = data_sorted[
-    (data_sorted['sigla'].isin(selected_sigla))
-]
+aligned_store = load_aligned_store(loaders.PRODUCTION_URL)
+
+# Grid index over the well locations of the production snapshot
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_spatial_index(dataset_url):
+    return spatial.from_frame(load_and_sort_data(dataset_url))
+
+spatial_index = load_spatial_index(loaders.PRODUCTION_URL)
 
+# Offset wells: add the nearest wells to one of the selected ones
+offset_of = st.sidebar.selectbox(
+    "Agregar pozos vecinos de:",
+    ['Ninguno'] + [sigla for sigla in selected_sigla if sigla in spatial_index.index]
+)
+if offset_of != 'Ninguno':
+    n_offsets = st.sidebar.slider("Cantidad de pozos vecinos", 1, 8, 3)
+    offset_radius_km = st.sidebar.slider("Distancia máxima (km)", 0.5, 20.0, 5.0, 0.5)
+    with profiling.stage("pozos vecinos", "derive") as s:
+        offsets = spatial_index.nearest_to(offset_of, k=n_offsets, radius_m=offset_radius_km * 1000)
+        s.rows_out = offsets
+    st.sidebar.dataframe(
+        offsets[['sigla', 'distancia_m']].rename(columns={'sigla': 'Sigla', 'distancia_m': 'Distancia (m)'}),
+        hide_index=True
+    )
+    selected_sigla = selected_sigla + [sigla for sigla in offsets['sigla'] if sigla not in selected_sigla]
+
+with profiling.stage("pozos seleccionados", "derive") as s:
+    # Per-well history from the first month with production, with a counter
+    # column (months on production), sliced from the aligned store
+    selected_sigla = [sigla for sigla in selected_sigla if sigla in aligned_store.index]
+    well_histories = {sigla: aligned_store.well(sigla) for sigla in selected_sigla}
 
 # Plot gas rate using Plotly
 gas_rate_fig = go.Figure()
 
 for i, sigla in enumerate(selected_sigla):
-    filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-    
-    # Filter data to start when 'Np' is different from zero
-    filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-    
-    # Add a counter column to the filtered data
-    filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
-    
+    filtered_well_data = well_histories[sigla]
+
     gas_rate_fig.add_trace(
         go.Scatter(
             x=filtered_well_data['counter'],  # Use the counter as x-axis
@@ -138,14 +178,8 @@ oil_color_list = ['#008000', '#006400', '#90EE90', '#98FB98', '#8FBC8F', '#3CB37
 oil_rate_fig = go.Figure()
 
 for i, sigla in enumerate(selected_sigla):
-    filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-    
-    # Filter data to start when 'Np' is different from zero
-    filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-    
-    # Add a counter column to the filtered data
-    filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
-    
+    filtered_well_data = well_histories[sigla]
+
     oil_rate_fig.add_trace(
         go.Scatter(
             x=filtered_well_data['counter'],  # Use the counter as x-axis
@@ -171,14 +205,8 @@ water_color_list = ['#0000FF', '#0000CD', '#00008B', '#000080', '#191970', '#7B6
 water_rate_fig = go.Figure()
 
 for i, sigla in enumerate(selected_sigla):
-    filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-    
-    # Filter data to start when 'Np' is different from zero
-    filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-    
-    # Add a counter column to the filtered data
-    filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
-    
+    filtered_well_data = well_histories[sigla]
+
     water_rate_fig.add_trace(
         go.Scatter(
             x=filtered_well_data['counter'],  # Use the counter as x-axis
@@ -206,13 +234,7 @@ if selected_fluido and selected_sigla:
     wp_fig = go.Figure()
 
     for i, sigla in enumerate(selected_sigla):
-        filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-
-        # Filter data to start when 'Np' is different from zero
-        filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-
-        # Add a counter column to the filtered data
-        filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
+        filtered_well_data = well_histories[sigla]
 
         # Plot Np (oil_rate) vs cumulative oil production (Np)
         np_fig.add_trace(
@@ -277,5 +299,72 @@ else:
     st.subheader("")
     st.write("")
 
+# Arps fits of every well in one batch, per fluid
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def fit_declines(rate_col):
+    return decline.fit_store(load_aligned_store(loaders.PRODUCTION_URL), rate_col, model='modified')
 
+if selected_fluido and selected_sigla:
+    if selected_fluido == 'Gas':
+        rate_col, rate_units, volume_units = 'gas_rate', 'km3/d', 'km3'
+    else:
+        rate_col, rate_units, volume_units = 'oil_rate', 'm3/d', 'm3'
+
+    with profiling.stage("declinación Arps", "aggregate") as s:
+        fits_selected = views.rows(fit_declines(rate_col), sigla=selected_sigla)
+        s.rows_out = fits_selected
+
+    st.subheader("Declinación (Arps hiperbólico modificado)")
+    st.dataframe(
+        fits_selected[['sigla', 'qi', 'Di', 'b', 'r2', 'acumulada', 'EUR']].round(
+            {'qi': 1, 'Di': 3, 'b': 2, 'r2': 2, 'acumulada': 0, 'EUR': 0}
+        ).rename(columns={
+            'sigla': 'Sigla',
+            'qi': f'qi ({rate_units})',
+            'Di': 'Di (1/mes)',
+            'r2': 'R²',
+            'acumulada': f'Acumulada ({volume_units})',
+            'EUR': f'EUR a 30 años ({volume_units})',
+        }),
+        use_container_width=True
+    )
+    st.caption("Ajuste desde el mes de caudal pico; declinación terminal de 10% anual para el pronóstico.")
+
+# Artificial-lift changes and gas injection of every well, with the rate uplift of the latest change
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def well_lift():
+    return lift.well_summary(load_and_sort_data(loaders.PRODUCTION_URL), load_aligned_store(loaders.PRODUCTION_URL))
+
+if selected_sigla:
+    with profiling.stage("sistema de extracción", "aggregate") as s:
+        lift_selected = views.rows(well_lift(), sigla=selected_sigla)
+        s.rows_out = lift_selected
+
+    st.subheader("Sistema de Extracción e Inyección de Gas")
+    st.dataframe(
+        views.derive(
+            lift_selected,
+            uplift_pet=lambda df: (df['uplift_pet'] * 100).round(1),
+            uplift_gas=lambda df: (df['uplift_gas'] * 100).round(1),
+        )[['sigla', 'extraccion_actual', 'cambios_extraccion', 'extraccion_anterior', 'ultimo_cambio_anio',
+           'ultimo_cambio_mes', 'uplift_pet', 'uplift_gas', 'meses_inyeccion', 'iny_gas_total']].rename(columns={
+            'sigla': 'Sigla',
+            'extraccion_actual': 'Extracción Actual',
+            'cambios_extraccion': 'Cambios',
+            'extraccion_anterior': 'Extracción Anterior',
+            'ultimo_cambio_anio': 'Año del Cambio',
+            'ultimo_cambio_mes': 'Mes del Cambio',
+            'uplift_pet': 'Variación Caudal Petróleo (%)',
+            'uplift_gas': 'Variación Caudal Gas (%)',
+            'meses_inyeccion': 'Meses con Inyección de Gas',
+            'iny_gas_total': 'Gas Inyectado (km3)',
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption(f"Variación de caudal: promedio de los {lift.WINDOW} meses desde el último cambio de sistema "
+               f"de extracción respecto de los {lift.WINDOW} meses anteriores.")
 
+profiling.debug_panel()
@@ -4,111 +4,79 @@ import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
-# Load and preprocess the production data
-@st.cache_data
+from capiv_core import aggregates, decline, lifecycle, lift, loaders, ownership, profiling, rankings, shared, spatial, views, wells
+
+profiling.start_run("Ranking")
+
+# Load and preprocess the production data (read-only snapshot shared by all sessions)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
 def load_and_sort_data(dataset_url):
     try:
-        df = pd.read_csv(dataset_url, usecols=[
-            'sigla', 'anio', 'mes', 'prod_pet', 'prod_gas', 'prod_agua',
-            'tef', 'empresa', 'areayacimiento', 'coordenadax', 'coordenaday',
-            'formprod', 'sub_tipo_recurso', 'tipopozo'
-        ])
-        df['date'] = pd.to_datetime(df['anio'].astype(str) + '-' + df['mes'].astype(str) + '-1')
-        df['gas_rate'] = df['prod_gas'] / df['tef']
-        df['oil_rate'] = df['prod_pet'] / df['tef']
-        df['water_rate'] = df['prod_agua'] / df['tef']
-        df['Np'] = df.groupby('sigla')['prod_pet'].cumsum()
-        df['Gp'] = df.groupby('sigla')['prod_gas'].cumsum()
-        df['Wp'] = df.groupby('sigla')['prod_agua'].cumsum()
-        return df
+        return shared.production_frame(dataset_url)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
-# URLs for datasets
-dataset_url = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+# Download the production and frac data at the same time on a cold start;
+# nothing to do while both snapshots are fresh
+prefetch_status = st.empty()
+with profiling.stage("descarga concurrente", "load"):
+    shared.prefetch(
+        {'production': loaders.PRODUCTION_URL, 'frac': loaders.FRAC_URL},
+        progress=lambda done, total, name: prefetch_status.progress(
+            done / total, text=f"Descargando datos de producción y fractura ({done}/{total})"
+        ),
+        # A failed download is reported and retried by the loaders below
+        on_error=lambda name, e: st.warning(f"No se pudo descargar '{name}' por adelantado: {e}"),
+    )
+prefetch_status.empty()
 
 # Load the production data
-data_sorted = load_and_sort_data(dataset_url)
+data_sorted = load_and_sort_data(loaders.PRODUCTION_URL)
 
 if data_sorted.empty:
     st.error("Failed to load production data.")
     st.stop()
 
-# Replace company names in production data
-replacement_dict = {
-    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
-    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
-    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
-    'Vista Oil & Gas Argentina SA': 'VISTA',
-    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
-    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
-    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL'
-}
-data_sorted['empresaNEW'] = data_sorted['empresa'].replace(replacement_dict)
-
 # Sidebar filters
 st.header(f":blue[Ranking y Records]")
 image = Image.open('Vaca Muerta rig.png')
 st.sidebar.image(image)
 
-# Filter out rows where TEF is zero for calculating metrics
-data_filtered = data_sorted[(data_sorted['tef'] > 0)]
-
-# Find the latest date in the dataset
-latest_date = data_filtered['date'].max()
-
-from dateutil.relativedelta import relativedelta
+# Replace company names and filter out rows where TEF is zero for calculating metrics
+with profiling.stage("alias de empresas + filtro TEF", "derive", rows_in=data_sorted) as s:
+    data_filtered = loaders.filter_producing(data_sorted)
+    s.rows_out = data_filtered
 
-# Find the latest date in the dataset
-latest_date_non_official = data_filtered['date'].max()
+# Month -> rows index of the snapshot (stored sorted by month), built once per
+# snapshot version: the latest-month queries read the rows of those months only
+month_index = shared.production_month_index(data_sorted)
 
-# Subtract 1 month from the latest date
-latest_date = latest_date_non_official - relativedelta(months=1)
+# Find the latest date in the dataset and the last consolidated month
+latest_date_non_official, latest_date = aggregates.indexed_latest_dates(data_sorted, month_index)
 
-print(latest_date)
-
-# Filter the dataset to include only rows from the latest date
-latest_data = data_filtered[data_filtered['date'] == latest_date]
 
+# Aligned wells x months arrays of the production snapshot (memory-mapped)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_aligned_store(dataset_url):
+    return shared.aligned_store(dataset_url)
 
 # ------------------------ DATA CLEANING ------------------------
 
-@st.cache_data
-# Load and preprocess the fracture data
+# Load and preprocess the fracture data (read-only snapshot shared by all sessions)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
 def load_and_sort_data_frac(dataset_url):
-    df_frac = pd.read_csv(dataset_url)
-    return df_frac
-
-# URL of the fracture dataset
-dataset_frac_url = "http://datos.energia.gob.ar/dataset/71fa2e84-0316-4a1b-af68-7f35e41f58d7/resource/2280ad92-6ed3-403e-a095-50139863ab0d/download/datos-de-fractura-de-pozos-de-hidrocarburos-adjunto-iv-actualizacin-diaria.csv"
+    return shared.frac_frame(dataset_url)
 
 # Load the fracture data
-df_frac = load_and_sort_data_frac(dataset_frac_url)
-
-
-# Create a new column for the total amount of arena (sum of national and imported arena)
-df_frac['arena_total_tn'] = df_frac['arena_bombeada_nacional_tn'] + df_frac['arena_bombeada_importada_tn']
-
-# Apply the cut-off conditions:
-# longitud_rama_horizontal_m > 100
-# cantidad_fracturas > 6
-# arena_total_tn > 100
-df_frac = df_frac[
-    (df_frac['longitud_rama_horizontal_m'] > 100) &
-    (df_frac['cantidad_fracturas'] > 6) &
-    (df_frac['arena_total_tn'] > 100)
-]
+df_frac = load_and_sort_data_frac(loaders.FRAC_URL)
 
-# Check the filtered data
-print(df_frac.info())
-
-# Define the columns to check for outliers (now using 'arena_total_tn' as the total arena)
-columns_to_check = [
-    'longitud_rama_horizontal_m',
-    'cantidad_fracturas',
-    'arena_total_tn',
-]
+with profiling.stage("cortes de fractura", "derive", rows_in=df_frac) as s:
+    df_frac = loaders.apply_frac_cutoffs(df_frac)
+    s.rows_out = df_frac
 
 # ------------------------ Fluido segun McCain ------------------------
 
@@ -122,153 +90,100 @@ en el criterio de GOR según McCain. Esto permite reclasificar estos pozos como
 image = Image.open('McCain.png')
 st.sidebar.image(image)
 
-# Step 1: Create a Pivot Table with Cumulated Values
-pivot_table = data_filtered.pivot_table(
-    values=['Np', 'Gp', 'Wp'],
-    index=['sigla'],
-    aggfunc={'Np': 'max', 'Gp': 'max', 'Wp': 'max'}
-)
-
-print(pivot_table.info())
-
-# Step 2: Create a New DataFrame with GOR
-cum_df = pivot_table.reset_index()
-cum_df['GOR'] = (cum_df['Gp'] / cum_df['Np']) * 1000
-cum_df['GOR'] = cum_df['GOR'].fillna(100000)  # Handle NaN values
-
-# Step 3: Add a new column "Fluido McCain" based on conditions
-cum_df['Fluido McCain'] = cum_df.apply(
-    lambda row: 'Gasífero' if row['Np'] == 0 or row['GOR'] > 3000 else 'Petrolífero',
-    axis=1
-)
-
-# Step 4: Ensure `tipopozo` is unique for each `sigla` and merge it
-tipopozo_unique = data_filtered[['sigla', 'tipopozo']].drop_duplicates(subset=['sigla'])
-cum_df = cum_df.merge(tipopozo_unique, on='sigla', how='left')
-
-# Step 5: Create the 'tipopozoNEW' column based on the 'tipopozo' and 'Fluido McCain'
-cum_df['tipopozoNEW'] = cum_df.apply(
-    lambda row: row['Fluido McCain'] if row['tipopozo'] == 'Otro tipo' else row['tipopozo'],
-    axis=1
-)
-
-# Step 6: Calculate WOR and WGR
-cum_df['WOR'] = cum_df['Wp'] / cum_df['Np']
-cum_df['WOR'] = cum_df['WOR'].fillna(100000)  # Handle NaN values
-cum_df['WGR'] = (cum_df['Wp'] / cum_df['Gp']) * 1000
-cum_df['WGR'] = cum_df['WGR'].fillna(100000)  # Handle NaN values
+with profiling.stage("clasificación McCain", "aggregate", rows_in=data_filtered) as s:
+    cum_df = wells.classify_mccain(data_filtered)
+    data_filtered = wells.add_fluid_type(data_filtered, cum_df)
+    s.rows_out = cum_df
 
-# Step 7: Create the final table with the desired columns
-cum_df = cum_df[['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW']]
-
-# Step 8: Merge `tipopozoNEW` back into `data_filtered`
-data_filtered = data_filtered.merge(
-    cum_df[['sigla', 'tipopozoNEW']],
-    on='sigla',
-    how='left'
-)
-
-# Display the updated data_filtered
-print(data_filtered.columns)
-print(cum_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged = pd.merge(
-    df_frac,
-    cum_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-print(df_merged.info())
+with profiling.stage("merge fractura + McCain", "merge", rows_in=df_frac) as s:
+    df_merged = wells.merge_frac_fluids(df_frac, cum_df)
+    s.rows_out = df_merged
 
 # --- Tabla consolidada por siglas para usar en reporte ---------
 
-# Calculate additional metrics and create the new DataFrame
-def create_summary_dataframe(data_filtered):
-    # Calculate Qo peak and Qg peak (maximum oil and gas rates)
-    data_filtered['Qo_peak'] = data_filtered[['sigla','oil_rate']].groupby('sigla').transform('max') 
-    data_filtered['Qg_peak'] = data_filtered[['sigla','gas_rate']].groupby('sigla').transform('max') 
-    
-    # Determine the starting year for each well
-    data_filtered['start_year'] = data_filtered.groupby('sigla')['anio'].transform('min')
-
-    # Calculate EUR at 30, 90, and 180 days based on dates
-    def calculate_eur(group):
-        group = group.sort_values('date')  # Ensure the data is sorted by date
-        
-        # Get the start date for the group
-        start_date = group['date'].iloc[0]
-        
-        # Define target dates
-        target_dates = {
-            'EUR_30': start_date + relativedelta(days=30),
-            'EUR_90': start_date + relativedelta(days=90),
-            'EUR_180': start_date + relativedelta(days=180)
-        }
-        
-        # Initialize EUR columns
-        for key, target_date in target_dates.items():
-            group[key] = group.loc[
-                group['date'] <= target_date,
-                'Np' if group['tipopozoNEW'].iloc[0] == 'Petrolífero' else 'Gp'
-            ].max()
-        
-        return group
-
-    data_filtered = data_filtered.groupby('sigla', group_keys=False).apply(calculate_eur)
-    
-    # Create the new DataFrame with selected columns
-    summary_df = data_filtered.groupby('sigla').agg({
-        'date': 'first',
-        'start_year': 'first',
-        'empresaNEW': 'first',
-        'formprod': 'first',
-        'sub_tipo_recurso': 'first',
-        'Np': 'max',
-        'Gp': 'max',
-        'Wp': 'max',
-        'Qo_peak': 'max',
-        'Qg_peak': 'max',
-        'EUR_30': 'max',
-        'EUR_90': 'max',
-        'EUR_180': 'max'
-    }).reset_index()
-    
-    return summary_df
-
-# Generate the summary DataFrame
-summary_df = create_summary_dataframe(data_filtered)
-
-
-print(summary_df.info())
-print(summary_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged_final = pd.merge(
-    df_merged,
-    summary_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-# Filter out rows where 'id_base_fractura_adjiv' is null
-df_merged_final = df_merged_final[df_merged_final['id_base_fractura_adjiv'].notna()] 
-
-# Check the dataframe info and columns
-print(df_merged_final.info())
-print(df_merged_final.columns)
-
-# -----------------------------------------------
-
-# Only keep VMUT as the target formation and filter for SHALE resource type
-df_merged_VMUT = df_merged_final[
-    (df_merged_final['formprod'] == 'VMUT') & (df_merged_final['sub_tipo_recurso'] == 'SHALE')
-]
+# Shut-ins, restarts and uptime of every well from its TEF history
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def well_lifecycle():
+    return lifecycle.well_lifecycle(load_aligned_store(loaders.PRODUCTION_URL))
+
+# Artificial-lift changes (with rate uplift) and gas-injection periods of every well
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def lift_tables():
+    production = load_and_sort_data(loaders.PRODUCTION_URL)
+    changes = lift.lift_changes(production, load_aligned_store(loaders.PRODUCTION_URL))
+    return changes, lift.well_summary(production, load_aligned_store(loaders.PRODUCTION_URL), changes=changes)
+
+lift_changes, lift_summary = lift_tables()
+
+# Initial and current operator of every well from its ownership periods
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def well_operators():
+    return ownership.well_operators(ownership.intervals(load_and_sort_data(loaders.PRODUCTION_URL)))
+
+operator_columns = {'Operadora al inicio': 'empresa_inicial', 'Operadora actual': 'empresa_actual'}
+operator_view = st.sidebar.radio("Empresa de cada pozo", list(operator_columns))
+st.sidebar.caption("Los pozos que cambiaron de operadora se asignan a la que los puso en \
+producción o a la que los opera hoy.")
+
+with profiling.stage("resumen por pozo (picos + EUR)", "aggregate", rows_in=data_filtered) as s:
+    operators_df = well_operators()
+    summary_df = wells.create_summary_dataframe(data_filtered).drop(columns='empresaNEW').merge(
+        operators_df[['sigla', operator_columns[operator_view]]].rename(
+            columns={operator_columns[operator_view]: 'empresaNEW'}
+        ),
+        on='sigla', how='left'
+    ).merge(
+        well_lifecycle(), on='sigla', how='left'
+    ).merge(lift_summary, on='sigla', how='left')
+    s.rows_out = summary_df
+
+with profiling.stage("merge resumen por pozo", "merge", rows_in=df_merged) as s:
+    df_merged_final = wells.merge_summary(df_merged, summary_df)
+    s.rows_out = df_merged_final
+
+with profiling.stage("filtro VMUT", "derive", rows_in=df_merged_final) as s:
+    df_merged_VMUT = wells.filter_vmut(df_merged_final)
+    s.rows_out = df_merged_VMUT
+
+# ------------------------ Filtro espacial ------------------------
+
+# Grid index over the well locations of the production snapshot
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_spatial_index(dataset_url):
+    return spatial.from_frame(load_and_sort_data(dataset_url))
+
+spatial_index = load_spatial_index(loaders.PRODUCTION_URL)
+
+st.sidebar.subheader("Filtro espacial")
+spatial_filter = st.sidebar.radio(
+    "Limitar los rankings a:",
+    ['Todos los pozos', 'Radio alrededor de un pozo', 'Áreas de yacimiento']
+)
+nearby_sigla = None
+if spatial_filter == 'Radio alrededor de un pozo':
+    center_sigla = st.sidebar.selectbox(
+        "Pozo central",
+        sorted(sigla for sigla in df_merged_VMUT['sigla'].unique() if sigla in spatial_index.index)
+    )
+    radius_km = st.sidebar.slider("Radio (km)", 1, 50, 10)
+    if center_sigla:
+        nearby_sigla = spatial_index.within(*spatial_index.location(center_sigla), radius_km * 1000)['sigla']
+elif spatial_filter == 'Áreas de yacimiento':
+    selected_areas = st.sidebar.multiselect("Áreas", sorted(spatial_index.areas))
+    if selected_areas:
+        nearby_sigla = [sigla for area in selected_areas for sigla in spatial_index.in_area(area)]
+
+if nearby_sigla is not None:
+    with profiling.stage("filtro espacial", "derive", rows_in=df_merged_VMUT) as s:
+        df_merged_VMUT = views.rows(df_merged_VMUT, sigla=list(nearby_sigla))
+        s.rows_out = df_merged_VMUT
+    if df_merged_VMUT.empty:
+        st.warning("No hay pozos VMUT dentro del filtro espacial seleccionado.")
+        st.stop()
 
 # ----------------------- Pivot Tables + Plots ------------
 
@@ -353,32 +268,13 @@ st.plotly_chart(fig_gasifero, use_container_width=True)
 df_merged_VMUT_filtered = df_merged_VMUT[df_merged_VMUT['longitud_rama_horizontal_m'] > 0].drop_duplicates(subset='sigla')
 # -----------------------------
 
-import pandas as pd
-import streamlit as st
-
 st.subheader("Ranking según Cantidad de Etapas", divider="blue")
 
-# Aggregate the data to calculate max length for each sigla, empresaNEW, and start_year
-company_statistics = df_merged_VMUT_filtered.groupby(['start_year', 'empresaNEW', 'sigla']).agg(
-    max_lenght=('longitud_rama_horizontal_m', 'max')
-).reset_index()
-
-# Round the max_lenght to 0 decimal places
-company_statistics['max_lenght'] = company_statistics['max_lenght'].round(0)
-
-# Sort by start_year and max_lenght to get the top 3 sigla per year
-company_statistics_sorted = company_statistics.sort_values(['start_year', 'max_lenght'], ascending=[True, False])
-
-# Select the top 3 sigla for each year based on max_lenght
-top_max_lenght = company_statistics_sorted.groupby('start_year').head(3)
-
-# Create data for the table with the year appearing only once for each start_year
-data_for_max_lenght_table = []
-previous_year = None
-for _, row in top_max_lenght.iterrows():
-    year_value = int(row['start_year']) if row['start_year'] != previous_year else " "  # Use blank for repeated years
-    data_for_max_lenght_table.append([year_value, row['sigla'], row['empresaNEW'], row['max_lenght']])
-    previous_year = row['start_year']
+# Top 3 sigla per year based on max length
+top_max_lenght = rankings.top_per_year(
+    df_merged_VMUT_filtered, ['empresaNEW', 'sigla'], 'longitud_rama_horizontal_m', 'max', 'max_lenght'
+)
+data_for_max_lenght_table = rankings.year_table(top_max_lenght, ['sigla', 'empresaNEW', 'max_lenght'])
 
 # Convert to a dataframe
 df_max_lenght = pd.DataFrame(data_for_max_lenght_table, columns=["Campaña", "Sigla", "Empresa", "Longitud de Rama Maxima (metros)"])
@@ -388,27 +284,11 @@ st.write("**Top 3 Pozos con Máxima Cantidad de Etapas**")
 # Display the dataframe in Streamlit
 st.dataframe(df_max_lenght,use_container_width=True)
 
-# Aggregate the data to calculate avg length for each empresaNEW and start_year
-company_statistics_avg = df_merged_VMUT_filtered.groupby(['start_year', 'empresaNEW']).agg(
-    avg_lenght=('longitud_rama_horizontal_m', 'mean')
-).reset_index()
-
-# Round the avg_lenght to 0 decimal places
-company_statistics_avg['avg_lenght'] = company_statistics_avg['avg_lenght'].round(0)
-
-# Sort by start_year and avg_lenght to get the top 3 empresasNEW per year
-company_statistics_sorted_avg = company_statistics_avg.sort_values(['start_year', 'avg_lenght'], ascending=[True, False])
-
-# Select the top 3 empresasNEW for each year based on avg_lenght
-top_avg_lenght = company_statistics_sorted_avg.groupby('start_year').head(3)
-
-# Create data for the table with the year appearing only once for each start_year
-data_for_avg_lenght_table = []
-previous_year = None
-for _, row in top_avg_lenght.iterrows():
-    year_value = int(row['start_year']) if row['start_year'] != previous_year else " "  # Use blank for repeated years
-    data_for_avg_lenght_table.append([year_value, row['empresaNEW'], row['avg_lenght']])
-    previous_year = row['start_year']
+# Top 3 empresasNEW per year based on avg length
+top_avg_lenght = rankings.top_per_year(
+    df_merged_VMUT_filtered, ['empresaNEW'], 'longitud_rama_horizontal_m', 'mean', 'avg_lenght'
+)
+data_for_avg_lenght_table = rankings.year_table(top_avg_lenght, ['empresaNEW', 'avg_lenght'])
 
 # Convert to a dataframe
 df_avg_lenght = pd.DataFrame(data_for_avg_lenght_table, columns=["Campaña", "Empresa", "Longitud de Rama Promedio (metros)"])
@@ -423,42 +303,11 @@ st.dataframe(df_avg_lenght,use_container_width=True)
 
 st.subheader("Ranking según Longitud de Rama", divider="blue")
 
-# Aggregate the data to calculate max length for each sigla, empresaNEW, and start_year
-company_statistics = df_merged_VMUT_filtered.groupby(['start_year', 'empresaNEW', 'sigla']).agg(
-    max_lenght=('longitud_rama_horizontal_m', 'max')
-).reset_index()
-
-# Round the avg_lenght to 2 decimal places
-company_statistics['max_lenght'] = company_statistics['max_lenght'].round(0)
-
-# Sort by start_year and max_lenght to get the top 3 sigla per year
-company_statistics_sorted = company_statistics.sort_values(['start_year', 'max_lenght'], ascending=[True, False])
-
-# Select the top 3 sigla for each year based on max_lenght
-top_max_lenght = company_statistics_sorted.groupby('start_year').head(3)  # Get the top 3 for each year
-
-# Create data for the table with the year appearing only once for each start_year
-data_for_max_lenght_table = []
-previous_year = None
-for _, row in top_max_lenght.iterrows():
-    year_value = int(row['start_year']) if row['start_year'] != previous_year else " "  # Use blank for repeated years
-    data_for_max_lenght_table.append([year_value, row['sigla'], row['empresaNEW'], row['max_lenght']])
-    previous_year = row['start_year']
-
-# Create Plotly Table for max_lenght
-fig_max_lenght = go.Figure(data=[go.Table(
-    header=dict(values=["Campaña", "Sigla", "Empresa", "Longitud de Rama Maxima (metros)"]),
-    cells=dict(
-        values=list(zip(*data_for_max_lenght_table)),  # Transpose the list to match columns
-        fill_color=['white'] * len(data_for_max_lenght_table),  # Keep the default background
-    )
-)])
-
-fig_max_lenght.update_layout(
-    title="Top 3 Pozos anuales con Longitud de Rama Maxima",
-    template="plotly_white"
+# Top 3 sigla per year based on max length
+top_max_lenght = rankings.top_per_year(
+    df_merged_VMUT_filtered, ['empresaNEW', 'sigla'], 'longitud_rama_horizontal_m', 'max', 'max_lenght'
 )
-
+data_for_max_lenght_table = rankings.year_table(top_max_lenght, ['sigla', 'empresaNEW', 'max_lenght'])
 
 # Convert to a dataframe
 df_max_lenght = pd.DataFrame(data_for_max_lenght_table, columns=["Campaña", "Sigla", "Empresa", "Longitud de Rama Máxima (metros)"])
@@ -466,31 +315,11 @@ df_max_lenght = pd.DataFrame(data_for_max_lenght_table, columns=["Campaña", "Si
 st.write("**Top 3 Pozos con Mayor Longitud de Rama**")
 st.dataframe(df_max_lenght, use_container_width=True)
 
-
-
-import plotly.graph_objects as go
-
-# Aggregate the data to calculate avg length for each empresaNEW and start_year
-company_statistics_avg = df_merged_VMUT_filtered.groupby(['start_year', 'empresaNEW']).agg(
-    avg_lenght=('longitud_rama_horizontal_m', 'mean')
-).reset_index()
-
-# Round the avg_lenght to 2 decimal places
-company_statistics_avg['avg_lenght'] = company_statistics_avg['avg_lenght'].round(0)
-
-# Sort by start_year and avg_lenght to get the top 3 empresasNEW per year
-company_statistics_sorted_avg = company_statistics_avg.sort_values(['start_year', 'avg_lenght'], ascending=[True, False])
-
-# Select the top 3 empresasNEW for each year based on avg_lenght
-top_avg_lenght = company_statistics_sorted_avg.groupby('start_year').head(3)  # Get the top 3 for each year
-
-# Create data for the table with the year appearing only once for each start_year
-data_for_avg_lenght_table = []
-previous_year = None
-for _, row in top_avg_lenght.iterrows():
-    year_value = int(row['start_year']) if row['start_year'] != previous_year else " "  # Use blank for repeated years
-    data_for_avg_lenght_table.append([year_value, row['empresaNEW'], row['avg_lenght']])
-    previous_year = row['start_year']
+# Top 3 empresasNEW per year based on avg length
+top_avg_lenght = rankings.top_per_year(
+    df_merged_VMUT_filtered, ['empresaNEW'], 'longitud_rama_horizontal_m', 'mean', 'avg_lenght'
+)
+data_for_avg_lenght_table = rankings.year_table(top_avg_lenght, ['empresaNEW', 'avg_lenght'])
 
 # Convert to a dataframe
 df_avg_lenght = pd.DataFrame(data_for_avg_lenght_table, columns=["Campaña", "Empresa", "Longitud de Rama Promedio (metros)"])
@@ -504,81 +333,8 @@ st.dataframe(df_avg_lenght, use_container_width=True)
 
 st.subheader("Ranking según Caudales Pico", divider="blue")
 
-# Process Data for Petrolífero
-grouped_petrolifero = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == 'Petrolífero'].groupby(
-    ['start_year', 'sigla', 'empresaNEW']
-).agg({
-    'Qo_peak': 'max',
-    'longitud_rama_horizontal_m': 'mean',
-    'cantidad_fracturas': 'mean',
-    'arena_bombeada_nacional_tn': 'sum',
-    'arena_bombeada_importada_tn': 'sum'
-}).reset_index()
-
-grouped_petrolifero['fracspacing'] = grouped_petrolifero['longitud_rama_horizontal_m'] / grouped_petrolifero['cantidad_fracturas']
-grouped_petrolifero['agente_etapa'] = (
-    grouped_petrolifero['arena_bombeada_nacional_tn'] + grouped_petrolifero['arena_bombeada_importada_tn']
-) / grouped_petrolifero['cantidad_fracturas']
-
-grouped_petrolifero = grouped_petrolifero.drop_duplicates(subset=['start_year', 'sigla'], keep='first')
-grouped_petrolifero_sorted = grouped_petrolifero.sort_values(['start_year', 'Qo_peak'], ascending=[True, False])
-top_petrolifero = grouped_petrolifero_sorted.groupby('start_year').head(3)
-
-# Handle repeated years in Petrolífero table
-data_petrolifero_table = []
-previous_year = None
-for _, row in top_petrolifero.iterrows():
-    year_value = int(row['start_year']) if row['start_year'] != previous_year else " "
-    data_petrolifero_table.append({
-        'start_year': year_value,
-        'sigla': row['sigla'],
-        'empresaNEW': row['empresaNEW'],
-        'Qo_peak': int(row['Qo_peak']),
-        'cantidad_fracturas': int(row['cantidad_fracturas']),
-        'fracspacing': int(row['fracspacing']),
-        'agente_etapa': int(row['agente_etapa'])
-    })
-    previous_year = row['start_year']
-
-# Process Data for Gasífero
-grouped_gasifero = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == 'Gasífero'].groupby(
-    ['start_year', 'sigla', 'empresaNEW']
-).agg({
-    'Qg_peak': 'max',
-    'longitud_rama_horizontal_m': 'mean',
-    'cantidad_fracturas': 'mean',
-    'arena_bombeada_nacional_tn': 'sum',
-    'arena_bombeada_importada_tn': 'sum'
-}).reset_index()
-
-grouped_gasifero['fracspacing'] = grouped_gasifero['longitud_rama_horizontal_m'] / grouped_gasifero['cantidad_fracturas']
-grouped_gasifero['agente_etapa'] = (
-    grouped_gasifero['arena_bombeada_nacional_tn'] + grouped_gasifero['arena_bombeada_importada_tn']
-) / grouped_gasifero['cantidad_fracturas']
-
-grouped_gasifero = grouped_gasifero.drop_duplicates(subset=['start_year', 'sigla'], keep='first')
-grouped_gasifero_sorted = grouped_gasifero.sort_values(['start_year', 'Qg_peak'], ascending=[True, False])
-top_gasifero = grouped_gasifero_sorted.groupby('start_year').head(3)
-
-# Handle repeated years in Gasífero table
-data_gasifero_table = []
-previous_year = None
-for _, row in top_gasifero.iterrows():
-    year_value = int(row['start_year']) if row['start_year'] != previous_year else " "
-    data_gasifero_table.append({
-        'start_year': year_value,
-        'sigla': row['sigla'],
-        'empresaNEW': row['empresaNEW'],
-        'Qg_peak': int(row['Qg_peak']),
-        'cantidad_fracturas': int(row['cantidad_fracturas']),
-        'fracspacing': int(row['fracspacing']),
-        'agente_etapa': int(row['agente_etapa'])
-    })
-    previous_year = row['start_year']
-
-# Convert to DataFrame for Petrolífero and Gasífero tables
-df_petrolifero = pd.DataFrame(data_petrolifero_table)
-df_gasifero = pd.DataFrame(data_gasifero_table)
+df_petrolifero = rankings.peak_rate_ranking(df_merged_VMUT, 'Petrolífero', 'Qo_peak')
+df_gasifero = rankings.peak_rate_ranking(df_merged_VMUT, 'Gasífero', 'Qg_peak')
 
 # Rename columns for both DataFrames
 df_petrolifero.rename(columns={
@@ -608,4 +364,109 @@ st.dataframe(df_petrolifero, use_container_width=True)
 st.write("**Tipo Gasífero: Top 3 Pozos con Mayor Caudal Pico**")
 st.dataframe(df_gasifero, use_container_width=True)
 
+#------------------------------------
+
+st.subheader("Ranking según Uptime", divider="blue")
+
+wells_uptime = views.derive(
+    df_merged_VMUT.drop_duplicates(subset='sigla').dropna(subset=['uptime']),
+    uptime_pct=lambda df: df['uptime'] * 100,
+    uptime_12m_pct=lambda df: df['uptime_12m'] * 100,
+)
+
+# Top 3 empresasNEW per campaign based on the average uptime of their wells
+top_uptime = rankings.top_per_year(wells_uptime, ['empresaNEW'], 'uptime_pct', 'mean', 'avg_uptime')
+df_uptime = pd.DataFrame(
+    rankings.year_table(top_uptime, ['empresaNEW', 'avg_uptime']),
+    columns=["Campaña", "Empresa", "Uptime Promedio (%)"]
+)
+
+st.write("**Top 3 Empresas con Mayor Uptime Promedio por Campaña**")
+st.dataframe(df_uptime, use_container_width=True)
+
+# Uptime of the last 12 months per company, over the wells still reporting
+uptime_by_company = wells_uptime.groupby('empresaNEW').agg(
+    uptime_12m=('uptime_12m_pct', 'mean'),
+    paradas=('paradas', 'mean'),
+    well_count=('sigla', 'count'),
+).reset_index().sort_values('uptime_12m', ascending=False).head(10)
+
+fig_uptime = px.bar(
+    uptime_by_company,
+    x='uptime_12m',
+    y='empresaNEW',
+    title=f'Uptime de los Últimos {lifecycle.RECENT_MONTHS} Meses por Empresa (Top 10)',
+    labels={'empresaNEW': 'Empresa', 'uptime_12m': 'Uptime (%)'},
+    custom_data=['well_count', 'paradas'],
+    orientation='h',
+    text=uptime_by_company['uptime_12m'].round(1)
+)
+fig_uptime.update_traces(hovertemplate='%{x:.1f}% (%{customdata[0]} pozos, %{customdata[1]:.1f} paradas por pozo)')
+fig_uptime.update_layout(
+    xaxis_title='Uptime (%)',
+    yaxis_title='Empresa',
+    yaxis=dict(autorange='reversed'),
+    template='plotly_white'
+)
+st.plotly_chart(fig_uptime, use_container_width=True)
+
+st.caption("Uptime: días efectivos de producción (TEF) sobre días calendario, desde el primer mes \
+productivo del pozo; los meses sin reporte cuentan como pozo parado.")
+
+#------------------------------------
+
+st.subheader("Cambios de Sistema de Extracción", divider="blue")
+
+conversions = lift.conversion_summary(views.rows(lift_changes, sigla=df_merged_VMUT['sigla'].unique()))
+conversions[['uplift_pet', 'uplift_gas']] = (conversions[['uplift_pet', 'uplift_gas']] * 100).round(1)
+st.dataframe(
+    conversions.rename(columns={
+        'extraccion_anterior': 'Extracción Anterior',
+        'extraccion_nueva': 'Extracción Nueva',
+        'pozos': 'Pozos',
+        'uplift_pet': 'Variación de Caudal de Petróleo P50 (%)',
+        'uplift_gas': 'Variación de Caudal de Gas P50 (%)',
+    }),
+    hide_index=True,
+    use_container_width=True
+)
+
+wells_injecting = df_merged_VMUT.drop_duplicates(subset='sigla')
+wells_injecting = wells_injecting[wells_injecting['meses_inyeccion'] > 0]
+st.write(f"**{len(wells_injecting)} pozos VMUT con inyección de gas**, "
+         f"{int(wells_injecting['meses_inyeccion'].sum())} meses de inyección en total.")
+
+st.caption(f"Variación de caudal: promedio de los {lift.WINDOW} meses desde el cambio de sistema de \
+extracción respecto de los {lift.WINDOW} meses anteriores.")
+
+#------------------------------------
+
+st.subheader("Ranking según EUR (Arps)", divider="blue")
+
+# Arps fits of every producing well in one batch, per fluid
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def fit_declines(rate_col):
+    return decline.fit_store(load_aligned_store(loaders.PRODUCTION_URL), rate_col, model='modified')
+
+for fluid, rate_col, label in (
+    ('Petrolífero', 'oil_rate', 'EUR de Petróleo (m3)'),
+    ('Gasífero', 'gas_rate', 'EUR de Gas (km3)'),
+):
+    wells_of_fluid = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == fluid].drop_duplicates(subset='sigla')
+    eur = wells_of_fluid[['sigla', 'start_year', 'empresaNEW']].merge(
+        fit_declines(rate_col)[['sigla', 'EUR']], on='sigla'
+    )
+    top_eur = rankings.top_per_year(eur, ['sigla', 'empresaNEW'], 'EUR', 'max', 'EUR')
+    df_eur = pd.DataFrame(
+        rankings.year_table(top_eur, ['sigla', 'empresaNEW', 'EUR']),
+        columns=["Campaña", "Sigla", "Empresa", label]
+    )
+
+    st.write(f"**Tipo {fluid}: Top 3 Pozos con Mayor EUR**")
+    st.dataframe(df_eur, use_container_width=True)
+
+st.caption("EUR a 30 años: producción acumulada más el pronóstico de un ajuste Arps hiperbólico \
+desde el mes de caudal pico, con declinación terminal de 10% anual.")
 
+profiling.debug_panel()
@@ -1,114 +1,88 @@
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
-# Load and preprocess the production data
-@st.cache_data
+from capiv_core import aggregates, figures, fluids, hexmap, interference, loaders, profiling, shared, spatial, sql, typecurves, views, wells
+
+profiling.start_run("Real-time FracData Report")
+
+# Load and preprocess the production data (read-only snapshot shared by all sessions)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
 def load_and_sort_data(dataset_url):
     try:
-        df = pd.read_csv(dataset_url, usecols=[
-            'sigla', 'anio', 'mes', 'prod_pet', 'prod_gas', 'prod_agua',
-            'tef', 'empresa', 'areayacimiento', 'coordenadax', 'coordenaday',
-            'formprod', 'sub_tipo_recurso', 'tipopozo'
-        ])
-        df['date'] = pd.to_datetime(df['anio'].astype(str) + '-' + df['mes'].astype(str) + '-1')
-        df['gas_rate'] = df['prod_gas'] / df['tef']
-        df['oil_rate'] = df['prod_pet'] / df['tef']
-        df['water_rate'] = df['prod_agua'] / df['tef']
-        df['Np'] = df.groupby('sigla')['prod_pet'].cumsum()
-        df['Gp'] = df.groupby('sigla')['prod_gas'].cumsum()
-        df['Wp'] = df.groupby('sigla')['prod_agua'].cumsum()
-        return df
+        return shared.production_frame(dataset_url)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
-# URLs for datasets
-dataset_url = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+# Download the production and frac data at the same time on a cold start;
+# nothing to do while both snapshots are fresh
+prefetch_status = st.empty()
+with profiling.stage("descarga concurrente", "load"):
+    shared.prefetch(
+        {'production': loaders.PRODUCTION_URL, 'frac': loaders.FRAC_URL},
+        progress=lambda done, total, name: prefetch_status.progress(
+            done / total, text=f"Descargando datos de producción y fractura ({done}/{total})"
+        ),
+        # A failed download is reported and retried by the loaders below
+        on_error=lambda name, e: st.warning(f"No se pudo descargar '{name}' por adelantado: {e}"),
+    )
+prefetch_status.empty()
 
 # Load the production data
-data_sorted = load_and_sort_data(dataset_url)
+data_sorted = load_and_sort_data(loaders.PRODUCTION_URL)
 
 if data_sorted.empty:
     st.error("Failed to load production data.")
     st.stop()
 
-# Replace company names in production data
-replacement_dict = {
-    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
-    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
-    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
-    'Vista Oil & Gas Argentina SA': 'VISTA',
-    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
-    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
-    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL'
-}
-data_sorted['empresaNEW'] = data_sorted['empresa'].replace(replacement_dict)
-
 # Sidebar filters
 st.header(f":blue[Reporte Extensivo de Completación y Producción en Vaca Muerta]")
 image = Image.open('Vaca Muerta rig.png')
 st.sidebar.image(image)
 
-# Filter out rows where TEF is zero for calculating metrics
-data_filtered = data_sorted[(data_sorted['tef'] > 0)]
+# Replace company names and filter out rows where TEF is zero for calculating metrics
+with profiling.stage("alias de empresas + filtro TEF", "derive", rows_in=data_sorted) as s:
+    data_filtered = loaders.filter_producing(data_sorted)
+    s.rows_out = data_filtered
 
-# Find the latest date in the dataset
-latest_date = data_filtered['date'].max()
+# Month -> rows index of the snapshot (stored sorted by month), built once per
+# snapshot version: the latest-month queries read the rows of those months only
+month_index = shared.production_month_index(data_sorted)
 
-from dateutil.relativedelta import relativedelta
+# Find the latest date in the dataset and the last consolidated month
+latest_date_non_official, latest_date = aggregates.indexed_latest_dates(data_sorted, month_index)
 
-# Find the latest date in the dataset
-latest_date_non_official = data_filtered['date'].max()
-
-# Subtract 1 month from the latest date
-latest_date = latest_date_non_official - relativedelta(months=1)
-
-print(latest_date)
-
-# Filter the dataset to include only rows from the latest date
-latest_data = data_filtered[data_filtered['date'] == latest_date]
 
+# Aligned wells x months arrays of the production snapshot (memory-mapped)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_aligned_store(dataset_url):
+    return shared.aligned_store(dataset_url)
 
 # ------------------------ DATA CLEANING ------------------------
 
-@st.cache_data
-# Load and preprocess the fracture data
+# Load and preprocess the fracture data (read-only snapshot shared by all sessions)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
 def load_and_sort_data_frac(dataset_url):
-    df_frac = pd.read_csv(dataset_url)
-    return df_frac
-
-# URL of the fracture dataset
-dataset_frac_url = "http://datos.energia.gob.ar/dataset/71fa2e84-0316-4a1b-af68-7f35e41f58d7/resource/2280ad92-6ed3-403e-a095-50139863ab0d/download/datos-de-fractura-de-pozos-de-hidrocarburos-adjunto-iv-actualizacin-diaria.csv"
+    return shared.frac_frame(dataset_url)
 
 # Load the fracture data
-df_frac = load_and_sort_data_frac(dataset_frac_url)
-
-
-# Create a new column for the total amount of arena (sum of national and imported arena)
-df_frac['arena_total_tn'] = df_frac['arena_bombeada_nacional_tn'] + df_frac['arena_bombeada_importada_tn']
+df_frac = load_and_sort_data_frac(loaders.FRAC_URL)
 
-# Apply the cut-off conditions:
-# longitud_rama_horizontal_m > 100
-# cantidad_fracturas > 6
-# arena_total_tn > 100
-df_frac = df_frac[
-    (df_frac['longitud_rama_horizontal_m'] > 100) &
-    (df_frac['cantidad_fracturas'] > 6) &
-    (df_frac['arena_total_tn'] > 100)
-]
+# Snapshot versions (path, st_mtime_ns) of the production and frac frames:
+# the cached tables and figures below are rebuilt when either snapshot is
+# rebuilt, without hashing the frames themselves
+data_key = (data_sorted.attrs.get('snapshot'), df_frac.attrs.get('snapshot'))
 
-# Check the filtered data
-print(df_frac.info())
-
-# Define the columns to check for outliers (now using 'arena_total_tn' as the total arena)
-columns_to_check = [
-    'longitud_rama_horizontal_m',
-    'cantidad_fracturas',
-    'arena_total_tn',
-]
+with profiling.stage("cortes de fractura", "derive", rows_in=df_frac) as s:
+    df_frac = loaders.apply_frac_cutoffs(df_frac)
+    s.rows_out = df_frac
 
 # ------------------------ Fluido segun McCain ------------------------
 
@@ -122,163 +96,99 @@ en el criterio de GOR según McCain. Esto permite reclasificar estos pozos como
 image = Image.open('McCain.png')
 st.sidebar.image(image)
 
-# Step 1: Create a Pivot Table with Cumulated Values
-pivot_table = data_filtered.pivot_table(
-    values=['Np', 'Gp', 'Wp'],
-    index=['sigla'],
-    aggfunc={'Np': 'max', 'Gp': 'max', 'Wp': 'max'}
-)
-
-print(pivot_table.info())
-
-# Step 2: Create a New DataFrame with GOR
-cum_df = pivot_table.reset_index()
-cum_df['GOR'] = (cum_df['Gp'] / cum_df['Np']) * 1000
-cum_df['GOR'] = cum_df['GOR'].fillna(100000)  # Handle NaN values
-
-# Step 3: Add a new column "Fluido McCain" based on conditions
-cum_df['Fluido McCain'] = cum_df.apply(
-    lambda row: 'Gasífero' if row['Np'] == 0 or row['GOR'] > 3000 else 'Petrolífero',
-    axis=1
-)
-
-# Step 4: Ensure `tipopozo` is unique for each `sigla` and merge it
-tipopozo_unique = data_filtered[['sigla', 'tipopozo']].drop_duplicates(subset=['sigla'])
-cum_df = cum_df.merge(tipopozo_unique, on='sigla', how='left')
-
-# Step 5: Create the 'tipopozoNEW' column based on the 'tipopozo' and 'Fluido McCain'
-cum_df['tipopozoNEW'] = cum_df.apply(
-    lambda row: row['Fluido McCain'] if row['tipopozo'] == 'Otro tipo' else row['tipopozo'],
-    axis=1
-)
-
-# Step 6: Calculate WOR and WGR
-cum_df['WOR'] = cum_df['Wp'] / cum_df['Np']
-cum_df['WOR'] = cum_df['WOR'].fillna(100000)  # Handle NaN values
-cum_df['WGR'] = (cum_df['Wp'] / cum_df['Gp']) * 1000
-cum_df['WGR'] = cum_df['WGR'].fillna(100000)  # Handle NaN values
-
-# Step 7: Create the final table with the desired columns
-cum_df = cum_df[['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW']]
-
-# Step 8: Merge `tipopozoNEW` back into `data_filtered`
-data_filtered = data_filtered.merge(
-    cum_df[['sigla', 'tipopozoNEW']],
-    on='sigla',
-    how='left'
-)
-
-# Display the updated data_filtered
-print(data_filtered.columns)
-print(cum_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged = pd.merge(
-    df_frac,
-    cum_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-print(df_merged.info())
-
-# --- Tabla consolidada por siglas para usar en reporte ---------
-
-# Calculate additional metrics and create the new DataFrame
-def create_summary_dataframe(data_filtered):
-    # Calculate Qo peak and Qg peak (maximum oil and gas rates)
-    data_filtered['Qo_peak'] = data_filtered[['sigla','oil_rate']].groupby('sigla').transform('max') 
-    data_filtered['Qg_peak'] = data_filtered[['sigla','gas_rate']].groupby('sigla').transform('max') 
-    
-    # Determine the starting year for each well
-    data_filtered['start_year'] = data_filtered.groupby('sigla')['anio'].transform('min')
-
-    # Calculate EUR at 30, 90, and 180 days based on dates
-    def calculate_eur(group):
-        group = group.sort_values('date')  # Ensure the data is sorted by date
-        
-        # Get the start date for the group
-        start_date = group['date'].iloc[0]
-        
-        # Define target dates
-        target_dates = {
-            'EUR_30': start_date + relativedelta(days=30),
-            'EUR_90': start_date + relativedelta(days=90),
-            'EUR_180': start_date + relativedelta(days=180)
-        }
-        
-        # Initialize EUR columns
-        for key, target_date in target_dates.items():
-            group[key] = group.loc[
-                group['date'] <= target_date,
-                'Np' if group['tipopozoNEW'].iloc[0] == 'Petrolífero' else 'Gp'
-            ].max()
-        
-        return group
-
-    data_filtered = data_filtered.groupby('sigla', group_keys=False).apply(calculate_eur)
-    
-    # Create the new DataFrame with selected columns
-    summary_df = data_filtered.groupby('sigla').agg({
-        'date': 'first',
-        'start_year': 'first',
-        'empresaNEW': 'first',
-        'formprod': 'first',
-        'sub_tipo_recurso': 'first',
-        'Np': 'max',
-        'Gp': 'max',
-        'Wp': 'max',
-        'Qo_peak': 'max',
-        'Qg_peak': 'max',
-        'EUR_30': 'max',
-        'EUR_90': 'max',
-        'EUR_180': 'max'
-    }).reset_index()
-    
-    return summary_df
-
-# Generate the summary DataFrame
-summary_df = create_summary_dataframe(data_filtered)
-
-
-print(summary_df.info())
-print(summary_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged_final = pd.merge(
-    df_merged,
-    summary_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-# Filter out rows where 'id_base_fractura_adjiv' is null
-df_merged_final = df_merged_final[df_merged_final['id_base_fractura_adjiv'].notna()] 
-
-# Check the dataframe info and columns
-print(df_merged_final.info())
-print(df_merged_final.columns)
-
-# -----------------------------------------------
-
-# Only keep VMUT as the target formation and filter for SHALE resource type
-df_merged_VMUT = df_merged_final[
-    (df_merged_final['formprod'] == 'VMUT') & (df_merged_final['sub_tipo_recurso'] == 'SHALE')
-]
-
+# Type curves for every cohort of a dimension; `data_key` identifies the
+# snapshot so the well table itself (underscored) is not hashed on each rerun
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def type_curves(_wells, data_key, rate_col, cohort, normalize):
+    store = load_aligned_store(loaders.PRODUCTION_URL)
+    return typecurves.type_curves(store, _wells, rate_col, cohort, normalize)
+
+# Well tables of the report (McCain labels, peaks and EUR, frac merge), built
+# once per dataset version instead of on every rerun. Its stages are recorded
+# only when the tables are built: on later reruns the debug panel shows the
+# cached call of report_tables alone
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def report_tables(_data_filtered, _df_frac, data_key):
+    data_filtered, df_frac = _data_filtered, _df_frac
+    with profiling.stage("clasificación McCain", "aggregate", rows_in=data_filtered) as s:
+        cum_df = wells.classify_mccain(data_filtered)
+        data_filtered = wells.add_fluid_type(data_filtered, cum_df)
+        s.rows_out = cum_df
+
+    with profiling.stage("merge fractura + McCain", "merge", rows_in=df_frac) as s:
+        df_merged = wells.merge_frac_fluids(df_frac, cum_df)
+        s.rows_out = df_merged
+
+    # --- Tabla consolidada por siglas para usar en reporte ---------
+
+    with profiling.stage("resumen por pozo (picos + EUR)", "aggregate", rows_in=data_filtered) as s:
+        summary_df = wells.create_summary_dataframe(data_filtered)
+        s.rows_out = summary_df
+
+    with profiling.stage("merge resumen por pozo", "merge", rows_in=df_merged) as s:
+        df_merged_final = wells.merge_summary(df_merged, summary_df)
+        s.rows_out = df_merged_final
+
+    with profiling.stage("filtro VMUT", "derive", rows_in=df_merged_final) as s:
+        df_merged_VMUT = wells.filter_vmut(df_merged_final)
+        s.rows_out = df_merged_VMUT
+
+    with profiling.stage("atributos por pozo para curvas tipo", "derive", rows_in=df_merged_VMUT) as s:
+        type_curve_wells = df_merged_VMUT.drop_duplicates(subset='sigla').merge(
+            data_filtered.drop_duplicates(subset='sigla')[['sigla', 'areayacimiento']],
+            on='sigla',
+            how='left'
+        )
+        s.rows_out = type_curve_wells
+    return df_merged_VMUT, type_curve_wells
+
+df_merged_VMUT, type_curve_wells = report_tables(data_filtered, df_frac, data_key)
+
+# Grid index over the well locations of the production snapshot
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_spatial_index(dataset_url):
+    return spatial.from_frame(load_and_sort_data(dataset_url))
+
+# Hexagon cells of every zoom level, computed once per dataset version
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def hex_layers(_wells, data_key):
+    return hexmap.build_layers(load_spatial_index(loaders.PRODUCTION_URL), _wells)
+
+# Monthly VMUT volumes by each well's McCain label in that month, per dataset version
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def volumes_by_fluid(_wells, data_key):
+    store = load_aligned_store(loaders.PRODUCTION_URL)
+    rows = store.rows(_wells['sigla'])
+    return fluids.volumes_by_fluid(store, rows), fluids.label_changes(store, rows)
+
+# Parent-child pairs of the frac wells, per dataset version and settings
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE)
+def parent_child_pairs(_children, data_key, radius_m, min_lag):
+    return interference.parent_child_pairs(
+        load_spatial_index(loaders.PRODUCTION_URL), load_aligned_store(loaders.PRODUCTION_URL),
+        _children, radius_m, min_lag
+    )
 
 # ----------------------- Pivot Tables + Plots ------------
 
-# Create tabs
-tab1, tab2, tab3 = st.tabs(["Indicadores de Actividad", "Estrategia de Completación", "Productividad"])
-
-# --- Tab 1: Indicadores de Actividad ---
-with tab1:
-
+# Sections of the report. Only the selected one runs (st.tabs would compute
+# and draw all of them on every rerun); its derived tables are cached per
+# dataset version, so going back to a section reuses them.
+report_sections = ["Indicadores de Actividad", "Estrategia de Completación", "Productividad", "Mapa"]
+report_section = st.radio("Sección", report_sections, horizontal=True, label_visibility="collapsed", key="report_section")
+
+# Figures of the sections that do not depend on widgets, built once per
+# section and dataset version instead of on every rerun
+@profiling.profiled("plot")
+@st.cache_data(ttl=shared.MAX_AGE, max_entries=4)
+def activity_figures(_wells, _type_curve_wells, data_key):
+    df_merged_VMUT = _wells
     #------------------
     # Group by 'start_year' and 'tipopozoNEW', then count the number of wells
     table_wells_by_start_year = (
@@ -298,11 +208,11 @@ with tab1:
     )
     
     # Create a Plotly figure for line plot
-    fig = go.Figure()
+    fig_pozos = go.Figure()
     
     # Add petrolífero wells (green line)
     if 'Petrolífero' in table_wells_pivot.columns:
-        fig.add_trace(go.Scatter(
+        fig_pozos.add_trace(go.Scatter(
             x=table_wells_pivot.index,
             y=table_wells_pivot['Petrolífero'],
             mode='lines+markers',
@@ -312,7 +222,7 @@ with tab1:
         ))
         # Add annotations for each point
         for x, y in zip(table_wells_pivot.index, table_wells_pivot['Petrolífero']):
-            fig.add_annotation(
+            fig_pozos.add_annotation(
                 x=x,
                 y=y,
                 text=str(int(y)),  # Convert to integer and remove decimals
@@ -323,7 +233,7 @@ with tab1:
     
     # Add gasífero wells (red line)
     if 'Gasífero' in table_wells_pivot.columns:
-        fig.add_trace(go.Scatter(
+        fig_pozos.add_trace(go.Scatter(
             x=table_wells_pivot.index,
             y=table_wells_pivot['Gasífero'],
             mode='lines+markers',
@@ -333,7 +243,7 @@ with tab1:
         ))
         # Add annotations for each point
         for x, y in zip(table_wells_pivot.index, table_wells_pivot['Gasífero']):
-            fig.add_annotation(
+            fig_pozos.add_annotation(
                 x=x,
                 y=y,
                 text=str(int(y)),  # Convert to integer and remove decimals
@@ -344,27 +254,14 @@ with tab1:
     
     
     # Update layout with labels and title
-    fig.update_layout(
+    fig_pozos.update_layout(
         title='Pozos enganchados por campaña (Fm. Vaca Muerta)',
         xaxis_title='Año de Puesta en Marcha',
         yaxis_title='Cantidad de Pozos',
         legend_title='Tipo de Pozo',
         template='plotly_white',
     )
-    
-    # Show the plot
-    #fig.show()
-    
-    st.plotly_chart(fig, use_container_width=True)
 
-    #------------------
-
-    st.divider()
-    
-    import streamlit as st
-    import pandas as pd
-    import plotly.graph_objects as go
-    
     # Group by 'start_year' and aggregate the data
     pivot_table_arena = df_merged_VMUT.groupby('start_year').agg({
         'arena_bombeada_nacional_tn': 'sum',
@@ -428,22 +325,53 @@ with tab1:
             x=0.5 # Centers the legend horizontally
         )
     )
-    
-    
+
+    # Volumes by the fluid type of each month (rolling McCain), so wells that
+    # go gassy move from one series to the other
+    fluid_volumes, fluid_changes = volumes_by_fluid(
+        _type_curve_wells, data_key
+    )
+    fig_oil_fluid = figures.area_chart(
+        fluid_volumes, 'prod_pet', 'fluido', "Producción Mensual de Petróleo por Tipo de Fluido",
+        "Petróleo (m3/mes)", "Fluido McCain"
+    )
+    fig_gas_fluid = figures.area_chart(
+        fluid_volumes, 'prod_gas', 'fluido', "Producción Mensual de Gas por Tipo de Fluido",
+        "Gas (km3/mes)", "Fluido McCain"
+    )
+    fluid_caption = f"Clasificación McCain de cada mes con la GOR de los últimos {fluids.WINDOW} meses."
+    went_gassy = fluid_changes['mes_cambio_a_gas'].dropna()
+    if len(went_gassy):
+        fluid_caption += (f" {len(went_gassy)} pozos comenzaron como petrolíferos y pasaron a gasíferos "
+                          f"(mediana: mes {went_gassy.median():.0f} en producción).")
+    return fig_pozos, fig_arena_plot, fig_oil_fluid, fig_gas_fluid, fluid_caption
+
+
+# --- Sección 1: Indicadores de Actividad ---
+def activity_section():
+    fig_pozos, fig_arena_plot, fig_oil_fluid, fig_gas_fluid, fluid_caption = activity_figures(
+        df_merged_VMUT, type_curve_wells, data_key
+    )
+    st.plotly_chart(fig_pozos, use_container_width=True)
+
+    st.divider()
+
     # Display the DataFrame in Streamlit
     st.write("### Evolución de Arena Bombeada")
-
-    
-    # fig_arena_plot.show()
     st.plotly_chart(fig_arena_plot)
 
-# --- Tab 2: Estrategia de Completación ---
-with tab2:
-  
+    st.write("### Producción según Tipo de Fluido Mensual")
+    st.plotly_chart(fig_oil_fluid, use_container_width=True)
+    st.plotly_chart(fig_gas_fluid, use_container_width=True)
+    st.caption(fluid_caption)
+
+
+@profiling.profiled("plot")
+@st.cache_data(ttl=shared.MAX_AGE, max_entries=4)
+def completion_figures(_wells, data_key):
+    df_merged_VMUT = _wells
     # ----------------
 
-    import plotly.graph_objects as go
-    import streamlit as st
     
     # Remove rows where longitud_rama_horizontal_m is zero and drop duplicates based on 'sigla'
     df_merged_VMUT_filtered = df_merged_VMUT[df_merged_VMUT['longitud_rama_horizontal_m'] > 0].drop_duplicates(subset='sigla')
@@ -464,10 +392,10 @@ with tab2:
     
     
     # Plot the pivot tables and line plots for max_lenght and avg_lenght
-    fig = go.Figure()
+    fig_rama = go.Figure()
     
     # Add Petrolífero wells - Max length
-    fig.add_trace(go.Scatter(
+    fig_rama.add_trace(go.Scatter(
         x=statistics['start_year'],
         y=statistics['max_lenght'],
         mode='lines+markers',
@@ -478,7 +406,7 @@ with tab2:
     
     
     # Add Petrolífero wells - Avg length
-    fig.add_trace(go.Scatter(
+    fig_rama.add_trace(go.Scatter(
         x=statistics['start_year'],
         y=statistics['avg_lenght'],
         mode='lines+markers',
@@ -489,7 +417,7 @@ with tab2:
 
     # Add annotations for Max Etapas
     for i, row in statistics.iterrows():
-        fig.add_annotation(
+        fig_rama.add_annotation(
             x=row['start_year'],
             y=row['max_lenght'],
             text=f"{row['max_lenght']:.0f}",  # Zero decimals
@@ -500,7 +428,7 @@ with tab2:
 
     # Add annotations for Avg Etapas
     for i, row in statistics.iterrows():
-        fig.add_annotation(
+        fig_rama.add_annotation(
             x=row['start_year'],
             y=row['avg_lenght'],
             text=f"{row['avg_lenght']:.0f}",  # Zero decimals
@@ -511,7 +439,7 @@ with tab2:
 
     
     # Update layout with labels, title, and legend below the plot
-    fig.update_layout(
+    fig_rama.update_layout(
         title='Evolución de la Rama Lateral (Fm Vaca Muerta)',
         xaxis_title='Campaña',
         yaxis_title='Longitud de Rama (metros)',
@@ -525,10 +453,6 @@ with tab2:
     )
     
     )
-    
-    # Show the plot
-    st.plotly_chart(fig, use_container_width=True)
-
 
     #----------------
     # Aggregate data to calculate max and avg by year
@@ -538,10 +462,10 @@ with tab2:
     ).reset_index()
     
     # Create the Plotly figure
-    fig = go.Figure()
+    fig_etapas = go.Figure()
     
     # Add Max Etapas line
-    fig.add_trace(go.Scatter(
+    fig_etapas.add_trace(go.Scatter(
         x=statistics['start_year'],
         y=statistics['max_etapas'],
         mode='lines+markers',
@@ -551,7 +475,7 @@ with tab2:
     ))
     
     # Add Avg Etapas line
-    fig.add_trace(go.Scatter(
+    fig_etapas.add_trace(go.Scatter(
         x=statistics['start_year'],
         y=statistics['avg_etapas'],
         mode='lines+markers',
@@ -562,7 +486,7 @@ with tab2:
     
     # Add annotations for Max Etapas
     for i, row in statistics.iterrows():
-        fig.add_annotation(
+        fig_etapas.add_annotation(
             x=row['start_year'],
             y=row['max_etapas'],
             text=f"{row['max_etapas']:.0f}",  # Zero decimals
@@ -573,7 +497,7 @@ with tab2:
     
     # Add annotations for Avg Etapas
     for i, row in statistics.iterrows():
-        fig.add_annotation(
+        fig_etapas.add_annotation(
             x=row['start_year'],
             y=row['avg_etapas'],
             text=f"{row['avg_etapas']:.0f}",  # Zero decimals
@@ -583,7 +507,7 @@ with tab2:
         )
     
     # Update layout with labels and title
-    fig.update_layout(
+    fig_etapas.update_layout(
         title='Evolución de Cantidad de Etapas (Fm. Vaca Muerta)',
         xaxis_title='Campaña',
         yaxis_title='Cantidad de Etapas',
@@ -596,21 +520,88 @@ with tab2:
             x=0.5 # Centers the legend horizontally
         )
     )
-    
-    # Show the plot
-    #fig.show()
-    st.plotly_chart(fig, use_container_width=True)
+    return fig_rama, fig_etapas
 
 
-# --- Tab 3: Productividad ---
-with tab3:
+# --- Sección 2: Estrategia de Completación ---
+def completion_section():
+    fig_rama, fig_etapas = completion_figures(df_merged_VMUT, data_key)
+    st.plotly_chart(fig_rama, use_container_width=True)
+    st.plotly_chart(fig_etapas, use_container_width=True)
 
-    
-    #------------------------------------
+    # Parent-child interference: frac wells that started producing near older producers
+    st.subheader("Interferencia Padre-Hijo", divider="blue")
 
-    import numpy as np
-    
-    
+    col1, col2, col3 = st.columns(3)
+    pc_radius = col1.slider("Distancia máxima al pozo padre (m)", 250, 3000, int(interference.RADIUS_M), 250, key="pc_radius")
+    pc_lag = col2.slider("Desfasaje mínimo (meses)", 1, 24, interference.MIN_LAG_MONTHS, key="pc_lag")
+    pc_fluid = col3.selectbox("Pozos", ["Petrolífero", "Gasífero"], key="pc_fluid")
+
+    pc_pairs = parent_child_pairs(
+        type_curve_wells['sigla'], data_key, pc_radius, pc_lag
+    )
+    pc_wells = views.derive(
+        type_curve_wells.merge(interference.tag_wells(pc_pairs, type_curve_wells['sigla']), on='sigla', how='left'),
+        Qo_peak_1000m=lambda df: df['Qo_peak'] / (df['longitud_rama_horizontal_m'] / 1000),
+        Qg_peak_1000m=lambda df: df['Qg_peak'] / (df['longitud_rama_horizontal_m'] / 1000),
+    )
+
+    if pc_fluid == "Petrolífero":
+        peak_col, cum_col, rate_units, cum_units = 'Qo_peak_1000m', 'Np_padres', 'm3/d', 'm3'
+    else:
+        peak_col, cum_col, rate_units, cum_units = 'Qg_peak_1000m', 'Gp_padres', 'km3/d', 'km3'
+    pc_fluid_wells = views.rows(pc_wells, tipopozoNEW=pc_fluid)
+
+    pc_table = pc_fluid_wells.groupby('rol').agg(
+        pozos=('sigla', 'count'),
+        caudal_pico=(peak_col, 'median'),
+        n_padres=('n_padres', 'median'),
+        acumulada_padres=(cum_col, 'median'),
+    ).reindex(interference.ROLES).dropna(how='all').reset_index()
+    st.dataframe(
+        pc_table.round(1).rename(columns={
+            'rol': 'Rol',
+            'pozos': 'Pozos',
+            'caudal_pico': f'Caudal pico P50 ({rate_units} cada 1000 m)',
+            'n_padres': 'Padres por hijo (P50)',
+            'acumulada_padres': f'Acumulada de los padres al inicio del hijo P50 ({cum_units})',
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    fig = px.box(
+        pc_fluid_wells.sort_values('start_year'), x='start_year', y=peak_col, color='rol',
+        category_orders={'rol': list(interference.ROLES)},
+        title=f'Caudal Pico por Longitud de Rama - Pozos {pc_fluid}s',
+        labels={'start_year': 'Campaña', peak_col: f'Caudal pico ({rate_units} cada 1000 m)', 'rol': 'Rol'},
+        template='plotly_white'
+    )
+    fig.update_layout(legend=dict(orientation='h', yanchor='bottom', y=1.0, xanchor='center', x=0.5))
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("Pares padre-hijo"):
+        st.dataframe(
+            views.rows(pc_pairs, sigla_hijo=pc_fluid_wells['sigla']).rename(columns={
+                'sigla_hijo': 'Hijo',
+                'sigla_padre': 'Padre',
+                'distancia_m': 'Distancia (m)',
+                'desfasaje_meses': 'Desfasaje (meses)',
+                'Np_padre': 'Np del padre (m3)',
+                'Gp_padre': 'Gp del padre (km3)',
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    st.caption("Un pozo es hijo si comenzó a producir al menos el desfasaje indicado después de un pozo "
+               "productor ubicado dentro de la distancia máxima (coordenadas de boca de pozo). La acumulada "
+               "de los padres es la suma al mes anterior al inicio del hijo.")
+
+
+@profiling.profiled("plot")
+@st.cache_data(ttl=shared.MAX_AGE, max_entries=4)
+def productivity_figures(_wells, data_key):
+    df_merged_VMUT = _wells
     # Step 1: Process Data for Petrolífero to get max and average oil rate
     grouped_petrolifero = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == 'Petrolífero'].groupby(
         ['start_year']
@@ -627,10 +618,10 @@ with tab3:
     grouped_petrolifero.columns = ['start_year', 'max_oil_rate', 'avg_oil_rate', 'p10_oil_rate', 'p90_oil_rate']
     
     # Step 2: Plot the data
-    fig = go.Figure()
+    fig_petroleo = go.Figure()
     
     # Plot maximum oil rate (dotted line)
-    fig.add_trace(go.Scatter(
+    fig_petroleo.add_trace(go.Scatter(
         x=grouped_petrolifero['start_year'],
         y=grouped_petrolifero['max_oil_rate'],
         mode='lines+markers',
@@ -640,7 +631,7 @@ with tab3:
     ))
     
     # Plot average oil rate (solid line)
-    fig.add_trace(go.Scatter(
+    fig_petroleo.add_trace(go.Scatter(
         x=grouped_petrolifero['start_year'],
         y=grouped_petrolifero['avg_oil_rate'],
         mode='lines+markers',
@@ -650,7 +641,7 @@ with tab3:
     ))
 
     # Plot P90 oil rate (solid line)
-    fig.add_trace(go.Scatter(
+    fig_petroleo.add_trace(go.Scatter(
         x=grouped_petrolifero['start_year'],
         y=grouped_petrolifero['p10_oil_rate'],
         mode='lines+markers',
@@ -660,7 +651,7 @@ with tab3:
     ))
 
     # Plot P10 oil rate (solid line)
-    fig.add_trace(go.Scatter(
+    fig_petroleo.add_trace(go.Scatter(
         x=grouped_petrolifero['start_year'],
         y=grouped_petrolifero['p90_oil_rate'],
         mode='lines+markers',
@@ -671,7 +662,7 @@ with tab3:
     
     # Add annotations for max oil rate
     for i, row in grouped_petrolifero.iterrows():
-        fig.add_annotation(
+        fig_petroleo.add_annotation(
             x=row['start_year'],
             y=row['max_oil_rate'],
             text=str(int(row['max_oil_rate'])),  # Convert to integer (no decimals)
@@ -685,7 +676,7 @@ with tab3:
     
     # Add annotations for average oil rate
     for i, row in grouped_petrolifero.iterrows():
-        fig.add_annotation(
+        fig_petroleo.add_annotation(
             x=row['start_year'],
             y=row['avg_oil_rate'],
             text=str(int(row['avg_oil_rate'])),  # Convert to integer (no decimals)
@@ -698,7 +689,7 @@ with tab3:
         )
     
     # Step 3: Customize Layout
-    fig.update_layout(
+    fig_petroleo.update_layout(
         title="Tipo Petrolífero: Evolución de Caudal Pico (Maximo y Percentiles)",
         xaxis_title="Campaña",
         yaxis_title="Caudal de Petróleo (m3/d)",
@@ -711,11 +702,7 @@ with tab3:
             x=0.5 # Centers the legend horizontally
         )
     )
-    
-     #fig.show()
-    st.plotly_chart(fig,use_container_width=True)
-    
-    
+
     # Step 1: Process Data for Gasífero to get max and average gas rate
     grouped_gasifero = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == 'Gasífero'].groupby(
         ['start_year']
@@ -732,10 +719,10 @@ with tab3:
     grouped_gasifero.columns = ['start_year', 'max_gas_rate', 'avg_gas_rate', 'p10_gas_rate', 'p90_gas_rate']
     
     # Step 2: Plot the data
-    fig = go.Figure()
+    fig_gas = go.Figure()
     
     # Plot maximum gas rate (dotted line)
-    fig.add_trace(go.Scatter(
+    fig_gas.add_trace(go.Scatter(
         x=grouped_gasifero['start_year'],
         y=grouped_gasifero['max_gas_rate'],
         mode='lines+markers',
@@ -745,7 +732,7 @@ with tab3:
     ))
     
     # Plot average gas rate (solid line)
-    fig.add_trace(go.Scatter(
+    fig_gas.add_trace(go.Scatter(
         x=grouped_gasifero['start_year'],
         y=grouped_gasifero['avg_gas_rate'],
         mode='lines+markers',
@@ -755,7 +742,7 @@ with tab3:
     ))
 
     # Plot average gas rate (solid line)
-    fig.add_trace(go.Scatter(
+    fig_gas.add_trace(go.Scatter(
         x=grouped_gasifero['start_year'],
         y=grouped_gasifero['p90_gas_rate'],
         mode='lines+markers',
@@ -765,7 +752,7 @@ with tab3:
     ))
 
     # Plot average gas rate (solid line)
-    fig.add_trace(go.Scatter(
+    fig_gas.add_trace(go.Scatter(
         x=grouped_gasifero['start_year'],
         y=grouped_gasifero['p10_gas_rate'],
         mode='lines+markers',
@@ -776,7 +763,7 @@ with tab3:
  
     # Add annotations for max gas rate
     for i, row in grouped_gasifero.iterrows():
-        fig.add_annotation(
+        fig_gas.add_annotation(
             x=row['start_year'],
             y=row['max_gas_rate'],
             text=str(int(row['max_gas_rate'])),  # Convert to integer (no decimals)
@@ -790,7 +777,7 @@ with tab3:
     
     # Add annotations for average gas rate
     for i, row in grouped_gasifero.iterrows():
-        fig.add_annotation(
+        fig_gas.add_annotation(
             x=row['start_year'],
             y=row['avg_gas_rate'],
             text=str(int(row['avg_gas_rate'])),  # Convert to integer (no decimals)
@@ -803,7 +790,7 @@ with tab3:
         )
     
     # Step 3: Customize Layout
-    fig.update_layout(
+    fig_gas.update_layout(
         title="Tipo Gasífero: Evolución de Caudal Pico (Maximo y Percentiles)",
         xaxis_title="Campaña",
         yaxis_title="Caudal de Gas (km3/d)",
@@ -816,17 +803,193 @@ with tab3:
             x=0.5 # Centers the legend horizontally
         )
     )
-    
-     #fig.show()
-    st.plotly_chart(fig,use_container_width=True)
-
-# --------------------
-
-
-
-
-
+    return fig_petroleo, fig_gas
+
+
+# --- Sección 3: Productividad ---
+def productivity_section():
+    fig_petroleo, fig_gas = productivity_figures(df_merged_VMUT, data_key)
+    st.plotly_chart(fig_petroleo, use_container_width=True)
+    st.plotly_chart(fig_gas, use_container_width=True)
+
+    # Type curves (P10/P50/P90) by cohort
+    st.subheader("Curvas Tipo por Cohorte", divider="blue")
+
+    col1, col2, col3 = st.columns(3)
+    tc_fluid = col1.selectbox("Curva de", ["Petróleo", "Gas"], key="tc_fluid")
+    cohort_options = {label: column for column, label in typecurves.COHORTS.items()}
+    tc_cohort = cohort_options[col2.selectbox("Cohorte", list(cohort_options), key="tc_cohort")]
+    normalize_options = {
+        "Sin normalizar": None,
+        "Longitud de rama (1000 m)": 'longitud_rama_horizontal_m',
+        "Cantidad de etapas": 'cantidad_fracturas',
+    }
+    tc_normalize = normalize_options[col3.selectbox("Normalizar por", list(normalize_options), key="tc_normalize")]
+
+    if tc_fluid == "Petróleo":
+        rate_col, rate_units, cum_units = 'oil_rate', 'm3/d', 'm3'
+    else:
+        rate_col, rate_units, cum_units = 'gas_rate', 'km3/d', 'km3'
+    suffix = typecurves.NORMALIZERS[tc_normalize][1] if tc_normalize else ''
+
+    curves = type_curves(
+        type_curve_wells, data_key,
+        rate_col, tc_cohort, tc_normalize
+    )
+    cohort_values = list(curves[tc_cohort].unique())
+    selected_cohorts = st.multiselect(
+        typecurves.COHORTS[tc_cohort], cohort_values, default=cohort_values[-3:], key="tc_values"
+    )
 
+    palette = px.colors.qualitative.Plotly
+    for kind, title, units in (
+        ('q', f"Curva Tipo de Caudal de {tc_fluid}", f"Caudal ({rate_units}{suffix})"),
+        ('acum', f"Curva Tipo de Acumulada de {tc_fluid}", f"Acumulada ({cum_units}{suffix})"),
+    ):
+        fig = go.Figure()
+        for i, value in enumerate(selected_cohorts):
+            curve = curves[curves[tc_cohort] == value]
+            line_color = palette[i % len(palette)]
+
+            # P10-P90 band and P50 line
+            fig.add_trace(go.Scatter(
+                x=curve['mes'], y=curve[f'{kind}_P10'], mode='lines',
+                line=dict(width=0, color=line_color), showlegend=False, hoverinfo='skip'
+            ))
+            fig.add_trace(go.Scatter(
+                x=curve['mes'], y=curve[f'{kind}_P90'], mode='lines',
+                line=dict(width=0, color=line_color), fill='tonexty', opacity=0.2,
+                name=f'{value} (P10-P90)'
+            ))
+            fig.add_trace(go.Scatter(
+                x=curve['mes'], y=curve[f'{kind}_P50'], mode='lines',
+                line=dict(color=line_color), name=f'{value} (P50)',
+                customdata=curve['n_pozos'], hovertemplate='%{y:.1f} (%{customdata} pozos)'
+            ))
+
+        fig.update_layout(
+            title=title,
+            xaxis_title="Meses en producción",
+            yaxis_title=units,
+            template="plotly_white",
+            legend=dict(orientation='h', yanchor='bottom', y=1.0, xanchor='center', x=0.5)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.caption("Pozos alineados en su primer mes con producción. P10 es el caso alto (percentil 90) "
+               "y P90 el caso bajo; se muestran los meses con al menos 3 pozos en la cohorte.")
+
+# --- Sección 4: Mapa ---
+def map_section():
+
+    spatial_index = load_spatial_index(loaders.PRODUCTION_URL)
+    layers = hex_layers(type_curve_wells, data_key)
+
+    col1, col2, col3 = st.columns(3)
+    map_metrics = {
+        "Cantidad de pozos": ('n_pozos', "Pozos"),
+        "Caudal pico de petróleo (P50)": ('Qo_peak_p50', "m3/d"),
+        "Caudal pico de gas (P50)": ('Qg_peak_p50', "km3/d"),
+        "Acumulada de petróleo": ('Np_total', "m3"),
+        "Acumulada de gas": ('Gp_total', "km3"),
+    }
+    map_metric = col1.selectbox("Variable", list(map_metrics), key="map_metric")
+    map_levels = {f"Zoom {zoom} (hexágonos de {size / 1000:g} km)": zoom for zoom, size in hexmap.LEVELS.items()}
+    map_zoom = map_levels[col2.selectbox("Nivel de detalle", list(map_levels), key="map_zoom")]
+    map_center = col3.selectbox("Centrar en", ["Toda la cuenca"] + sorted(spatial_index.areas), key="map_center")
+
+    # Only the cells inside the viewport are sent to the browser
+    cells = layers[map_zoom]
+    if map_center == "Toda la cuenca":
+        center = (cells['lon'].mean(), cells['lat'].mean())
+    else:
+        area_rows = spatial_index.areas[map_center]
+        center = (spatial_index.lon[area_rows].mean(), spatial_index.lat[area_rows].mean())
+    cells = hexmap.visible(cells, hexmap.viewport(*center, map_zoom))
+
+    if cells.empty:
+        st.write("No hay pozos VMUT en la zona seleccionada.")
+    else:
+        value, units = map_metrics[map_metric]
+        shapes = hexmap.geojson(cells, spatial_index, hexmap.LEVELS[map_zoom])
+        st.plotly_chart(
+            figures.hex_map(cells, shapes, value, map_metric, units, center, map_zoom),
+            use_container_width=True
+        )
+        st.caption(f"{len(cells)} celdas con {int(cells['n_pozos'].sum())} pozos VMUT en la vista. "
+                   "Los caudales pico son la mediana de los pozos de cada celda.")
+
+sections = {
+    "Indicadores de Actividad": (activity_section, df_merged_VMUT),
+    "Estrategia de Completación": (completion_section, df_merged_VMUT),
+    "Productividad": (productivity_section, df_merged_VMUT),
+    "Mapa": (map_section, type_curve_wells),
+}
+draw_section, section_rows = sections[report_section]
+with profiling.stage(f"pestaña {report_section}", "plot", rows_in=section_rows):
+    draw_section()
+
+# ------------------------ Consulta personalizada ------------------------
+
+# In-process SQL engine over the shared snapshots (needs the optional duckdb package)
+@profiling.profiled("load")
+@st.cache_resource(ttl=shared.MAX_AGE)
+def load_sql_engine():
+    return sql.Engine.from_snapshots({'production': loaders.PRODUCTION_URL, 'frac': loaders.FRAC_URL})
+
+# Query results per statement, parameters and dataset version (the most
+# recent ones: every edit of a free-form statement is a new entry)
+@profiling.profiled("aggregate")
+@st.cache_data(ttl=shared.MAX_AGE, max_entries=32)
+def run_query(statement, params, data_key):
+    return load_sql_engine().query(statement, list(params))
+
+with st.expander("Consulta personalizada"):
+    if not sql.available():
+        st.caption("Instalar el paquete `duckdb` para habilitar las consultas sobre los datos.")
+    else:
+        engine = load_sql_engine()
+        query_defaults = {
+            'produccion': (['empresaNEW', 'anio'], 'prod_pet'),
+            'fractura': (['empresa_informante', 'anio_if'], 'arena_total_tn'),
+        }
+        query_mode = st.radio("Tipo de consulta", ['Desglose', 'SQL'], horizontal=True, key="query_mode")
+        if query_mode == 'Desglose':
+            col1, col2, col3, col4 = st.columns(4)
+            query_table = col1.selectbox("Tabla", list(sql.TABLES), key="query_table")
+            query_columns = engine.columns[query_table]
+            default_by, default_value = query_defaults[query_table]
+            query_by = col2.multiselect(
+                "Agrupar por", query_columns,
+                default=[c for c in default_by if c in query_columns], key="query_by"
+            )
+            query_values = engine.numeric[query_table]
+            query_value = col3.selectbox(
+                "Valor", query_values,
+                index=query_values.index(default_value) if default_value in query_values else 0,
+                key="query_value"
+            )
+            query_agg = col4.selectbox("Agregación", sql.AGGREGATES, key="query_agg")
+            statement, params = engine.breakdown_sql(query_table, query_by, query_value, query_agg)
+            st.code(statement, language='sql')
+        else:
+            statement = st.text_area(
+                f"Consulta SQL sobre las tablas {', '.join(sql.TABLES)}",
+                "SELECT empresaNEW, anio, sum(prod_pet) AS prod_pet, sum(prod_gas) AS prod_gas\n"
+                "FROM produccion\nWHERE formprod = 'VMUT'\nGROUP BY 1, 2\nORDER BY 1, 2",
+                height=150,
+                key="query_sql"
+            )
+            params = []
 
+        try:
+            query_result = run_query(statement, tuple(params), data_key)
+        except (ValueError, sql.Error) as e:
+            st.error(f"Error en la consulta: {e}")
+        else:
+            st.dataframe(query_result, hide_index=True, use_container_width=True)
+            st.caption(f"{len(query_result)} filas (máximo {sql.MAX_ROWS}).")
 
+# --------------------
 
+profiling.debug_panel()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The tests import capiv_core from the repository and the synthetic data
+# generators of the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from capiv_core import aligned, loaders
+
+
+def test_repeated_months_are_counted_once():
+    df = pd.DataFrame({
+        'sigla': 'P-1',
+        'anio': 2020,
+        'mes': [1, 2, 2, 3],
+        'prod_pet': [300.0, 150.0, 150.0, 90.0],
+        'prod_gas': 0.0,
+        'prod_agua': 0.0,
+        'tef': 30.0,
+        'iny_gas': 0.0,
+    })
+    loaders.add_production_columns(df)
+    store = aligned.build(df)
+    np.testing.assert_allclose(store['oil_rate'][0], [10.0, 5.0, 3.0])
+    np.testing.assert_allclose(store['Np'][0], [300.0, 450.0, 540.0])
+    # Same rule as the producing-month rows of the pages
+    df['empresa'] = 'YPF'
+    assert loaders.filter_producing(df)['prod_pet'].sum() == store['Np'][0, -1]
+    # Without the flags as well
+    np.testing.assert_allclose(aligned.build(df.drop(columns='calidad'))['Np'][0], [300.0, 450.0, 540.0])
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pandas as pd
+
+from capiv_core import api
+
+
+def _vmut():
+    return pd.DataFrame({
+        'tipopozoNEW': 'Petrolífero',
+        'start_year': [2020, 2020, 2020, 2021],
+        'sigla': ['A-1', 'A-2', 'A-3', 'B-1'],
+        'empresaNEW': ['YPF', 'YPF', 'VISTA', 'VISTA'],
+        'Qo_peak': [300.0, 250.0, 100.0, 400.0],
+        'longitud_rama_horizontal_m': 2500.0,
+        'cantidad_fracturas': 50.0,
+        'arena_bombeada_nacional_tn': 5000.0,
+        'arena_bombeada_importada_tn': 0.0,
+    })
+
+
+class StaticDataset(api.Dataset):
+    # Fixed frames instead of the snapshots
+    def version(self):
+        return 'v1'
+
+    def expires_in(self):
+        return 60
+
+    def vmut(self):
+        return _vmut()
+
+    def summaries(self):
+        return _vmut()[['sigla', 'empresaNEW', 'start_year']]
+
+
+def _get(app, url):
+    path, _, query = url.partition('?')
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(), 'headers': []}
+    response = {'body': b''}
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+
+    asyncio.run(app(scope, receive, send))
+    return response['status'], json.loads(response['body'])
+
+
+def test_rankings_have_the_campaign_on_every_row():
+    status, top = _get(api.App(StaticDataset()), '/rankings?n=2')
+    assert status == 200
+    assert [(row['start_year'], row['sigla']) for row in top] == [(2020, 'A-1'), (2020, 'A-2'), (2021, 'B-1')]
+
+
+def test_negative_counts_are_bad_requests():
+    app = api.App(StaticDataset())
+    for url in ['/rankings?n=-1', '/pozos?limit=-5', '/pozos?offset=-1', '/series/empresas?top=-2']:
+        assert _get(app, url)[0] == 400, url
+    status, body = _get(app, '/pozos?offset=1&limit=2')
+    assert status == 200 and body['total'] == 4 and [row['sigla'] for row in body['pozos']] == ['A-2', 'A-3']
+
+
+def test_frame_built_across_a_version_change_is_not_kept():
+    dataset = api.Dataset()
+    dataset._version = 'old'
+
+    def build():
+        dataset._version = 'new'  # the snapshot was rebuilt meanwhile
+        return 'old frame'
+
+    assert dataset._frame('snapshot', build) == 'old frame'
+    assert 'snapshot' not in dataset._frames
+    assert dataset._frame('snapshot', lambda: 'new frame') == 'new frame'
+    assert dataset._frames['snapshot'] == 'new frame'
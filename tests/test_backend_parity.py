@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from capiv_core import backend
+
+pytest.importorskip('polars')
+import parity  # noqa: E402  (benchmarks/parity.py)
+
+
+@pytest.mark.parametrize('repair', [True, False])
+def test_polars_backend_matches_pandas(repair):
+    production = parity.make_dirty_production(n_wells=200, months=24, seed=0)
+    results = {}
+    for name in backend.BACKENDS:
+        with backend.use(name):
+            results[name] = parity.pipeline(production, repair)
+    for frame, expected in results['pandas'].items():
+        pd.testing.assert_frame_equal(
+            results['polars'][frame], expected, check_exact=False, rtol=parity.RTOL, obj=frame
+        )
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from capiv_core import decline
+
+# Known Arps curves: (qi, Di per month, b)
+CURVES = [(500.0, 0.15, 0.8), (120.0, 0.05, 1.2), (80.0, 0.30, 0.3), (1000.0, 0.08, 1.6)]
+
+
+def _rates(model='hyperbolic', months=60, ramp_up=2):
+    qi, di, b = (np.array(values) for values in zip(*CURVES))
+    t = np.arange(months - ramp_up, dtype=float)[None, :]
+    q = decline.rate(qi, di, b, t, model)
+    # Ramp-up months before the peak are left out of the fit
+    ramp = qi[:, None] * np.linspace(0.2, 0.6, ramp_up)[None, :]
+    return np.hstack([ramp, q])
+
+
+@pytest.mark.parametrize('model', ['hyperbolic', 'modified'])
+def test_hyperbolic_parameters_are_recovered(model):
+    q = _rates()
+    fits = decline.fit_matrix(np.array([f'P-{i}' for i in range(len(q))]), q, np.nansum(q, axis=1), model)
+    qi, di, b = (np.array(values) for values in zip(*CURVES))
+    np.testing.assert_allclose(fits['qi'], qi, rtol=1e-3)
+    np.testing.assert_allclose(fits['Di'], di, rtol=1e-3)
+    np.testing.assert_allclose(fits['b'], b, rtol=1e-3)
+    assert (fits['r2'] > 0.9999).all()
+    assert (fits['mes_pico'] == 2).all()
+    assert (fits['EUR'] > fits['acumulada']).all()
+
+
+def test_exponential_is_exact_and_chunks_agree():
+    qi, di = np.array([300.0, 50.0, 900.0]), np.array([0.04, 0.2, 0.1])
+    t = np.arange(36, dtype=float)[None, :]
+    q = decline.rate(qi, di, np.zeros(3), t, 'exponential')
+    q[1, 20:] = np.nan  # shut in: fewer points, same curve
+    siglas = np.array(['A', 'B', 'C'])
+    fits = decline.fit_matrix(siglas, q, np.zeros(3), 'exponential')
+    np.testing.assert_allclose(fits['qi'], qi, rtol=1e-9)
+    np.testing.assert_allclose(fits['Di'], di, rtol=1e-9)
+    assert list(fits['n_meses']) == [36, 20, 36]
+
+    chunked = decline.fit_matrix(siglas, q, np.zeros(3), 'exponential', chunk_size=1)
+    pd.testing.assert_frame_equal(chunked, fits)
+
+
+def test_wells_with_too_few_months_are_not_fitted():
+    q = np.array([[100.0, 90.0, np.nan, np.nan], [np.nan] * 4])
+    fits = decline.fit_matrix(np.array(['A', 'B']), q, np.zeros(2))
+    assert fits[['qi', 'Di', 'b', 'EUR']].isna().all().all()
+
+
+def test_months_with_zero_rate_are_left_out_of_the_fit():
+    # Reported months with effective time and no volume (rate 0, not NaN),
+    # as the aligned store has them
+    q = _rates()
+    with_zeros = q.copy()
+    with_zeros[:, [10, 25, 40]] = 0.0
+    shut_in = q.copy()
+    shut_in[:, [10, 25, 40]] = np.nan
+    siglas = np.array([f'P-{i}' for i in range(len(q))])
+    fits = decline.fit_matrix(siglas, with_zeros, np.nansum(with_zeros, axis=1))
+    expected = decline.fit_matrix(siglas, shut_in, np.nansum(shut_in, axis=1))
+    assert fits[['qi', 'Di', 'b', 'r2', 'EUR']].notna().all().all()
+    pd.testing.assert_frame_equal(fits, expected)
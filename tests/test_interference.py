@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from capiv_core import aligned, interference, loaders, spatial
+
+
+def _store(first_months):
+    rows = []
+    for sigla, (anio, mes) in first_months.items():
+        for month in range(24):
+            rows.append((sigla, anio + (mes - 1 + month) // 12, (mes - 1 + month) % 12 + 1))
+    df = pd.DataFrame(rows, columns=['sigla', 'anio', 'mes'])
+    df[['prod_pet', 'prod_gas', 'prod_agua']] = 30.0, 0.0, 0.0
+    df[['tef', 'iny_gas']] = 30.0, 0.0
+    return aligned.build(loaders.add_production_columns(df))
+
+
+def test_wells_without_production_are_not_children():
+    # P-1 is the parent of P-2 (12 months later, 450 m away); N-1 sits next to
+    # both but never produced, so it is neither a parent nor a child
+    store = _store({'P-1': (2020, 1), 'P-2': (2021, 1)})
+    index = spatial.SpatialIndex(['P-1', 'P-2', 'N-1'], [-69.0, -69.0, -69.002], [-38.5, -38.496, -38.5])
+
+    pairs = interference.parent_child_pairs(index, store)
+    assert list(zip(pairs['sigla_hijo'], pairs['sigla_padre'])) == [('P-2', 'P-1')]
+    assert list(pairs['desfasaje_meses']) == [12]
+    # Cumulative of the parent up to the month before the child's first month
+    assert list(pairs['Np_padre']) == [12 * 30.0]
+
+    # Same pairs when the children are given
+    pd.testing.assert_frame_equal(interference.parent_child_pairs(index, store, children=['P-2', 'N-1']), pairs)
+
+    roles = interference.tag_wells(pairs, ['P-1', 'P-2', 'N-1'])
+    assert list(roles['rol']) == ['Padre', 'Hijo', 'Independiente']
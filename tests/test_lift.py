@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from capiv_core import aligned, lift, loaders
+
+
+# One well, twelve months: lift A -> B in month 5 with a known uplift and
+# B -> C in month 9, shut in after it (no rate, NaN uplift)
+def _well():
+    oil = [10.0] * 4 + [5.0] * 4 + [0.0] * 4
+    df = pd.DataFrame({
+        'sigla': 'P-1',
+        'anio': 2020,
+        'mes': np.arange(1, 13),
+        'prod_pet': np.array(oil) * 30,
+        'prod_gas': np.array(oil) * 30,
+        'prod_agua': 0.0,
+        'tef': [30.0] * 8 + [0.0] * 4,
+        'iny_gas': 0.0,
+        'tipoextraccion': ['A'] * 4 + ['B'] * 4 + ['C'] * 4,
+    })
+    loaders.add_production_columns(df)
+    return df
+
+
+def test_latest_change_keeps_its_own_uplift():
+    df = _well()
+    store = aligned.build(df)
+    changes = lift.lift_changes(df, store)
+    assert list(changes['mes']) == [5, 9]
+    assert np.isclose(changes['uplift_pet'].iloc[0], -0.5)
+    assert np.isnan(changes['uplift_pet'].iloc[1])
+
+    summary = lift.well_summary(df, store, changes=changes).set_index('sigla')
+    assert summary.loc['P-1', 'cambios_extraccion'] == 2
+    assert summary.loc['P-1', 'ultimo_cambio_mes'] == 9
+    assert summary.loc['P-1', 'extraccion_anterior'] == 'B'
+    assert np.isnan(summary.loc['P-1', 'uplift_pet'])
+    assert summary.loc['P-1', 'extraccion_actual'] == 'C'
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from capiv_core import operators
+
+
+def test_resolve_maps_every_spelling_to_one_company():
+    aliases = {operators.normalize('Vista Oil & Gas Argentina SAU'): 'VISTA'}
+    names = pd.Series(['VISTA OIL & GAS ARGENTINA S.A.U.', 'YPF S.A.', None, 'Vista Oil & Gas Argentina SAU'],
+                      index=[10, 11, 12, 13])
+    resolved = operators.resolve(names, aliases)
+    assert list(resolved.index) == [10, 11, 12, 13]
+    assert resolved[10] == 'VISTA' and resolved[11] == 'YPF S.A.' and resolved[13] == 'VISTA'
+    assert pd.isna(resolved[12])
+
+    as_category = operators.resolve(names.astype('category'), aliases, as_category=True)
+    assert list(as_category.cat.categories) == ['VISTA', 'YPF S.A.']
+    assert (as_category.astype(object).fillna('-') == resolved.fillna('-')).all()
+
+
+def test_alias_table_is_read_once_per_modification(tmp_path):
+    path = str(tmp_path / 'aliases.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("empresa,empresaNEW\nVISTA OIL & GAS ARGENTINA SAU,VISTA\n")
+    first, version = operators.load_aliases(path), operators.table_version(path)
+    assert operators.load_aliases(path) is first
+    assert operators.table_version(path) == version
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("YPF S.A.,YPF\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert operators.load_aliases(path)['YPF'] == 'YPF'
+    assert operators.table_version(path) != version
+    assert operators.load_aliases(str(tmp_path / 'missing.csv')) == {}
+    assert np.isnan(operators.resolve(pd.Series([np.nan]), {})[0])
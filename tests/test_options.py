@@ -0,0 +1,19 @@
+import pandas as pd
+
+from capiv_core import options
+
+
+def test_memoized_option_lists_are_bounded(monkeypatch):
+    monkeypatch.setattr(options, 'MAX_CACHED', 3)
+    df = pd.DataFrame({'empresa': ['A', 'A', 'B'], 'sigla': ['A-1', 'A-2', 'B-1']})
+    well_options = options.OptionLists(df, ['empresa', 'sigla'])
+    assert well_options.values('sigla', empresa='A') == ('A-1', 'A-2')
+    first = well_options.index('sigla', empresa='A')
+    for sigla in ['A-1', 'A-2', 'B-1', 'C-1']:
+        well_options.values('empresa', sigla=sigla)
+        well_options.index('sigla', empresa=[sigla[0]])
+        # The most recently used index stays
+        assert well_options.index('sigla', empresa='A') is first
+    assert len(well_options._values) == 3 and len(well_options._indexes) == 3
+    assert well_options.values('sigla', empresa=['B']) == ('B-1',)
+    assert first.search('a2') == ['A-2']
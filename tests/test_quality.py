@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from capiv_core import loaders, quality
+
+
+def _rows():
+    df = pd.DataFrame({
+        'sigla': ['P-1', 'P-1', 'P-1', 'P-1', 'P-2'],
+        'empresa': 'YPF',
+        'anio': [2021, 2020, 2020, 2020, 2021],
+        'mes': [2, 2, 3, 3, 3],
+        'prod_pet': [300.0, 290.0, 310.0, 310.0, 0.0],
+        'prod_gas': 0.0,
+        'prod_agua': 0.0,
+        'tef': [29.0, 29.0, 31.0, 31.0, 0.0],
+    })
+    loaders.add_date(df)
+    return df
+
+
+def test_tef_is_compared_with_the_days_of_the_month():
+    mask = quality.flags(_rows())
+    # 29 days in February 2021 is impossible, in February 2020 (leap year) it is not
+    assert [bool(m & quality.IMPOSSIBLE_RATE) for m in mask] == [True, False, False, False, False]
+    # Same without the date column
+    assert (quality.flags(_rows().drop(columns='date')) == mask).all()
+
+
+def test_default_repair_keeps_the_totals():
+    df = loaders.add_production_columns(_rows())
+    # Impossible rates are flagged but kept; the rate of a month without tef is NaN, not inf
+    assert df['oil_rate'].iloc[0] == 300.0 / 29
+    assert np.isnan(df['oil_rate'].iloc[4])
+    assert df['prod_pet'].sum() == _rows()['prod_pet'].sum()
+
+
+def test_filter_producing_drops_duplicate_months():
+    df = loaders.add_production_columns(_rows())
+    data_filtered = loaders.filter_producing(df)
+    assert not data_filtered.duplicated(subset=quality.KEY).any()
+    assert list(data_filtered.index) == [0, 1, 2]
+    assert quality.summary(df).set_index('control').loc['Fila duplicada', 'filas'] == 1
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from capiv_core import shared
+
+
+def _snapshot(path, months):
+    df = pd.DataFrame({'date': pd.to_datetime([f"2023-{m:02d}-01" for m in months]), 'prod_pet': 1.0})
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+
+
+def test_month_index_follows_the_snapshot_version(tmp_path):
+    path = str(tmp_path / 'production.arrow')
+    _snapshot(path, [1, 1, 2, 3])
+    first = shared.read_snapshot(path)
+    index = shared.production_month_index(first)
+    assert shared.production_month_index(shared.read_snapshot(path)) is index
+    assert index.latest() == pd.Timestamp('2023-03-01')
+
+    # A filtered frame carries the attrs of the snapshot but not its rows
+    filtered = first[first['date'] > '2023-01-01']
+    assert len(shared.production_month_index(filtered).rows(filtered)) == 2
+
+    # Rebuilt snapshot (new mtime): new index, even for a frame of the same length
+    _snapshot(path, [1, 2, 3, 4])
+    os.utime(path, ns=(0, os.stat(first.attrs['snapshot'][0]).st_mtime_ns + 10 ** 9))
+    rebuilt = shared.production_month_index(shared.read_snapshot(path))
+    assert rebuilt is not index
+    assert rebuilt.latest() == pd.Timestamp('2023-04-01')
+    # The frame read before the rebuild keeps its own index
+    assert shared.production_month_index(first) is index
+
+
+def test_prefetch_reports_failed_downloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, 'SNAPSHOT_DIR', str(tmp_path))
+    frac_csv = tmp_path / 'frac.csv'
+    pd.DataFrame({'sigla': ['A-1'], 'arena_bombeada_nacional_tn': [10.0],
+                  'arena_bombeada_importada_tn': [5.0]}).to_csv(frac_csv, index=False)
+    sources = {'production': str(tmp_path / 'missing.csv'), 'frac': str(frac_csv)}
+
+    failures = []
+    built = shared.prefetch(sources, on_error=lambda name, e: failures.append((name, type(e))))
+    assert built == ['frac']
+    assert failures == [('production', FileNotFoundError)]
+    assert shared.frac_frame(str(frac_csv))['arena_total_tn'].tolist() == [15.0]
+
+
+def test_a_long_build_keeps_its_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(shared, 'LOCK_TIMEOUT', 0.4)
+    builds = []
+
+    def build(source):
+        builds.append(source)
+        time.sleep(1.5)  # several lock timeouts
+        return pd.DataFrame({'a': [1]})
+
+    workers = [threading.Thread(target=shared.ensure, args=('slow', 'src', build)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+        time.sleep(0.1)
+    for worker in workers:
+        worker.join()
+    assert builds == ['src']
+    assert not os.path.exists(shared.snapshot_path('slow', 'src') + '.lock')
+
+
+def test_a_waiter_does_not_build_without_the_lock(tmp_path, monkeypatch):
+    # The lock is released, but another process takes it again first: the
+    # waiter goes back to waiting instead of building alongside it
+    monkeypatch.setattr(shared, 'SNAPSHOT_DIR', str(tmp_path))
+    attempts = iter([False, False, True])
+    acquired = []
+
+    def acquire(lock):
+        acquired.append(next(attempts))
+        return acquired[-1]
+
+    monkeypatch.setattr(shared, '_acquire', acquire)
+    monkeypatch.setattr(shared, '_lock_age', lambda lock: float('inf'))
+    builds = []
+
+    def build(source):
+        builds.append(acquired[-1])  # whether the builder holds the lock
+        return pd.DataFrame({'a': [1]})
+
+    shared.ensure('busy', 'src', build)
+    assert acquired == [False, False, True]
+    assert builds == [True]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from capiv_core import aligned, loaders, typecurves
+
+
+def test_percentiles_match_nanpercentile_per_cohort():
+    rng = np.random.default_rng(0)
+    rows = []
+    for well in range(40):
+        start = rng.integers(0, 12)
+        for month in range(start, start + rng.integers(6, 24)):
+            rows.append((f'P-{well:02d}', 2020 + month // 12, month % 12 + 1))
+    df = pd.DataFrame(rows, columns=['sigla', 'anio', 'mes'])
+    df['prod_pet'] = rng.gamma(2.0, 300.0, len(df))
+    df[['prod_gas', 'prod_agua', 'iny_gas']] = 0.0
+    df['tef'] = np.where(rng.random(len(df)) < 0.1, 0.0, 30.0)  # shut-in months: NaN rates
+    store = aligned.build(loaders.add_production_columns(df))
+
+    wells = pd.DataFrame({'sigla': store.siglas, 'start_year': rng.integers(2020, 2024, len(store))})
+    wells.loc[:2, 'start_year'] = np.nan  # wells without a cohort are left out
+    curves = typecurves.type_curves(store, wells, 'oil_rate', 'start_year', min_wells=1)
+
+    for year, cohort in curves.groupby('start_year'):
+        members = store.rows(wells.loc[wells['start_year'] == year, 'sigla'])
+        months = cohort['mes'].to_numpy() - 1
+        q = store['oil_rate'][members][:, months]
+        np.testing.assert_array_equal(cohort['n_pozos'], np.isfinite(q).sum(axis=0))
+        for name, p in typecurves.PERCENTILES:
+            np.testing.assert_allclose(cohort[f'q_{name}'], np.nanpercentile(q, p, axis=0))
+    assert set(curves['start_year']) == set(wells['start_year'].dropna())